@@ -0,0 +1,823 @@
+# ======================================================
+# ALMACEN.PY - Almacenamiento columnar de gastos
+# ======================================================
+
+from array import array
+from collections.abc import MutableMapping
+from datetime import date
+from itertools import chain, compress
+from math import fsum, isclose
+from indices import IndiceFecha, IndiceCategoria, IndiceTexto, Agregados, normalizar_texto
+
+CAMPOS = ("id", "fecha", "monto", "categoria", "descripcion", "estado")
+
+ESTADOS = ("activo", "eliminado")
+
+
+# ======================================================
+# CONVERSIÓN DE FECHAS
+# ======================================================
+
+def fecha_a_ordinal(fecha):
+    """
+    Convierte una fecha dd/mm/aaaa a su ordinal entero (días desde el año 1).
+    """
+    d, m, a = fecha.split("/")
+    return date(int(a), int(m), int(d)).toordinal()
+
+
+def ordinal_a_fecha(ordinal):
+    """
+    Convierte un ordinal entero a una fecha dd/mm/aaaa.
+    """
+    f = date.fromordinal(ordinal)
+    return f"{f.day:02d}/{f.month:02d}/{f.year:04d}"
+
+
+# ======================================================
+# VISTA DE COMPATIBILIDAD
+# ======================================================
+
+class VistaGasto(MutableMapping):
+    """
+    Vista tipo diccionario sobre una fila del almacén.
+    Las lecturas y escrituras van directamente a las columnas.
+    """
+    __slots__ = ("_almacen", "_gid")
+
+    def __init__(self, almacen, gid):
+        self._almacen = almacen
+        self._gid = gid
+
+    def __getitem__(self, campo):
+        return self._almacen.leer_campo(self._gid, campo)
+
+    def __setitem__(self, campo, valor):
+        self._almacen.escribir_campo(self._gid, campo, valor)
+
+    def __delitem__(self, campo):
+        raise TypeError("No se pueden borrar campos de un gasto.")
+
+    def __iter__(self):
+        return iter(CAMPOS)
+
+    def __len__(self):
+        return len(CAMPOS)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def tiene_palabra(self, palabra):
+        """
+        Consulta el índice de texto del almacén para esta fila.
+        """
+        return self._almacen.tiene_palabra(self._gid, palabra)
+
+
+# ======================================================
+# PARTICIÓN DE COLUMNAS
+# ======================================================
+
+class _Particion:
+    """
+    Columnas tipadas de un grupo de gastos (activos o papelera):
+
+    - ids:           array('q') con el ID numérico
+    - fechas:        array('i') con el ordinal de la fecha
+    - montos:        array('d')
+    - categorias:    array('H') con códigos de categoría
+    - descripciones: array('I') con índices al pool de strings
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.fechas = array("i")
+        self.montos = array("d")
+        self.categorias = array("H")
+        self.descripciones = array("I")
+        # ID -> número de fila
+        self.filas = {}
+
+    def columnas(self):
+        return (self.ids, self.fechas, self.montos, self.categorias, self.descripciones)
+
+    def agregar(self, num, ordinal, monto, categoria, descripcion):
+        """
+        Agrega una fila al final de las columnas.
+        """
+        self.filas[num] = len(self.ids)
+        self.ids.append(num)
+        self.fechas.append(ordinal)
+        self.montos.append(monto)
+        self.categorias.append(categoria)
+        self.descripciones.append(descripcion)
+
+    def quitar(self, num):
+        """
+        Quita una fila moviendo la última a su lugar.
+        Retorna (ordinal, monto, categoria, descripcion) de la fila quitada.
+        """
+        fila = self.filas.pop(num)
+        valores = (self.fechas[fila], self.montos[fila],
+                   self.categorias[fila], self.descripciones[fila])
+        ultima = len(self.ids) - 1
+        if fila != ultima:
+            for columna in self.columnas():
+                columna[fila] = columna[ultima]
+            self.filas[self.ids[fila]] = fila
+        for columna in self.columnas():
+            columna.pop()
+        return valores
+
+    def vaciar(self):
+        """
+        Borra todas las filas y retorna los IDs que tenía.
+        """
+        ids = list(self.ids)
+        self.__init__()
+        return ids
+
+    def __len__(self):
+        return len(self.ids)
+
+
+# ======================================================
+# ALMACÉN COLUMNAR
+# ======================================================
+
+class AlmacenGastos(MutableMapping):
+    """
+    Guarda los gastos en columnas tipadas en lugar de un dict por gasto.
+
+    Los gastos activos y los de la papelera viven en dos particiones
+    físicas separadas: eliminar o restaurar mueve la fila de una a otra,
+    así las consultas de activos nunca recorren filas eliminadas y la
+    papelera se consulta en proporción a su tamaño.
+
+    Se comporta como un diccionario {id: gasto} para que las funciones
+    existentes sigan funcionando; cada gasto se expone como VistaGasto.
+
+    Además mantiene índices por fecha y por categoría de los gastos
+    activos, agregados acumulados (cantidad, total, mínimo, máximo y
+    total por categoría) de los activos, y un índice invertido de las
+    descripciones de todos los gastos para las búsquedas por texto.
+    """
+
+    def __init__(self, gastos=None):
+        self._activos = _Particion()
+        self._papelera = _Particion()
+
+        # Tablas de strings (internadas)
+        self._nombres_categoria = []
+        self._codigos_categoria = {}
+        self._pool = []
+        self._indice_pool = {}
+
+        # Índices
+        self._indice_fecha = IndiceFecha()
+        self._indice_categoria = IndiceCategoria()
+        self._indice_texto = IndiceTexto()
+        self._agregados = Agregados()
+
+        # ID -> campos modificados desde el último guardado
+        self._modificados = {}
+
+        if gastos:
+            for gid, g in gastos.items():
+                self[gid] = g
+
+    # --------------------------------------------------
+    # Tablas de strings
+    # --------------------------------------------------
+
+    def _codigo_categoria(self, categoria):
+        codigo = self._codigos_categoria.get(categoria)
+        if codigo is None:
+            codigo = len(self._nombres_categoria)
+            self._nombres_categoria.append(categoria)
+            self._codigos_categoria[categoria] = codigo
+        return codigo
+
+    def _codigo_descripcion(self, descripcion):
+        codigo = self._indice_pool.get(descripcion)
+        if codigo is None:
+            codigo = len(self._pool)
+            self._pool.append(descripcion)
+            self._indice_pool[descripcion] = codigo
+        return codigo
+
+    def _ubicar(self, gid):
+        """
+        Retorna (partición, fila) de un gasto o lanza KeyError.
+        """
+        try:
+            num = int(gid)
+        except (ValueError, TypeError):
+            raise KeyError(gid)
+        for particion in (self._activos, self._papelera):
+            fila = particion.filas.get(num)
+            if fila is not None:
+                return particion, fila
+        raise KeyError(gid)
+
+    # --------------------------------------------------
+    # Mantenimiento de índices y agregados (solo gastos activos)
+    # --------------------------------------------------
+
+    def _indexar(self, num, ordinal, categoria, monto):
+        self._indice_fecha.agregar(ordinal, num)
+        self._indice_categoria.agregar(categoria, ordinal, num)
+        self._agregados.sumar(categoria, monto)
+
+    def _desindexar(self, num, ordinal, categoria, monto):
+        self._indice_fecha.quitar(ordinal, num)
+        self._indice_categoria.quitar(categoria, ordinal, num)
+        self._agregados.restar(categoria, monto)
+
+    def _marcar(self, num, *campos):
+        self._modificados.setdefault(num, set()).update(campos)
+
+    # --------------------------------------------------
+    # Altas, bajas y modificaciones
+    # --------------------------------------------------
+
+    def agregar(self, gid, fecha, monto, categoria, descripcion, estado="activo"):
+        """
+        Agrega un gasto a la partición que corresponde a su estado.
+        """
+        if estado not in ESTADOS:
+            raise KeyError(f"Estado desconocido: {estado}")
+        num = int(gid)
+        if num in self._activos.filas or num in self._papelera.filas:
+            raise KeyError(f"El ID {gid} ya existe.")
+        ordinal = fecha_a_ordinal(fecha)
+        codigo = self._codigo_categoria(categoria)
+        monto = float(monto)
+        particion = self._activos if estado == "activo" else self._papelera
+        particion.agregar(num, ordinal, monto, codigo,
+                          self._codigo_descripcion(descripcion))
+        self._indice_texto.agregar(num, descripcion)
+        if particion is self._activos:
+            self._indexar(num, ordinal, codigo, monto)
+        self._marcar(num, *CAMPOS)
+
+    def agregar_varios(self, filas):
+        """
+        Agrega muchos gastos activos (id, fecha, monto, categoria,
+        descripcion) y actualiza los índices una sola vez al final.
+        """
+        filas = list(filas)
+        nums = [int(f[0]) for f in filas]
+        repetidos = (set(nums) & (self._activos.filas.keys() | self._papelera.filas.keys())
+                     or len(set(nums)) != len(nums))
+        if repetidos:
+            raise KeyError("El lote tiene IDs que ya existen o repetidos.")
+        ordinales, montos, codigos, textos = [], [], [], []
+        for num, (_, fecha, monto, categoria, descripcion) in zip(nums, filas):
+            ordinal, codigo, monto = fecha_a_ordinal(fecha), self._codigo_categoria(categoria), float(monto)
+            self._activos.agregar(num, ordinal, monto, codigo, self._codigo_descripcion(descripcion))
+            self._marcar(num, *CAMPOS)
+            ordinales.append(ordinal)
+            montos.append(monto)
+            codigos.append(codigo)
+            textos.append(((num,), descripcion))
+        self._indice_texto.cargar(textos)
+        self._indice_fecha.cargar(ordinales, nums)
+        self._indice_categoria.cargar(codigos, ordinales, nums)
+        self._agregados.cargar(codigos, montos)
+
+    def quitar(self, gid):
+        """
+        Borra físicamente un gasto.
+        """
+        particion, _ = self._ubicar(gid)
+        num = int(gid)
+        ordinal, monto, codigo, desc = particion.quitar(num)
+        if particion is self._activos:
+            self._desindexar(num, ordinal, codigo, monto)
+        self._indice_texto.quitar(num, self._pool[desc])
+        self._marcar(num, *CAMPOS)
+
+    def _mover(self, gid, destino):
+        """
+        Mueve un gasto entre particiones. Retorna False si ya estaba ahí.
+        """
+        origen, _ = self._ubicar(gid)
+        if origen is destino:
+            return False
+        num = int(gid)
+        ordinal, monto, codigo, desc = origen.quitar(num)
+        destino.agregar(num, ordinal, monto, codigo, desc)
+        if destino is self._activos:
+            self._indexar(num, ordinal, codigo, monto)
+        else:
+            self._desindexar(num, ordinal, codigo, monto)
+        self._marcar(num, "estado")
+        return True
+
+    def _mover_varios(self, gids, destino):
+        """
+        Mueve muchos gastos entre particiones y ajusta los índices una sola
+        vez. Los que ya estaban en destino se ignoran. Retorna cuántos movió.
+        """
+        origen = self._papelera if destino is self._activos else self._activos
+        nums, ordinales, montos, codigos = [], [], [], []
+        for gid in gids:
+            num = int(gid)
+            if num not in origen.filas:
+                if num not in destino.filas:
+                    raise KeyError(gid)
+                continue
+            ordinal, monto, codigo, desc = origen.quitar(num)
+            destino.agregar(num, ordinal, monto, codigo, desc)
+            self._marcar(num, "estado")
+            nums.append(num)
+            ordinales.append(ordinal)
+            montos.append(monto)
+            codigos.append(codigo)
+        if destino is self._activos:
+            self._indice_fecha.cargar(ordinales, nums)
+            self._indice_categoria.cargar(codigos, ordinales, nums)
+            self._agregados.cargar(codigos, montos)
+        else:
+            self._indice_fecha.quitar_varios(ordinales, nums)
+            self._indice_categoria.quitar_varios(codigos, ordinales, nums)
+            self._agregados.restar_varios(codigos, montos)
+        return len(nums)
+
+    def eliminar_varios(self, gids):
+        """
+        Pasa muchos gastos activos a la papelera.
+        """
+        return self._mover_varios(gids, self._papelera)
+
+    def restaurar_varios(self, gids):
+        """
+        Devuelve muchos gastos de la papelera a los activos.
+        """
+        return self._mover_varios(gids, self._activos)
+
+    def escribir_montos(self, cambios):
+        """
+        Cambia el monto de muchos gastos (id, monto). Solo los agregados
+        dependen del monto, así que se ajustan una vez para todo el lote.
+        """
+        viejos, nuevos, codigos = [], [], []
+        for gid, monto in cambios:
+            p, fila = self._ubicar(gid)
+            monto = float(monto)
+            if p is self._activos:
+                viejos.append(p.montos[fila])
+                nuevos.append(monto)
+                codigos.append(p.categorias[fila])
+            p.montos[fila] = monto
+            self._marcar(p.ids[fila], "monto")
+        self._agregados.restar_varios(codigos, viejos)
+        self._agregados.cargar(codigos, nuevos)
+
+    def eliminar(self, gid):
+        """
+        Pasa un gasto activo a la papelera.
+        """
+        return self._mover(gid, self._papelera)
+
+    def restaurar(self, gid):
+        """
+        Devuelve un gasto de la papelera a los activos.
+        """
+        return self._mover(gid, self._activos)
+
+    def vaciar_papelera(self):
+        """
+        Borra todos los gastos de la papelera en O(tamaño de la papelera).
+        Retorna los IDs borrados.
+        """
+        p = self._papelera
+        for num, desc in zip(p.ids, p.descripciones):
+            self._indice_texto.quitar(num, self._pool[desc])
+            self._marcar(num, *CAMPOS)
+        return [str(num) for num in p.vaciar()]
+
+    def leer_campo(self, gid, campo):
+        """
+        Lee un campo de un gasto reconstruyendo su valor original.
+        """
+        p, fila = self._ubicar(gid)
+        if campo == "id":
+            return str(p.ids[fila])
+        if campo == "fecha":
+            return ordinal_a_fecha(p.fechas[fila])
+        if campo == "monto":
+            return p.montos[fila]
+        if campo == "categoria":
+            return self._nombres_categoria[p.categorias[fila]]
+        if campo == "descripcion":
+            return self._pool[p.descripciones[fila]]
+        if campo == "estado":
+            return "activo" if p is self._activos else "eliminado"
+        raise KeyError(campo)
+
+    def escribir_campo(self, gid, campo, valor):
+        """
+        Modifica un campo de un gasto en su columna.
+        """
+        p, fila = self._ubicar(gid)
+        num = p.ids[fila]
+        if campo in ("fecha", "categoria", "monto"):
+            # Se convierte antes de tocar los índices: si el valor es
+            # inválido, el error sale con el gasto todavía bien indexado.
+            if campo == "fecha":
+                columna, nuevo = p.fechas, fecha_a_ordinal(valor)
+            elif campo == "categoria":
+                columna, nuevo = p.categorias, self._codigo_categoria(valor)
+            else:
+                columna, nuevo = p.montos, float(valor)
+            # Campos indexados/agregados: se reubica el gasto en los índices
+            activo = p is self._activos
+            if activo:
+                self._desindexar(num, p.fechas[fila], p.categorias[fila], p.montos[fila])
+            columna[fila] = nuevo
+            if activo:
+                self._indexar(num, p.fechas[fila], p.categorias[fila], p.montos[fila])
+        elif campo == "descripcion":
+            self._indice_texto.quitar(num, self._pool[p.descripciones[fila]])
+            p.descripciones[fila] = self._codigo_descripcion(valor)
+            self._indice_texto.agregar(num, valor)
+        elif campo == "estado":
+            if valor not in ESTADOS:
+                raise KeyError(f"Estado desconocido: {valor}")
+            self._mover(gid, self._activos if valor == "activo" else self._papelera)
+        elif campo == "id":
+            raise TypeError("El ID de un gasto no se puede modificar.")
+        else:
+            raise KeyError(campo)
+        self._marcar(num, campo)
+
+    # --------------------------------------------------
+    # Cambios pendientes de guardar
+    # --------------------------------------------------
+
+    def hay_cambios(self):
+        return bool(self._modificados)
+
+    def registros_modificados(self):
+        """
+        IDs (string) agregados, modificados o borrados desde el último guardado.
+        """
+        return {str(num) for num in self._modificados}
+
+    def campos_modificados(self):
+        """
+        Unión de los campos modificados desde el último guardado.
+        """
+        return set().union(*self._modificados.values())
+
+    def marcar_guardado(self):
+        self._modificados.clear()
+
+    def _filas_en_orden(self, orden):
+        """
+        Genera (partición, fila) de cada ID del orden que exista.
+        """
+        for gid in orden:
+            try:
+                num = int(gid)
+            except (ValueError, TypeError):
+                continue
+            p = self._activos
+            fila = p.filas.get(num)
+            if fila is None:
+                p = self._papelera
+                fila = p.filas.get(num)
+                if fila is None:
+                    continue
+            yield p, fila
+
+    def filas_csv(self, orden):
+        """
+        Genera las filas (id, fecha, categoria, descripcion, monto, estado)
+        en el orden dado, leyendo directo de las columnas. Las fechas se
+        convierten una sola vez por día distinto.
+        """
+        fechas = {}
+        nombres, pool = self._nombres_categoria, self._pool
+        for p, fila in self._filas_en_orden(orden):
+            ordinal = p.fechas[fila]
+            fecha = fechas.get(ordinal)
+            if fecha is None:
+                fecha = fechas[ordinal] = ordinal_a_fecha(ordinal)
+            yield (p.ids[fila], fecha, nombres[p.categorias[fila]], pool[p.descripciones[fila]],
+                   p.montos[fila], "activo" if p is self._activos else "eliminado")
+
+    # --------------------------------------------------
+    # Volcado y carga por columnas (snapshot binario)
+    # --------------------------------------------------
+
+    def columnas_en_orden(self, orden):
+        """
+        Columnas de todos los gastos en el orden dado:
+        (ids, fechas, montos, categorias, descripciones, estados,
+        nombres de categoría, descripciones). estados vale 0 para activo
+        y 1 para eliminado; categorias y descripciones son índices a las
+        dos tablas de strings.
+        """
+        columnas = (array("q"), array("i"), array("d"), array("H"), array("I"))
+        estados = array("B")
+        for p, fila in self._filas_en_orden(orden):
+            for destino, origen in zip(columnas, p.columnas()):
+                destino.append(origen[fila])
+            estados.append(0 if p is self._activos else 1)
+        return (*columnas, estados, list(self._nombres_categoria), list(self._pool))
+
+    @classmethod
+    def desde_columnas(cls, ids, fechas, montos, categorias, descripciones, estados,
+                       nombres_categoria, pool):
+        """
+        Arma un almacén a partir de columnas (el formato de columnas_en_orden).
+        Los índices y agregados se construyen en bloque, y cada descripción
+        distinta se tokeniza una sola vez.
+        """
+        almacen = cls()
+        almacen._nombres_categoria = list(nombres_categoria)
+        almacen._codigos_categoria = {n: i for i, n in enumerate(almacen._nombres_categoria)}
+        almacen._pool = list(pool)
+        almacen._indice_pool = {d: i for i, d in enumerate(almacen._pool)}
+
+        for estado, p in ((0, almacen._activos), (1, almacen._papelera)):
+            mascara = [e == estado for e in estados]
+            p.ids = array("q", compress(ids, mascara))
+            p.fechas = array("i", compress(fechas, mascara))
+            p.montos = array("d", compress(montos, mascara))
+            p.categorias = array("H", compress(categorias, mascara))
+            p.descripciones = array("I", compress(descripciones, mascara))
+            p.filas = dict(zip(p.ids, range(len(p.ids))))
+        a, e = almacen._activos, almacen._papelera
+        if len(a.filas) + len(e.filas) != len(ids) or not a.filas.keys().isdisjoint(e.filas):
+            raise KeyError("Hay IDs repetidos o estados desconocidos.")
+
+        almacen._indice_fecha.cargar(a.fechas, a.ids)
+        almacen._indice_categoria.cargar(a.categorias, a.fechas, a.ids)
+        almacen._agregados.cargar(a.categorias, a.montos)
+
+        por_descripcion = {}
+        for num, desc in zip(ids, descripciones):
+            por_descripcion.setdefault(desc, []).append(num)
+        almacen._indice_texto.cargar((nums, almacen._pool[desc])
+                                     for desc, nums in por_descripcion.items())
+        return almacen
+
+    # --------------------------------------------------
+    # Interfaz de diccionario (compatibilidad)
+    # --------------------------------------------------
+
+    def __getitem__(self, gid):
+        self._ubicar(gid)
+        return VistaGasto(self, str(gid))
+
+    def __setitem__(self, gid, gasto):
+        if gid in self:
+            for campo in ("fecha", "monto", "categoria", "descripcion", "estado"):
+                if campo in gasto:
+                    self.escribir_campo(gid, campo, gasto[campo])
+        else:
+            self.agregar(gid, gasto["fecha"], gasto["monto"], gasto["categoria"],
+                         gasto.get("descripcion", ""), gasto.get("estado", "activo"))
+
+    def __delitem__(self, gid):
+        self.quitar(gid)
+
+    def __contains__(self, gid):
+        try:
+            num = int(gid)
+        except (ValueError, TypeError):
+            return False
+        return num in self._activos.filas or num in self._papelera.filas
+
+    def __iter__(self):
+        return (str(num) for num in chain(self._activos.ids, self._papelera.ids))
+
+    def __len__(self):
+        return len(self._activos) + len(self._papelera)
+
+    def __repr__(self):
+        return f"AlmacenGastos({len(self)} gastos)"
+
+    # --------------------------------------------------
+    # Consultas
+    # --------------------------------------------------
+    # Las consultas retornan IDs numéricos; vistas() los convierte en
+    # gastos tipo diccionario e ids_str() en el conjunto de IDs string.
+
+    def vistas(self, nums):
+        """
+        Convierte IDs numéricos en vistas de gasto.
+        """
+        return [VistaGasto(self, str(num)) for num in nums]
+
+    def ids_str(self, nums):
+        """
+        Convierte IDs numéricos en el conjunto de IDs (strings).
+        """
+        return {str(num) for num in nums}
+
+    def vistas_activas(self):
+        """
+        Vistas de todos los gastos activos (no toca la papelera).
+        """
+        return self.vistas(self._activos.ids)
+
+    def vistas_eliminadas(self):
+        """
+        Vistas de los gastos en la papelera, en O(tamaño de la papelera).
+        """
+        return self.vistas(self._papelera.ids)
+
+    def ids_activos(self, categoria=None, monto_mayor=None):
+        """
+        IDs de gastos activos, con filtros opcionales.
+        Con categoría se parte del índice (ordenado por fecha).
+        """
+        a = self._activos
+        if categoria is not None:
+            ids = self.ids_de_categoria(categoria)
+            if monto_mayor is not None:
+                ids = [num for num in ids if a.montos[a.filas[num]] > monto_mayor]
+            return ids
+        if monto_mayor is not None:
+            return list(compress(a.ids, (m > monto_mayor for m in a.montos)))
+        return list(a.ids)
+
+    def ids_por_fecha(self, desde=None, hasta=None, descendente=False):
+        """
+        IDs activos con fecha en [desde, hasta] (fechas dd/mm/aaaa o None),
+        leídos del índice ya ordenado: O(log n + k).
+        """
+        ord_desde = None if desde is None else fecha_a_ordinal(desde)
+        ord_hasta = None if hasta is None else fecha_a_ordinal(hasta)
+        ids = self._indice_fecha.rango(ord_desde, ord_hasta)
+        if descendente:
+            ids.reverse()
+        return ids
+
+    def ids_de_categoria(self, categoria):
+        """
+        IDs activos de una categoría, ordenados por fecha, desde el índice.
+        """
+        codigo = self._codigos_categoria.get(categoria)
+        if codigo is None:
+            return []
+        return self._indice_categoria.ids(codigo)
+
+    def categorias_activas(self):
+        """
+        Nombres de las categorías con gastos activos.
+        """
+        return [self._nombres_categoria[c] for c in self._indice_categoria.categorias()]
+
+    def ids_con_texto(self, consulta):
+        """
+        IDs (activos o no) cuya descripción contiene la consulta, sin
+        distinguir mayúsculas ni tildes. Se resuelve con el índice invertido
+        y solo se verifica el texto de los candidatos.
+        """
+        consulta = normalizar_texto(consulta)
+        if not consulta:
+            return sorted(chain(self._activos.ids, self._papelera.ids))
+        if consulta.split() == [consulta]:
+            # Una sola palabra sin espacios: el índice da la respuesta exacta
+            return sorted(self._indice_texto.candidatos(consulta))
+        # Con espacios (también al principio o al final, que marcan el
+        # borde de una palabra) se verifica el texto de los candidatos
+        if consulta.split():
+            ids = sorted(self._indice_texto.candidatos(consulta))
+        else:
+            ids = sorted(chain(self._activos.ids, self._papelera.ids))
+        return [num for num in ids
+                if consulta in normalizar_texto(self.leer_campo(num, "descripcion"))]
+
+    def ids_con_prefijo(self, prefijo):
+        """
+        IDs con alguna palabra de la descripción que empieza con el prefijo.
+        """
+        return sorted(self._indice_texto.ids_con_prefijo(prefijo))
+
+    def tiene_palabra(self, gid, palabra):
+        """
+        Indica si la descripción del gasto contiene esa palabra exacta.
+        """
+        return int(gid) in self._indice_texto.ids_con_token(palabra)
+
+    def primeros_ids(self, n):
+        """
+        Los n IDs activos más antiguos según el índice por fecha.
+        """
+        return self._indice_fecha.primeros(n)
+
+    def ultimos_ids(self, n):
+        """
+        Los n IDs activos más recientes, del más nuevo al más viejo.
+        """
+        return self._indice_fecha.ultimos(n)
+
+    def ordinal(self, gid):
+        """
+        Ordinal de la fecha de un gasto.
+        """
+        p, fila = self._ubicar(gid)
+        return p.fechas[fila]
+
+    def ordenar_por_fecha(self, nums, descendente=False):
+        """
+        Ordena IDs activos por la columna de fechas.
+        """
+        a = self._activos
+        return sorted(nums, key=lambda num: a.fechas[a.filas[num]], reverse=descendente)
+
+    def ordenar_por_monto(self, nums, descendente=False):
+        """
+        Ordena IDs activos por la columna de montos.
+        """
+        a = self._activos
+        return sorted(nums, key=lambda num: a.montos[a.filas[num]], reverse=descendente)
+
+    def columnas_fecha_monto(self):
+        """
+        Columnas (ordinales de fecha, montos) de los gastos activos,
+        sin copiar (para reconstruir vistas derivadas como el calendario).
+        """
+        return self._activos.fechas, self._activos.montos
+
+    def cantidad_activos(self):
+        """
+        Cantidad de gastos activos.
+        """
+        return len(self._activos)
+
+    def cantidad_eliminados(self):
+        """
+        Cantidad de gastos en la papelera.
+        """
+        return len(self._papelera)
+
+    def total_activos(self):
+        """
+        Suma de montos activos, desde los agregados acumulados: O(1).
+        """
+        return self._agregados.total
+
+    def minimo_activo(self):
+        """
+        Monto mínimo entre los activos (None si no hay): O(1).
+        """
+        return self._agregados.minimo()
+
+    def maximo_activo(self):
+        """
+        Monto máximo entre los activos (None si no hay): O(1).
+        """
+        return self._agregados.maximo()
+
+    def suma_por_categoria(self):
+        """
+        Total por categoría (solo activos), desde los agregados acumulados.
+        """
+        return {self._nombres_categoria[cod]: total
+                for cod, total in self._agregados.suma_por_categoria().items()}
+
+    def verificar_agregados(self):
+        """
+        Recalcula los agregados desde las columnas y los compara con los
+        acumulados. Retorna una lista de diferencias (vacía si coinciden).
+        """
+        a, ag = self._activos, self._agregados
+        diferencias = []
+
+        def comparar(nombre, acumulado, real):
+            if acumulado is None or real is None:
+                iguales = acumulado is real
+            else:
+                iguales = isclose(acumulado, real, rel_tol=1e-9, abs_tol=1e-6)
+            if not iguales:
+                diferencias.append(f"{nombre}: acumulado={acumulado} real={real}")
+
+        comparar("cantidad", ag.cantidad, len(a))
+        comparar("total", ag.total, fsum(a.montos))
+        comparar("mínimo", ag.minimo(), min(a.montos) if len(a) else None)
+        comparar("máximo", ag.maximo(), max(a.montos) if len(a) else None)
+
+        reales = {}
+        for cod, monto in zip(a.categorias, a.montos):
+            reales.setdefault(cod, []).append(monto)
+        acumulados = ag.suma_por_categoria()
+        for cod in set(reales) | set(acumulados):
+            nombre = self._nombres_categoria[cod]
+            real = fsum(reales[cod]) if cod in reales else None
+            comparar(f"total {nombre}", acumulados.get(cod), real)
+        return diferencias
+
+
+def es_almacen(gastos):
+    """
+    Indica si los gastos están en un almacén columnar.
+    """
+    return isinstance(gastos, AlmacenGastos)
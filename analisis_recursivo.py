@@ -23,6 +23,36 @@ def buscar_categoria_recursiva(categorias, nombre, nivel=0):
     return False
 
 
+def nombres_categorias_recursivo(categorias):
+    """
+    Conjunto con los nombres de todas las categorías y subcategorías.
+    Caso base: un diccionario vacío no aporta nombres.
+    Caso recursivo: cada categoría más los nombres de sus subcategorías.
+    """
+    nombres = set()
+    for categoria, subcategorias in categorias.items():
+        nombres.add(categoria)
+        if isinstance(subcategorias, dict) and subcategorias:
+            nombres |= nombres_categorias_recursivo(subcategorias)
+    return nombres
+
+
+def hojas_categorias_recursivo(categorias):
+    """
+    Lista de las categorías sin subcategorías (las que se eligen al
+    cargar un gasto), en el orden del árbol.
+    Caso base: una categoría sin subcategorías es una hoja.
+    Caso recursivo: las hojas de cada subárbol.
+    """
+    hojas = []
+    for categoria, subcategorias in categorias.items():
+        if isinstance(subcategorias, dict) and subcategorias:
+            hojas.extend(hojas_categorias_recursivo(subcategorias))
+        else:
+            hojas.append(categoria)
+    return hojas
+
+
 def mostrar_jerarquia_categorias(categorias, nivel=0):
     """
     Muestra un árbol de categorías de forma jerárquica.
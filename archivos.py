@@ -4,41 +4,107 @@
 import os
 import csv
 from datetime import datetime
-from matrices import crear_calendario
 
 # ======================================================
 # ARCHIVOS.PY - Lectura y escritura de datos
 # ======================================================
+import io
 import os
+import re
 import csv
+import math
+import struct
+import sys
+import zlib
+from array import array
+from contextlib import contextmanager
+from functools import lru_cache
 from datetime import datetime
-from matrices import crear_calendario
+from itertools import compress, islice
+from matrices import obtener_calendario_mes, posicion_en_mes
+from almacen import AlmacenGastos, es_almacen, ordinal_a_fecha, ESTADOS
+from constantes import FECHA_SISTEMA, FORMATO_FECHA_REGEX
+from analisis_recursivo import CATEGORIAS_JERARQUICAS, nombres_categorias_recursivo
+from bitacora import obtener_bitacora, vaciar_bitacora, ultimas_lineas
+
+TAMANIO_BLOQUE = 10000   # filas por cada writerows()
+
+
+# ======================================================
+# ESCRITURA ATÓMICA
+# ======================================================
+
+@contextmanager
+def escritura_atomica(ruta_completa, binario=False):
+    """
+    Abre un archivo temporal junto al destino para escribir. Al terminar
+    sin errores lo baja a disco (fsync) y lo renombra sobre el destino
+    con os.replace, así nunca queda un archivo a medio escribir.
+    """
+    temporal = ruta_completa + ".tmp"
+    try:
+        if binario:
+            archivo = open(temporal, "wb")
+        else:
+            archivo = open(temporal, "w", encoding="utf-8", newline='')
+        with archivo as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta_completa)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    # Sincronizar el directorio para que el renombre también sea durable
+    try:
+        fd = os.open(os.path.dirname(ruta_completa) or ".", os.O_RDONLY)
+    except OSError:
+        return  # (Windows no permite abrir directorios)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def escribir_en_bloques(writer, filas):
+    """
+    Escribe las filas con writerows() en bloques de TAMANIO_BLOQUE.
+    """
+    filas = iter(filas)
+    while True:
+        bloque = list(islice(filas, TAMANIO_BLOQUE))
+        if not bloque:
+            break
+        writer.writerows(bloque)
+
 
 def guardar_gastos_csv(ruta, gastos, orden):
     """
-    Guarda gastos en formato CSV (incluyendo estado).
+    Guarda gastos en formato CSV (incluyendo estado) de forma atómica.
     """
     try:
         base_dir = os.path.dirname(__file__)
         ruta_completa = os.path.join(base_dir, ruta)
 
-        with open(ruta_completa, "w", encoding="utf-8", newline='') as f:
+        if es_almacen(gastos):
+            filas = gastos.filas_csv(orden)
+        else:
+            filas = (
+                (g['id'], g['fecha'], g['categoria'], g['descripcion'],
+                 g['monto'], g.get('estado', 'activo'))
+                for g in (gastos[gid] for gid in orden if gid in gastos)
+            )
+
+        with escritura_atomica(ruta_completa) as f:
             writer = csv.writer(f)
             # Encabezado
             writer.writerow(["id", "fecha", "categoria", "descripcion", "monto", "estado"])
             
             # Escribir gastos en orden
-            for gid in orden:
-                if gid in gastos:
-                    g = gastos[gid]
-                    writer.writerow([
-                        g['id'],
-                        g['fecha'],
-                        g['categoria'],
-                        g['descripcion'],
-                        g['monto'],
-                        g.get('estado', 'activo')
-                    ])
+            escribir_en_bloques(writer, filas)
         
         print("Gastos guardados correctamente en CSV.")
         return True
@@ -48,74 +114,555 @@ def guardar_gastos_csv(ruta, gastos, orden):
         return False
 
 
-def cargar_gastos_csv(ruta):
+# ======================================================
+# IMPORTACIÓN POR BLOQUES
+# ======================================================
+# Etapas encadenadas con generadores, así la memoria usada depende del
+# tamaño de bloque y no del tamaño del archivo:
+#   leer filas -> agrupar en bloques -> validar y convertir -> insertar
+# Las filas inválidas van a un archivo de rechazados con el motivo.
+
+PATRON_FECHA = re.compile(FORMATO_FECHA_REGEX)
+CATEGORIAS_VALIDAS = nombres_categorias_recursivo(CATEGORIAS_JERARQUICAS)
+CAMPOS_CSV = ["id", "fecha", "categoria", "descripcion", "monto", "estado"]
+
+
+def posiciones_encabezado(encabezado):
     """
-    Carga gastos desde archivo CSV.
+    Posición de cada campo de CAMPOS_CSV en el encabezado (None para
+    estado si no está). Lanza ValueError si falta otra columna.
+    """
+    encabezado = [c.strip().lstrip("\ufeff") for c in encabezado]
+    faltantes = [c for c in CAMPOS_CSV if c not in encabezado and c != "estado"]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el encabezado: {', '.join(faltantes)}")
+    return [encabezado.index(c) if c in encabezado else None for c in CAMPOS_CSV], len(encabezado)
+
+
+def _bloques_de_filas(reader, posiciones, ancho, tamanio_bloque, linea_base=0):
+    bloque = []
+    for fila in reader:
+        if not fila:
+            continue
+        ordenada = None
+        if len(fila) == ancho:
+            ordenada = [fila[p] if p is not None else "activo" for p in posiciones]
+        bloque.append((linea_base + reader.line_num, fila, ordenada))
+        if len(bloque) >= tamanio_bloque:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+def leer_bloques_csv(f, tamanio_bloque=TAMANIO_BLOQUE):
+    """
+    Genera bloques de (número de línea, fila original, fila ordenada) de
+    un CSV ya abierto. La fila ordenada sigue CAMPOS_CSV según el
+    encabezado (sin columna estado se completa con "activo") y es None si
+    la fila no tiene la cantidad de campos del encabezado.
+    """
+    reader = csv.reader(f)
+    encabezado = next(reader, None)
+    if encabezado is None:
+        return
+    posiciones, ancho = posiciones_encabezado(encabezado)
+    yield from _bloques_de_filas(reader, posiciones, ancho, tamanio_bloque)
+
+
+@lru_cache(maxsize=1 << 16)
+def ordinal_de_fecha(fecha):
     """
+    Ordinal de una fecha dd/mm/aaaa ya validada con el regex. Lanza
+    ValueError si el día no existe. Las fechas se repiten mucho en un
+    archivo grande, así que se cachean.
+    """
+    return datetime.strptime(fecha, "%d/%m/%Y").toordinal()
+
+
+def validar_fila_gasto(fila, ids_vistos):
+    """
+    Valida y convierte una fila (id, fecha, categoria, descripcion,
+    monto, estado). Retorna (id, fecha, categoria, descripcion, monto,
+    estado) o lanza ValueError con el motivo del rechazo.
+    """
+    if fila is None or len(fila) != len(CAMPOS_CSV):
+        raise ValueError("cantidad de campos incorrecta")
+    gid, fecha, categoria, descripcion, monto, estado = fila
     try:
-        base_dir = os.path.dirname(__file__)
-        ruta_completa = os.path.join(base_dir, ruta)
+        num = int(gid)
+    except ValueError:
+        raise ValueError(f"ID inválido: {gid!r}")
+    if num <= 0:
+        raise ValueError(f"ID inválido: {gid!r}")
+    if num in ids_vistos:
+        raise ValueError(f"ID repetido: {num}")
+    if not PATRON_FECHA.match(fecha):
+        raise ValueError(f"fecha con formato inválido: {fecha!r}")
+    try:
+        ordinal_de_fecha(fecha)
+    except ValueError:
+        raise ValueError(f"fecha inexistente: {fecha}")
+    try:
+        valor = float(monto)
+    except ValueError:
+        raise ValueError(f"monto inválido: {monto!r}")
+    if not math.isfinite(valor) or valor < 0:
+        raise ValueError(f"monto inválido: {monto!r}")
+    if categoria not in CATEGORIAS_VALIDAS:
+        raise ValueError(f"categoría desconocida: {categoria!r}")
+    if estado not in ESTADOS:
+        raise ValueError(f"estado desconocido: {estado!r}")
+    ids_vistos.add(num)
+    return num, fecha, categoria, descripcion, valor, estado
 
-        gastos = {}
-        orden = []
-        categorias_usadas = set()
-        ultimo_id = 0
-        
-        with open(ruta_completa, "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            
-            for row in reader:
-                gid = row['id']
-                try:
-                    monto = float(row['monto'])
-                except ValueError:
-                    continue
-                
-                estado = row.get('estado', 'activo')
-                
-                gastos[gid] = {
-                    "id": gid,
-                    "fecha": row['fecha'],
-                    "monto": monto,
-                    "categoria": row['categoria'],
-                    "descripcion": row['descripcion'],
-                    "estado": estado
-                }
-                
-                orden.append(gid)
-                categorias_usadas.add(row['categoria'])
-                
-                try:
-                    ultimo_id = max(ultimo_id, int(gid))
-                except ValueError:
-                    pass
-        
+
+def validar_bloque(bloque, ids_vistos):
+    """
+    Valida un bloque de leer_bloques_csv. Retorna (válidos, líneas de los
+    válidos, rechazos), con cada rechazo como [línea, motivo, *campos].
+    """
+    validos, lineas, rechazos = [], [], []
+    for linea, original, fila in bloque:
+        try:
+            validos.append(validar_fila_gasto(fila, ids_vistos))
+            lineas.append(linea)
+        except ValueError as motivo:
+            rechazos.append([linea, str(motivo)] + original)
+    return validos, lineas, rechazos
+
+
+def _ruta_rechazos(ruta_completa, ruta_rechazos):
+    if ruta_rechazos is None:
+        return os.path.splitext(ruta_completa)[0] + "_rechazados.csv"
+    return os.path.join(os.path.dirname(__file__), ruta_rechazos)
+
+
+def importar_gastos_csv(ruta, ruta_rechazos=None, al_progresar=None,
+                        tamanio_bloque=TAMANIO_BLOQUE):
+    """
+    Genera bloques de gastos válidos (tuplas de validar_fila_gasto) leídos
+    de un CSV. Las filas rechazadas se escriben en ruta_rechazos (por
+    defecto <ruta>_rechazados.csv, solo si hay alguna) con la línea y el
+    motivo. al_progresar(leidas, aceptadas, rechazadas) se llama después
+    de cada bloque.
+    """
+    base_dir = os.path.dirname(__file__)
+    ruta_completa = os.path.join(base_dir, ruta)
+    ruta_rechazos = _ruta_rechazos(ruta_completa, ruta_rechazos)
+
+    ids_vistos = set()
+    leidas = aceptadas = rechazadas = 0
+    archivo_rechazos = None
+    try:
+        with open(ruta_completa, "r", encoding="utf-8", newline='') as f:
+            for bloque in leer_bloques_csv(f, tamanio_bloque):
+                validos, _, rechazos_bloque = validar_bloque(bloque, ids_vistos)
+                if rechazos_bloque:
+                    if archivo_rechazos is None:
+                        archivo_rechazos = open(ruta_rechazos, "w", encoding="utf-8", newline='')
+                        rechazos = csv.writer(archivo_rechazos)
+                        rechazos.writerow(["linea", "motivo"] + CAMPOS_CSV)
+                    rechazos.writerows(rechazos_bloque)
+                leidas += len(bloque)
+                aceptadas += len(validos)
+                rechazadas += len(bloque) - len(validos)
+                if al_progresar is not None:
+                    al_progresar(leidas, aceptadas, rechazadas)
+                yield validos
+    finally:
+        if archivo_rechazos is not None:
+            archivo_rechazos.close()
+
+
+class ColumnasGastos:
+    """
+    Gastos validados en columnas compactas, con sus tablas de strings
+    (categorías y descripciones) en orden de primera aparición.
+    """
+
+    def __init__(self):
+        self.ids, self.fechas, self.montos = array("q"), array("i"), array("d")
+        self.categorias, self.descripciones, self.estados = array("H"), array("I"), array("B")
+        self.lineas = array("Q")
+        self.codigos_cat, self.codigos_desc = {}, {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def agregar_bloque(self, validos, lineas=None):
+        """
+        Agrega las tuplas de validar_fila_gasto (y sus números de línea).
+        """
+        codigos_cat, codigos_desc = self.codigos_cat, self.codigos_desc
+        for num, fecha, categoria, descripcion, monto, estado in validos:
+            self.ids.append(num)
+            self.fechas.append(ordinal_de_fecha(fecha))
+            self.montos.append(monto)
+            self.categorias.append(codigos_cat.setdefault(categoria, len(codigos_cat)))
+            self.descripciones.append(codigos_desc.setdefault(descripcion, len(codigos_desc)))
+            self.estados.append(0 if estado == "activo" else 1)
+        if lineas is not None:
+            self.lineas.extend(lineas)
+
+    def unir(self, otras):
+        """
+        Agrega al final las filas de otras columnas, traduciendo sus
+        códigos de categoría y descripción a las tablas propias.
+        """
+        traducir = []
+        for propios, ajenos in ((self.codigos_cat, otras.codigos_cat),
+                                (self.codigos_desc, otras.codigos_desc)):
+            traducir.append([propios.setdefault(texto, len(propios)) for texto in ajenos])
+        self.ids.extend(otras.ids)
+        self.fechas.extend(otras.fechas)
+        self.montos.extend(otras.montos)
+        self.categorias.extend(map(traducir[0].__getitem__, otras.categorias))
+        self.descripciones.extend(map(traducir[1].__getitem__, otras.descripciones))
+        self.estados.extend(otras.estados)
+        self.lineas.extend(otras.lineas)
+
+    def quitar_filas(self, excluir):
+        """
+        Quita las filas cuyas posiciones están en el conjunto excluir.
+        """
+        mascara = [i not in excluir for i in range(len(self.ids))]
+        for nombre, tipo in (("ids", "q"), ("fechas", "i"), ("montos", "d"), ("categorias", "H"),
+                             ("descripciones", "I"), ("estados", "B"), ("lineas", "Q")):
+            columna = getattr(self, nombre)
+            if len(columna) == len(mascara):
+                setattr(self, nombre, array(tipo, compress(columna, mascara)))
+
+    def resultado(self):
+        """
+        (gastos, orden, categorias_usadas, ultimo_id) como cargar_gastos_csv.
+        """
+        gastos = AlmacenGastos.desde_columnas(
+            self.ids, self.fechas, self.montos, self.categorias, self.descripciones,
+            self.estados, list(self.codigos_cat), list(self.codigos_desc))
+        return gastos, [str(num) for num in self.ids], set(self.codigos_cat), max(self.ids, default=0)
+
+
+def cargar_gastos_csv(ruta, ruta_rechazos=None, al_progresar=None):
+    """
+    Carga gastos desde archivo CSV con la importación por bloques.
+    Cada bloque válido se vuelca en columnas compactas y al final se
+    arma el almacén de una sola vez (índices incluidos).
+    """
+    try:
+        columnas = ColumnasGastos()
+        totales = [0, 0, 0]  # leídas, aceptadas, rechazadas
+
+        def progreso(*conteos):
+            totales[:] = conteos
+            if al_progresar is not None:
+                al_progresar(*conteos)
+
+        for bloque in importar_gastos_csv(ruta, ruta_rechazos, progreso):
+            columnas.agregar_bloque(bloque)
+        gastos, orden, categorias_usadas, ultimo_id = columnas.resultado()
+
+        if totales[2]:
+            print(f"Se rechazaron {totales[2]} fila(s); ver el archivo de rechazados.")
         print("Gastos cargados correctamente desde CSV.")
         return True, gastos, orden, categorias_usadas, ultimo_id
         
     except FileNotFoundError:
         print("Archivo de gastos no encontrado. Se creará uno nuevo al guardar.")
-        return False, {}, [], set(), 0
+        return False, AlmacenGastos(), [], set(), 0
     except Exception as e:
         print(f"Error al cargar gastos: {e}")
-        return False, {}, [], set(), 0
+        return False, AlmacenGastos(), [], set(), 0
+
+
+# ======================================================
+# CARGA EN PARALELO
+# ======================================================
+# El archivo se corta en rangos de bytes que terminan en un salto de
+# línea fuera de comillas; cada proceso lee y valida su rango y devuelve
+# sus columnas compactas. Los resultados se unen en el orden del archivo,
+# así el almacén queda igual que con la carga en serie.
+
+MINIMO_PARALELO = 8 << 20       # bytes; los archivos más chicos se cargan en serie
+TAMANIO_LECTURA = 1 << 20       # bytes por lectura al buscar los cortes
+RANGOS_POR_PROCESO = 4
+
+
+def dividir_csv(ruta_completa, partes):
+    """
+    Divide los datos (sin el encabezado) en hasta `partes` rangos de bytes
+    de tamaño parecido. Cada corte cae después de un salto de línea con
+    una cantidad par de comillas antes, o sea fuera de un campo entre
+    comillas. Retorna (encabezado, [(inicio, fin, saltos de línea previos)]).
+    """
+    tamanio = os.path.getsize(ruta_completa)
+    with open(ruta_completa, "rb") as f:
+        encabezado = f.readline()
+        inicio_datos = f.tell()
+        objetivos = [inicio_datos + (tamanio - inicio_datos) * k // partes
+                     for k in range(1, partes)]
+        cortes = [(inicio_datos, 1)]
+        comillas, saltos, pos = 0, 1, inicio_datos
+
+        for bloque in iter(lambda: f.read(TAMANIO_LECTURA), b""):
+            desde = 0   # hasta dónde se contó dentro del bloque
+            while objetivos and objetivos[0] - pos < len(bloque):
+                salto = bloque.find(b"\n", max(objetivos[0] - pos, desde))
+                if salto < 0:
+                    break
+                comillas += bloque.count(b'"', desde, salto)
+                saltos += bloque.count(b"\n", desde, salto) + 1
+                desde = salto + 1
+                if comillas % 2 == 0:
+                    cortes.append((pos + desde, saltos))
+                    while objetivos and objetivos[0] < pos + desde:
+                        objetivos.pop(0)
+            comillas += bloque.count(b'"', desde)
+            saltos += bloque.count(b"\n", desde)
+            pos += len(bloque)
+
+    fines = [inicio for inicio, _ in cortes[1:]] + [tamanio]
+    rangos = [(inicio, fin, previos) for (inicio, previos), fin in zip(cortes, fines) if fin > inicio]
+    return encabezado, rangos
+
+
+def _parsear_rango(ruta_completa, inicio, fin, linea_base, posiciones, ancho):
+    """
+    Trabajo de cada proceso: lee, valida y pasa a columnas un rango.
+    Retorna (columnas, rechazos, filas leídas).
+    """
+    with open(ruta_completa, "rb") as f:
+        f.seek(inicio)
+        texto = f.read(fin - inicio).decode("utf-8")
+    reader = csv.reader(io.StringIO(texto, newline=''))
+    columnas = ColumnasGastos()
+    ids_vistos, rechazos, leidas = set(), [], 0
+    for bloque in _bloques_de_filas(reader, posiciones, ancho, TAMANIO_BLOQUE, linea_base):
+        validos, lineas, rechazos_bloque = validar_bloque(bloque, ids_vistos)
+        columnas.agregar_bloque(validos, lineas)
+        rechazos.extend(rechazos_bloque)
+        leidas += len(bloque)
+    return columnas, rechazos, leidas
+
+
+def _rechazar_repetidos(parte, repetidos):
+    """
+    Quita de una parte las filas con IDs ya cargados en partes anteriores
+    y las retorna como rechazos (los campos se rearman de las columnas).
+    """
+    categorias, descripciones = list(parte.codigos_cat), list(parte.codigos_desc)
+    excluir = {i for i, num in enumerate(parte.ids) if num in repetidos}
+    rechazos = [
+        [parte.lineas[i], f"ID repetido: {parte.ids[i]}", str(parte.ids[i]),
+         ordinal_a_fecha(parte.fechas[i]), categorias[parte.categorias[i]],
+         descripciones[parte.descripciones[i]], parte.montos[i],
+         "activo" if parte.estados[i] == 0 else "eliminado"]
+        for i in sorted(excluir)
+    ]
+    parte.quitar_filas(excluir)
+    return rechazos
+
+
+def cargar_gastos_csv_paralelo(ruta, procesos=None, ruta_rechazos=None, al_progresar=None,
+                               minimo_paralelo=MINIMO_PARALELO):
+    """
+    Igual que cargar_gastos_csv pero repartiendo el parseo entre varios
+    procesos. Con un solo proceso o un archivo chico usa la carga en serie.
+    """
+    try:
+        base_dir = os.path.dirname(__file__)
+        ruta_completa = os.path.join(base_dir, ruta)
+        procesos = procesos or os.cpu_count() or 1
+        if procesos < 2 or os.path.getsize(ruta_completa) < minimo_paralelo:
+            return cargar_gastos_csv(ruta, ruta_rechazos, al_progresar)
+
+        # Solo se importa si de verdad se usa (cuesta varios ms al arrancar)
+        from concurrent.futures import ProcessPoolExecutor
+
+        encabezado, rangos = dividir_csv(ruta_completa, procesos * RANGOS_POR_PROCESO)
+        posiciones, ancho = posiciones_encabezado(
+            next(csv.reader([encabezado.decode("utf-8-sig")])))
+
+        total = ColumnasGastos()
+        vistos, rechazos = set(), []
+        leidas = 0
+        with ProcessPoolExecutor(procesos) as ejecutor:
+            futuros = [ejecutor.submit(_parsear_rango, ruta_completa, inicio, fin, previos,
+                                       posiciones, ancho)
+                       for inicio, fin, previos in rangos]
+            for futuro in futuros:
+                parte, rechazos_parte, leidas_parte = futuro.result()
+                repetidos = vistos.intersection(parte.ids)
+                if repetidos:
+                    rechazos_parte += _rechazar_repetidos(parte, repetidos)
+                vistos.update(parte.ids)
+                total.unir(parte)
+                rechazos.extend(rechazos_parte)
+                leidas += leidas_parte
+                if al_progresar is not None:
+                    al_progresar(leidas, len(total), len(rechazos))
+
+        if rechazos:
+            rechazos.sort(key=lambda r: r[0])
+            with open(_ruta_rechazos(ruta_completa, ruta_rechazos), "w",
+                      encoding="utf-8", newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["linea", "motivo"] + CAMPOS_CSV)
+                writer.writerows(rechazos)
+            print(f"Se rechazaron {len(rechazos)} fila(s); ver el archivo de rechazados.")
+
+        gastos, orden, categorias_usadas, ultimo_id = total.resultado()
+        print(f"Gastos cargados correctamente desde CSV ({procesos} procesos).")
+        return True, gastos, orden, categorias_usadas, ultimo_id
+
+    except FileNotFoundError:
+        print("Archivo de gastos no encontrado. Se creará uno nuevo al guardar.")
+        return False, AlmacenGastos(), [], set(), 0
+    except Exception as e:
+        print(f"Error al cargar gastos: {e}")
+        return False, AlmacenGastos(), [], set(), 0
+
+
+# ======================================================
+# SNAPSHOT BINARIO
+# ======================================================
+# Formato (todo little-endian):
+#   cabecera: "GSTB", versión, último ID, cantidad de filas, largo en
+#             bytes de cada tabla de strings y CRC32 del contenido
+#   columnas: ids (int64), fechas como ordinal (int32), montos (float64),
+#             código de categoría (uint16), código de descripción (uint32)
+#             y estado (uint8: 0 activo, 1 eliminado), en el orden de
+#             la lista `orden` tal como llega (el snapshot no reordena: sale
+#             por fecha solo si `orden` ya lo está, como lo mantiene el menú)
+#   tablas:   categorías y descripciones en UTF-8, cada una terminada en "\0"
+#
+# Cargarlo es leer el archivo, verificar el CRC y pasar cada columna a
+# un array sin convertir fila por fila.
+
+MAGIA_BIN = b"GSTB"
+VERSION_BIN = 1
+CABECERA_BIN = struct.Struct("<4sHqIIII")
+TIPOS_COLUMNAS_BIN = ("q", "i", "d", "H", "I", "B")
+SEPARADOR_BIN = "\0"
+
+
+def _tabla_a_bytes(tabla):
+    """
+    Codifica una tabla de strings, cada uno terminado en "\\0".
+    """
+    if any(SEPARADOR_BIN in texto for texto in tabla):
+        raise ValueError("Un texto contiene el carácter nulo.")
+    return "".join(texto + SEPARADOR_BIN for texto in tabla).encode("utf-8")
+
+
+def _bytes_a_tabla(datos):
+    return bytes(datos).decode("utf-8").split(SEPARADOR_BIN)[:-1]
+
+
+def guardar_gastos_bin(ruta, gastos, orden, ultimo_id):
+    """
+    Guarda los gastos en el snapshot binario (de forma atómica).
+    """
+    try:
+        base_dir = os.path.dirname(__file__)
+        ruta_completa = os.path.join(base_dir, ruta)
+
+        if not es_almacen(gastos):
+            gastos = AlmacenGastos(gastos)
+        *columnas, categorias, descripciones = gastos.columnas_en_orden(orden)
+        if sys.byteorder == "big":
+            for columna in columnas:
+                columna.byteswap()
+
+        tabla_cat = _tabla_a_bytes(categorias)
+        tabla_desc = _tabla_a_bytes(descripciones)
+        partes = [columna.tobytes() for columna in columnas] + [tabla_cat, tabla_desc]
+        crc = 0
+        for parte in partes:
+            crc = zlib.crc32(parte, crc)
+        cabecera = CABECERA_BIN.pack(MAGIA_BIN, VERSION_BIN, ultimo_id, len(columnas[0]),
+                                     len(tabla_cat), len(tabla_desc), crc)
+
+        with escritura_atomica(ruta_completa, binario=True) as f:
+            f.write(cabecera)
+            for parte in partes:
+                f.write(parte)
+
+        print("Snapshot binario guardado correctamente.")
+        return True
+
+    except Exception as e:
+        print(f"Error al guardar snapshot binario: {e}")
+        return False
+
+
+def cargar_gastos_bin(ruta):
+    """
+    Carga gastos desde el snapshot binario. Retorna lo mismo que
+    cargar_gastos_csv: (ok, gastos, orden, categorias_usadas, ultimo_id).
+    """
+    try:
+        base_dir = os.path.dirname(__file__)
+        ruta_completa = os.path.join(base_dir, ruta)
+
+        with open(ruta_completa, "rb") as f:
+            datos = memoryview(f.read())
+
+        magia, version, ultimo_id, filas, largo_cat, largo_desc, crc = \
+            CABECERA_BIN.unpack_from(datos)
+        if magia != MAGIA_BIN or version != VERSION_BIN:
+            raise ValueError("No es un snapshot de gastos compatible.")
+        contenido = datos[CABECERA_BIN.size:]
+        if zlib.crc32(contenido) != crc:
+            raise ValueError("El snapshot está dañado (CRC incorrecto).")
+
+        columnas = []
+        inicio = 0
+        for tipo in TIPOS_COLUMNAS_BIN:
+            columna = array(tipo)
+            fin = inicio + filas * columna.itemsize
+            columna.frombytes(contenido[inicio:fin])
+            if sys.byteorder == "big":
+                columna.byteswap()
+            columnas.append(columna)
+            inicio = fin
+        if len(contenido) != inicio + largo_cat + largo_desc:
+            raise ValueError("El snapshot tiene un largo inesperado.")
+        categorias = _bytes_a_tabla(contenido[inicio:inicio + largo_cat])
+        descripciones = _bytes_a_tabla(contenido[inicio + largo_cat:])
+
+        gastos = AlmacenGastos.desde_columnas(*columnas, categorias, descripciones)
+        orden = [str(num) for num in columnas[0]]
+        categorias_usadas = {categorias[c] for c in set(columnas[3])}
+
+        print("Gastos cargados correctamente desde el snapshot binario.")
+        return True, gastos, orden, categorias_usadas, ultimo_id
+
+    except FileNotFoundError:
+        return False, AlmacenGastos(), [], set(), 0
+    except Exception as e:
+        print(f"Error al cargar snapshot binario: {e}")
+        return False, AlmacenGastos(), [], set(), 0
 
 
 def guardar_calendario(ruta, calendario, ultimo_id):
     """
-    Guarda el calendario y el último ID usado.
+    Guarda el calendario (un bloque MES=aaaa/mm por cada mes con datos)
+    y el último ID usado. Las celdas fuera del mes se escriben como "-".
     """
     try:
         base_dir = os.path.dirname(__file__)
         ruta_completa = os.path.join(base_dir, ruta)
 
-        with open(ruta_completa, "w", encoding="utf-8") as f:
+        with escritura_atomica(ruta_completa) as f:
             # Guardar ID actual
             f.write(f"ULTIMO_ID={ultimo_id}\n")
             
-            # Guardar calendario
-            for fila in calendario:
-                f.write("CALENDARIO=" + ",".join(str(v) for v in fila) + "\n")
+            # Guardar calendario mes por mes
+            for (anio, mes) in sorted(calendario):
+                f.write(f"MES={anio:04d}/{mes:02d}\n")
+                for fila in calendario[(anio, mes)]:
+                    f.write("CALENDARIO=" + ",".join("-" if v is None else str(v) for v in fila) + "\n")
         
         print("Calendario guardado correctamente.")
         return True
@@ -127,13 +674,17 @@ def guardar_calendario(ruta, calendario, ultimo_id):
 
 def cargar_calendario(ruta, dias_mes):
     """
-    Carga el calendario desde archivo.
+    Carga el calendario desde archivo como {(año, mes): matriz}.
+    Un archivo del formato anterior (una sola grilla sin MES=) se toma
+    como el mes de FECHA_SISTEMA, leyendo los días en orden.
     """
     try:
         base_dir = os.path.dirname(__file__)
         ruta_completa = os.path.join(base_dir, ruta)
 
-        calendario = []
+        calendario = {}
+        filas_sin_mes = []
+        mes_actual = None
         ultimo_id = 0
         
         with open(ruta_completa, "r", encoding="utf-8") as f:
@@ -144,73 +695,287 @@ def cargar_calendario(ruta, dias_mes):
                 if linea.startswith("ULTIMO_ID="):
                     ultimo_id = int(linea.split("=")[1])
                 
+                # Inicio de un mes
+                elif linea.startswith("MES="):
+                    anio, mes = (int(x) for x in linea.split("=")[1].split("/"))
+                    mes_actual = (anio, mes)
+                    calendario[mes_actual] = []
+                
                 # Leer calendario
                 elif linea.startswith("CALENDARIO="):
-                    fila = [float(v) for v in linea.split("=")[1].split(",")]
-                    calendario.append(fila)
+                    fila = [None if v == "-" else float(v) for v in linea.split("=")[1].split(",")]
+                    if mes_actual is None:
+                        filas_sin_mes.append(fila)
+                    else:
+                        calendario[mes_actual].append(fila)
+        
+        if filas_sin_mes:
+            anio, mes = FECHA_SISTEMA
+            matriz = obtener_calendario_mes(calendario, anio, mes, crear=True)
+            valores = [v for fila in filas_sin_mes for v in fila][:dias_mes]
+            for dia, valor in enumerate(valores, 1):
+                if valor:
+                    fila, col = posicion_en_mes(anio, mes, dia)
+                    if fila < len(matriz) and matriz[fila][col] is not None:
+                        matriz[fila][col] += valor
         
         print("Calendario cargado correctamente.")
         return True, calendario, ultimo_id
         
     except FileNotFoundError:
         print("Archivo de calendario no encontrado. Se creará uno nuevo.")
-        return False, crear_calendario(dias_mes), 0
+        return False, {}, 0
     except Exception as e:
         print(f"Error al cargar calendario: {e}")
-        return False, crear_calendario(dias_mes), 0
+        return False, {}, 0
 
 
-def crear_backup_gasto(gasto):
+# ======================================================
+# FOTO DE LOS GASTOS
+# ======================================================
+# La "foto" es el estado guardado: gastos.bin (rápido de cargar),
+# gastos.csv (editable a mano) y calendario.txt (exportación).
+
+# Campos cuyo cambio altera el calendario (y el último ID de calendario.txt)
+CAMPOS_CALENDARIO = {"id", "fecha", "monto", "estado"}
+
+
+def cargar_foto(ruta_bin="gastos.bin", ruta_csv="gastos.csv"):
     """
-    Crea una copia de seguridad de un gasto antes de eliminarlo.
+    Carga la foto de los gastos: el snapshot binario si está al día, o
+    gastos.csv si es más nuevo (por ejemplo, si se editó a mano).
+    """
+    base_dir = os.path.dirname(__file__)
+    completa_bin = os.path.join(base_dir, ruta_bin)
+    completa_csv = os.path.join(base_dir, ruta_csv)
+    if os.path.exists(completa_bin) and (not os.path.exists(completa_csv) or
+                                         os.path.getmtime(completa_bin) >= os.path.getmtime(completa_csv)):
+        resultado = cargar_gastos_bin(ruta_bin)
+        if resultado[0]:
+            return resultado
+    return cargar_gastos_csv(ruta_csv)
+
+
+def guardar_foto(gastos, orden, ultimo_id, calendario):
+    """
+    Guarda gastos.csv y gastos.bin, y calendario.txt si cambió algún
+    campo que lo afecta. Si no hay cambios desde el último guardado no
+    escribe nada.
+    """
+    campos = gastos.campos_modificados()
+    if not campos:
+        print("No hay cambios para guardar.")
+        return True
+    if not guardar_gastos_csv("gastos.csv", gastos, orden):
+        return False
+    if not guardar_gastos_bin("gastos.bin", gastos, orden, ultimo_id):
+        return False
+    if campos & CAMPOS_CALENDARIO:
+        if not guardar_calendario("calendario.txt", calendario, ultimo_id):
+            return False
+    gastos.marcar_guardado()
+    return True
+
+
+# ======================================================
+# BACKUPS DE GASTOS ELIMINADOS
+# ======================================================
+# Las copias se agregan a gastos_eliminados.csv de a lotes: un solo
+# append por tanda, con una única fecha de eliminación. Al lado se
+# mantiene un índice (gastos_eliminados.csv.idx) con la posición de las
+# filas de cada ID, en el mismo formato que el índice del log:
+#   id,posición        fila de backup del gasto id
+#   F,tamaño           hasta dónde del CSV está indexado
+
+RUTA_BACKUPS = "gastos_eliminados.csv"
+CAMPOS_BACKUP = ["id", "fecha", "categoria", "descripcion",
+                 "monto", "fecha_eliminacion", "estado_original"]
+
+
+def _leer_registro_csv(f):
+    """
+    Lee desde la posición actual de un archivo binario un registro CSV
+    completo (puede ocupar varias líneas si tiene comillas).
+    """
+    registro = f.readline()
+    while registro.count(b'"') % 2:
+        siguiente = f.readline()
+        if not siguiente:
+            break
+        registro += siguiente
+    return registro
+
+
+class IndiceBackups:
+    """
+    Posiciones en bytes de las filas de backup, por ID de gasto.
+    """
+
+    def __init__(self, ruta_backup):
+        self.ruta_backup = ruta_backup
+        self.ruta = ruta_backup + ".idx"
+        self.por_id = {}
+        self.indexado = 0
+        if os.path.exists(self.ruta):
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                for entrada in f:
+                    clave, _, valor = entrada.rstrip("\n").partition(",")
+                    try:
+                        if clave == "F":
+                            self.indexado = int(valor)
+                        else:
+                            self.por_id.setdefault(int(clave), array("Q")).append(int(valor))
+                    except ValueError:
+                        continue   # entrada cortada a mitad de escritura
+        self.ponerse_al_dia()
+
+    def ponerse_al_dia(self):
+        """
+        Indexa las filas agregadas sin pasar por el índice. Si el CSV es
+        más chico que lo indexado (se reemplazó), rehace el índice.
+        """
+        tamanio = os.path.getsize(self.ruta_backup) if os.path.exists(self.ruta_backup) else 0
+        if tamanio < self.indexado:
+            self.por_id, self.indexado = {}, 0
+            os.remove(self.ruta)
+        if tamanio == self.indexado:
+            return
+        nuevas = []
+        with open(self.ruta_backup, "rb") as f:
+            f.seek(self.indexado)
+            pos = self.indexado
+            while True:
+                registro = _leer_registro_csv(f)
+                if not registro.endswith(b"\n"):
+                    break   # fin del archivo o fila a medio escribir
+                gid = registro.split(b",", 1)[0]
+                if gid.isdigit():
+                    nuevas.append((int(gid), pos))
+                pos += len(registro)
+        self.agregar(nuevas, pos)
+
+    def agregar(self, filas, indexado):
+        """
+        Anota filas (id, posición) nuevas y hasta dónde llega el índice.
+        """
+        for gid, pos in filas:
+            self.por_id.setdefault(gid, array("Q")).append(pos)
+        entradas = "".join(f"{gid},{pos}\n" for gid, pos in filas)
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(f"{entradas}F,{indexado}\n")
+        self.indexado = indexado
+
+    def buscar(self, gid):
+        """
+        Filas de backup del gasto (la más vieja primero), como diccionarios.
+        """
+        try:
+            posiciones = self.por_id.get(int(gid), ())
+        except (ValueError, TypeError):
+            return []
+        backups = []
+        with open(self.ruta_backup, "rb") as f:
+            for pos in posiciones:
+                f.seek(pos)
+                texto = _leer_registro_csv(f).decode("utf-8")
+                fila = next(csv.reader(io.StringIO(texto, newline='')))
+                backup = dict(zip(CAMPOS_BACKUP, fila))
+                backup["monto"] = float(backup["monto"])
+                backups.append(backup)
+        return backups
+
+
+_indices_backups = {}
+
+
+def indice_backups(ruta=None):
+    """
+    Índice del archivo de backups (queda en memoria entre llamadas).
+    Sin ruta, usa RUTA_BACKUPS.
+    """
+    ruta_completa = os.path.join(os.path.dirname(__file__), ruta or RUTA_BACKUPS)
+    indice = _indices_backups.get(ruta_completa)
+    if indice is None:
+        indice = _indices_backups[ruta_completa] = IndiceBackups(ruta_completa)
+    else:
+        indice.ponerse_al_dia()
+    return indice
+
+
+def crear_backups_gastos(gastos_lote, ruta=None):
+    """
+    Agrega al archivo de backups una copia de cada gasto del lote, con
+    una sola escritura y la misma fecha de eliminación para todos.
     """
     try:
-        base_dir = os.path.dirname(__file__)
-        ruta_backup = os.path.join(base_dir, "gastos_eliminados.csv")
-        
-        file_exists = os.path.isfile(ruta_backup)
-        
-        with open(ruta_backup, "a", encoding="utf-8", newline='') as f:
-            writer = csv.writer(f)
-            
-            # Escribir encabezado solo si el archivo es nuevo
-            if not file_exists:
-                writer.writerow([
-                    "id", "fecha", "categoria", "descripcion", 
-                    "monto", "fecha_eliminacion", "estado_original"
-                ])
-            
-            # Escribir gasto eliminado
+        if not gastos_lote:
+            return True
+        indice = indice_backups(ruta)
+        momento = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        cortes = [0]
+        for gasto in gastos_lote:
             writer.writerow([
                 gasto['id'],
                 gasto['fecha'],
                 gasto['categoria'],
                 gasto['descripcion'],
                 gasto['monto'],
-                datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+                momento,
                 gasto.get('estado', 'activo')
             ])
-        
+            cortes.append(buffer.tell())
+        texto = buffer.getvalue()
+        filas = [texto[a:b].encode("utf-8") for a, b in zip(cortes, cortes[1:])]
+
+        with open(indice.ruta_backup, "ab") as f:
+            pos = f.seek(0, os.SEEK_END)
+            # Escribir encabezado solo si el archivo es nuevo
+            if pos == 0:
+                encabezado = io.StringIO()
+                csv.writer(encabezado).writerow(CAMPOS_BACKUP)
+                f.write(encabezado.getvalue().encode("utf-8"))
+                pos = f.tell()
+            posiciones = []
+            for gasto, fila in zip(gastos_lote, filas):
+                posiciones.append((int(gasto['id']), pos))
+                pos += len(fila)
+            f.write(b"".join(filas))
+
+        indice.agregar(posiciones, pos)
         return True
-        
+
     except Exception as e:
         print(f"Error al crear backup: {e}")
         return False
 
 
+def crear_backup_gasto(gasto):
+    """
+    Crea una copia de seguridad de un gasto antes de eliminarlo.
+    """
+    return crear_backups_gastos([gasto])
+
+
+def buscar_backups(gid, ruta=None):
+    """
+    Copias guardadas de un gasto eliminado, sin recorrer todo el archivo.
+    """
+    try:
+        return indice_backups(ruta).buscar(gid)
+    except FileNotFoundError:
+        return []
+
+
 def registrar_log(mensaje, tipo="INFO"):
     """
-    Registra eventos en un archivo de log.
+    Registra eventos en el archivo de log. La línea se encola y la
+    escribe en lote el hilo de la bitácora.
     """
     try:
-        base_dir = os.path.dirname(__file__)
-        ruta_log = os.path.join(base_dir, "sistema.log")
-        
-        timestamp = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        
-        with open(ruta_log, "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] [{tipo}] {mensaje}\n")
-        
+        obtener_bitacora().registrar(mensaje, tipo)
         return True
         
     except Exception as e:
@@ -218,19 +983,37 @@ def registrar_log(mensaje, tipo="INFO"):
         return False
     
 
-def leer_logs():
+def registrar_logs(mensajes, tipo="INFO"):
     """
-    Lee el contenido del archivo de log.
+    Registra varios eventos de una vez (una sola entrada en la cola).
+    """
+    try:
+        obtener_bitacora().registrar_varios(mensajes, tipo)
+        return True
+
+    except Exception as e:
+        print(f"⚠️ Error al escribir log: {e}")
+        return False
+
+
+def leer_logs(cantidad=None):
+    """
+    Lee el contenido del archivo de log. Con `cantidad` retorna solo las
+    últimas líneas, leyendo el archivo desde el final.
     """
     try:
         base_dir = os.path.dirname(__file__)
         ruta_log = os.path.join(base_dir, "sistema.log")
         
+        vaciar_bitacora()
         if not os.path.exists(ruta_log):
             print(f"El archivo no existe en: {ruta_log}")
             return []
 
-        with open(ruta_log, "r", encoding="utf-8") as f:
+        if cantidad is not None:
+            return ultimas_lineas(cantidad)
+
+        with open(ruta_log, "r", encoding="utf-8", newline="") as f:
             return f.readlines()
             
     except Exception as e:
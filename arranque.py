@@ -0,0 +1,149 @@
+# ======================================================
+# ARRANQUE.PY - Tiempo de arranque de main.py
+# ======================================================
+# Ejecutar con: python arranque.py [--repeticiones N] [--salida arranque.json]
+#
+# Mide dos cosas y las compara con el presupuesto de abajo:
+#   * cuánto tarda `import main`, módulo por módulo (con -X importtime);
+#   * cuánto tarda en aparecer la primera "Opción:" del menú principal.
+# También controla que el menú principal no importe los módulos pesados
+# (se cargan en segundo plano o al abrir cada submenú). Escribe un
+# reporte JSON y termina con código 1 si algo se pasó del presupuesto.
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from statistics import median
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+
+# Presupuesto en milisegundos (medianas). Holgado a propósito: sirve para
+# detectar que volvió a importarse todo de entrada, no ruido de la máquina.
+PRESUPUESTO_MS = {
+    "importar_main": 100,
+    "primer_menu": 150,
+}
+
+# Módulos que `import main` no debe traer: son los que justifican
+# diferir la carga.
+MODULOS_DIFERIDOS = (
+    "numpy", "sqlite3", "mmap", "concurrent.futures",
+    "almacen", "archivos", "operaciones", "matrices", "diario", "bitacora",
+)
+
+PROMPT = "Opción:".encode("utf-8")
+
+
+def medir_importaciones(modulo="main"):
+    """
+    Corre `python -X importtime -c "import <modulo>"` en un proceso nuevo.
+    Retorna {nombre: (propio_ms, acumulado_ms, padre)} de todos los
+    módulos importados; padre es el módulo que lo importó (None si se
+    importó desde el nivel más alto).
+    """
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=AQUI, capture_output=True, text=True, check=True)
+    tiempos = {}
+    hijos = {}  # nivel -> módulos de ese nivel que esperan a su padre
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        # Cada nivel agrega dos espacios, y los hijos salen antes que el padre
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        nombre = nombre.strip()
+        for hijo in hijos.pop(nivel + 1, []):
+            tiempos[hijo] = tiempos[hijo][:2] + (nombre,)
+        hijos.setdefault(nivel, []).append(nombre)
+        tiempos[nombre] = (int(propio) / 1000, int(acumulado) / 1000, None)
+    return tiempos
+
+
+def medir_primer_menu(tiempo_maximo=30):
+    """
+    Arranca main.py y mide los ms hasta que imprime el primer "Opción:".
+    Después lo corta sin elegir ninguna opción.
+    """
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen([sys.executable, "-u", "main.py"], cwd=AQUI,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL)
+    leido = b""
+    try:
+        while PROMPT not in leido:
+            bloque = os.read(proceso.stdout.fileno(), 4096)
+            if not bloque or time.perf_counter() - inicio > tiempo_maximo:
+                raise RuntimeError("main.py terminó o tardó demasiado sin mostrar el menú")
+            leido += bloque
+        return (time.perf_counter() - inicio) * 1000
+    finally:
+        proceso.kill()
+        proceso.wait()
+        proceso.stdin.close()
+        proceso.stdout.close()
+
+
+def armar_reporte(repeticiones=5):
+    """
+    Junta las mediciones (medianas de `repeticiones` corridas) y el
+    control contra el presupuesto.
+    """
+    corridas = [medir_importaciones() for _ in range(repeticiones)]
+    corridas.sort(key=lambda c: c["main"][1])
+    importaciones = corridas[len(corridas) // 2]
+    primer_menu = median(medir_primer_menu() for _ in range(repeticiones))
+
+    medido = {
+        "importar_main": round(importaciones["main"][1], 1),
+        "primer_menu": round(primer_menu, 1),
+    }
+    excedidos = [clave for clave, limite in PRESUPUESTO_MS.items() if medido[clave] > limite]
+    importados = [m for m in MODULOS_DIFERIDOS if m in importaciones]
+    return {
+        "python": sys.version.split()[0],
+        "repeticiones": repeticiones,
+        "medido_ms": medido,
+        "presupuesto_ms": PRESUPUESTO_MS,
+        # Lo que importa main directamente y los más caros por sí mismos
+        "importaciones_de_main_ms": {
+            nombre: acumulado for nombre, (_, acumulado, padre) in
+            sorted(importaciones.items(), key=lambda x: -x[1][1]) if padre == "main"
+        },
+        "modulos_mas_lentos_ms": {
+            nombre: propio for nombre, (propio, _, _) in
+            sorted(importaciones.items(), key=lambda x: -x[1][0])[:10]
+        },
+        "excedidos": excedidos,
+        "diferidos_importados": importados,
+        "ok": not excedidos and not importados,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mide el arranque de main.py.")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", help="Archivo JSON para el reporte (por defecto, pantalla)")
+    args = parser.parse_args(argv)
+
+    reporte = armar_reporte(args.repeticiones)
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    for clave in reporte["excedidos"]:
+        print(f"REGRESIÓN: {clave} tardó {reporte['medido_ms'][clave]} ms "
+              f"(presupuesto {PRESUPUESTO_MS[clave]} ms)", file=sys.stderr)
+    for modulo in reporte["diferidos_importados"]:
+        print(f"REGRESIÓN: `import main` trae {modulo}", file=sys.stderr)
+    return 0 if reporte["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
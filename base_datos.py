@@ -0,0 +1,343 @@
+# ======================================================
+# BASE_DATOS.PY - Almacenamiento en SQLite
+# ======================================================
+# Misma interfaz que las funciones de archivos.py (cargar/guardar gastos,
+# cargar calendario y backup de eliminados) pero sobre una base sqlite3.
+#
+# GastosSQLite permite además consultar la base sin cargarla: se usa como
+# un diccionario de solo lectura y los filtros de operaciones.py se
+# resuelven con consultas SQL sobre los índices.
+
+import os
+import sqlite3
+from collections.abc import Mapping
+from datetime import datetime
+
+from almacen import AlmacenGastos, es_almacen, fecha_a_ordinal
+from indices import normalizar_texto
+from matrices import calendario_desde_columnas
+
+RUTA_BASE = "gastos.db"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS gastos (
+    id          INTEGER PRIMARY KEY,
+    fecha       TEXT    NOT NULL,
+    ordinal     INTEGER NOT NULL,
+    categoria   TEXT    NOT NULL,
+    descripcion TEXT    NOT NULL,
+    monto       REAL    NOT NULL,
+    estado      TEXT    NOT NULL DEFAULT 'activo',
+    posicion    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_gastos_fecha     ON gastos (estado, ordinal, id);
+CREATE INDEX IF NOT EXISTS idx_gastos_categoria ON gastos (estado, categoria, ordinal, id);
+CREATE INDEX IF NOT EXISTS idx_gastos_monto     ON gastos (estado, monto);
+CREATE INDEX IF NOT EXISTS idx_gastos_posicion  ON gastos (posicion);
+
+CREATE TABLE IF NOT EXISTS gastos_eliminados (
+    id                INTEGER NOT NULL,
+    fecha             TEXT    NOT NULL,
+    categoria         TEXT    NOT NULL,
+    descripcion       TEXT    NOT NULL,
+    monto             REAL    NOT NULL,
+    fecha_eliminacion TEXT    NOT NULL,
+    estado_original   TEXT    NOT NULL
+);
+"""
+
+COLUMNAS = "id, fecha, categoria, descripcion, monto, estado"
+LOTE_IDS = 500   # IDs por consulta "id IN (...)" (SQLite limita los parámetros)
+
+
+def conectar(ruta=RUTA_BASE):
+    """
+    Abre la base (creándola si no existe) en modo WAL.
+    """
+    base_dir = os.path.dirname(__file__)
+    conexion = sqlite3.connect(os.path.join(base_dir, ruta))
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    conexion.executescript(ESQUEMA)
+    return conexion
+
+
+def _fila_a_gasto(fila):
+    gid, fecha, categoria, descripcion, monto, estado = fila
+    return {
+        "id": str(gid),
+        "fecha": fecha,
+        "monto": monto,
+        "categoria": categoria,
+        "descripcion": descripcion,
+        "estado": estado
+    }
+
+
+# ======================================================
+# CONSULTAS SOBRE LA BASE (SIN CARGARLA)
+# ======================================================
+
+class GastosSQLite(Mapping):
+    """
+    Vista de solo lectura ID -> gasto sobre la tabla de gastos.
+    Los filtros devuelven gastos activos ordenados por fecha y usan los
+    índices de la base, así que nunca se recorre la tabla en Python.
+    """
+
+    def __init__(self, ruta=RUTA_BASE):
+        self.conexion = conectar(ruta)
+        # Para buscar texto sin distinguir mayúsculas ni tildes desde SQL
+        self.conexion.create_function("normalizar", 1, normalizar_texto, deterministic=True)
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __getitem__(self, gid):
+        try:
+            num = int(gid)
+        except (ValueError, TypeError):
+            raise KeyError(gid)
+        fila = self.conexion.execute(
+            f"SELECT {COLUMNAS} FROM gastos WHERE id = ?", (num,)).fetchone()
+        if fila is None:
+            raise KeyError(gid)
+        return _fila_a_gasto(fila)
+
+    def __contains__(self, gid):
+        try:
+            self[gid]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        cursor = self.conexion.execute("SELECT id FROM gastos ORDER BY posicion")
+        return (str(gid) for (gid,) in cursor)
+
+    def __len__(self):
+        return self.conexion.execute("SELECT COUNT(*) FROM gastos").fetchone()[0]
+
+    def _activos(self, condicion="1", parametros=(), orden="ordinal, id"):
+        cursor = self.conexion.execute(
+            f"SELECT {COLUMNAS} FROM gastos WHERE estado = 'activo' AND {condicion} "
+            f"ORDER BY {orden}", parametros)
+        return [_fila_a_gasto(fila) for fila in cursor]
+
+    def activos(self):
+        """
+        Todos los gastos activos, ordenados por fecha.
+        """
+        return self._activos()
+
+    def filtrar_por_categoria(self, categoria):
+        return self._activos("categoria = ?", (categoria,))
+
+    def filtrar_por_fecha(self, fecha):
+        return self._activos("ordinal = ?", (fecha_a_ordinal(fecha),), orden="id")
+
+    def filtrar_rango_fechas(self, fecha_desde, fecha_hasta):
+        return self._activos("ordinal BETWEEN ? AND ?",
+                             (fecha_a_ordinal(fecha_desde), fecha_a_ordinal(fecha_hasta)))
+
+    def filtrar_por_monto_mayor(self, umbral):
+        return self._activos("monto > ?", (umbral,))
+
+    def buscar_por_palabra(self, palabra):
+        """
+        Gastos (activos y eliminados, como en el almacén) cuya descripción
+        contiene la palabra, ordenados por ID.
+        """
+        cursor = self.conexion.execute(
+            f"SELECT {COLUMNAS} FROM gastos WHERE instr(normalizar(descripcion), ?) > 0 "
+            f"ORDER BY id", (normalizar_texto(palabra),))
+        return [_fila_a_gasto(fila) for fila in cursor]
+
+    def ids_activos(self, categoria=None, monto_mayor=None):
+        """
+        IDs de los gastos activos, filtrados en la base.
+        """
+        condiciones, parametros = ["estado = 'activo'"], []
+        if categoria is not None:
+            condiciones.append("categoria = ?")
+            parametros.append(categoria)
+        if monto_mayor is not None:
+            condiciones.append("monto > ?")
+            parametros.append(monto_mayor)
+        cursor = self.conexion.execute(
+            f"SELECT id FROM gastos WHERE {' AND '.join(condiciones)}", parametros)
+        return {str(gid) for (gid,) in cursor}
+
+    def gastos_por_ids(self, ids):
+        """
+        Gastos activos con esos IDs, ordenados por fecha (los IDs que no
+        existen se ignoran).
+        """
+        nums = sorted({int(gid) for gid in ids if str(gid).isdigit()})
+        gastos = []
+        for inicio in range(0, len(nums), LOTE_IDS):
+            parte = nums[inicio:inicio + LOTE_IDS]
+            gastos.extend(self._activos(f"id IN ({', '.join('?' * len(parte))})", parte))
+        gastos.sort(key=lambda g: (fecha_a_ordinal(g["fecha"]), int(g["id"])))
+        return gastos
+
+    def agrupar_por_categoria(self):
+        """
+        {categoría: gastos activos ordenados por fecha}, con una sola consulta.
+        """
+        grupos = {}
+        for gasto in self._activos():
+            grupos.setdefault(gasto["categoria"], []).append(gasto)
+        return grupos
+
+    # Agregados: los calcula SQLite sin pasar las filas a Python
+
+    def suma_por_categoria(self):
+        return dict(self.conexion.execute(
+            "SELECT categoria, SUM(monto) FROM gastos WHERE estado = 'activo' GROUP BY categoria"))
+
+    def estadisticas(self):
+        """
+        (cantidad, total, mínimo, máximo) de los gastos activos.
+        """
+        return self.conexion.execute(
+            "SELECT COUNT(*), TOTAL(monto), MIN(monto), MAX(monto) "
+            "FROM gastos WHERE estado = 'activo'").fetchone()
+
+    def columnas_fecha_monto(self):
+        """
+        Columnas (ordinales de fecha, montos) de los gastos activos.
+        """
+        filas = self.conexion.execute(
+            "SELECT ordinal, monto FROM gastos WHERE estado = 'activo'").fetchall()
+        return [ordinal for ordinal, _ in filas], [monto for _, monto in filas]
+
+
+def es_sqlite(gastos):
+    """
+    Indica si los gastos son una vista sobre la base SQLite.
+    """
+    return isinstance(gastos, GastosSQLite)
+
+
+# ======================================================
+# CARGA Y GUARDADO (MISMO CONTRATO QUE ARCHIVOS.PY)
+# ======================================================
+
+def guardar_gastos_sqlite(ruta, gastos, orden):
+    """
+    Reemplaza el contenido de la tabla de gastos en una sola transacción.
+    """
+    try:
+        if es_almacen(gastos):
+            filas = (
+                (gid, fecha, fecha_a_ordinal(fecha), categoria, descripcion, monto, estado, posicion)
+                for posicion, (gid, fecha, categoria, descripcion, monto, estado)
+                in enumerate(gastos.filas_csv(orden))
+            )
+        else:
+            filas = (
+                (int(g["id"]), g["fecha"], fecha_a_ordinal(g["fecha"]), g["categoria"],
+                 g["descripcion"], g["monto"], g.get("estado", "activo"), posicion)
+                for posicion, g in enumerate(gastos[gid] for gid in orden if gid in gastos)
+            )
+
+        conexion = conectar(ruta)
+        try:
+            with conexion:
+                conexion.execute("DELETE FROM gastos")
+                conexion.executemany(
+                    "INSERT INTO gastos (id, fecha, ordinal, categoria, descripcion, monto, "
+                    "estado, posicion) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", filas)
+        finally:
+            conexion.close()
+
+        print("Gastos guardados correctamente en SQLite.")
+        return True
+
+    except Exception as e:
+        print(f"Error al guardar gastos en SQLite: {e}")
+        return False
+
+
+def cargar_gastos_sqlite(ruta=RUTA_BASE):
+    """
+    Carga todos los gastos de la base a un almacén columnar.
+    Retorna (ok, gastos, orden, categorias_usadas, ultimo_id).
+    """
+    try:
+        conexion = conectar(ruta)
+        try:
+            cursor = conexion.execute(
+                "SELECT id, ordinal, monto, categoria, descripcion, estado "
+                "FROM gastos ORDER BY posicion")
+            ids, ordinales, montos, cats, descs, estados = [], [], [], [], [], []
+            codigos_cat, codigos_desc = {}, {}
+            for gid, ordinal, monto, categoria, descripcion, estado in cursor:
+                ids.append(gid)
+                ordinales.append(ordinal)
+                montos.append(monto)
+                cats.append(codigos_cat.setdefault(categoria, len(codigos_cat)))
+                descs.append(codigos_desc.setdefault(descripcion, len(codigos_desc)))
+                estados.append(0 if estado == "activo" else 1)
+        finally:
+            conexion.close()
+
+        gastos = AlmacenGastos.desde_columnas(ids, ordinales, montos, cats, descs, estados,
+                                             list(codigos_cat), list(codigos_desc))
+        orden = [str(gid) for gid in ids]
+        ultimo_id = max(ids, default=0)
+
+        print("Gastos cargados correctamente desde SQLite.")
+        return True, gastos, orden, set(codigos_cat), ultimo_id
+
+    except Exception as e:
+        print(f"Error al cargar gastos desde SQLite: {e}")
+        return False, AlmacenGastos(), [], set(), 0
+
+
+def cargar_calendario_sqlite(ruta=RUTA_BASE, dias_mes=None):
+    """
+    Arma el calendario con la suma por día que calcula la base.
+    Retorna (ok, calendario, ultimo_id). dias_mes se acepta por
+    compatibilidad con cargar_calendario y no se usa.
+    """
+    try:
+        conexion = conectar(ruta)
+        try:
+            sumas = conexion.execute(
+                "SELECT ordinal, SUM(monto) FROM gastos WHERE estado = 'activo' "
+                "GROUP BY ordinal").fetchall()
+            ultimo_id = conexion.execute("SELECT COALESCE(MAX(id), 0) FROM gastos").fetchone()[0]
+        finally:
+            conexion.close()
+
+        calendario = calendario_desde_columnas([o for o, _ in sumas], [s for _, s in sumas])
+        print("Calendario cargado correctamente desde SQLite.")
+        return True, calendario, ultimo_id
+
+    except Exception as e:
+        print(f"Error al cargar calendario desde SQLite: {e}")
+        return False, {}, 0
+
+
+def crear_backup_gasto_sqlite(gasto, ruta=RUTA_BASE):
+    """
+    Guarda una copia del gasto en la tabla gastos_eliminados.
+    """
+    try:
+        conexion = conectar(ruta)
+        try:
+            with conexion:
+                conexion.execute(
+                    "INSERT INTO gastos_eliminados VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (int(gasto["id"]), gasto["fecha"], gasto["categoria"], gasto["descripcion"],
+                     gasto["monto"], datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+                     gasto.get("estado", "activo")))
+        finally:
+            conexion.close()
+        return True
+
+    except Exception as e:
+        print(f"Error al crear backup: {e}")
+        return False
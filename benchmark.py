@@ -0,0 +1,360 @@
+# ======================================================
+# BENCHMARK.PY - Tiempos de operaciones, matrices, recursivos y archivos
+# ======================================================
+# Ejecutar con: python benchmark.py [--tamanios 1000 100000] [--repeticiones 3]
+#                                   [--grupos filtros ids ...] [--salida bench.json]
+#                                   [--comparar bench_anterior.json] [--realista]
+#
+# Arma libros sintéticos del tamaño pedido (1.000 y 100.000 gastos por
+# defecto; 1.000.000 y 10.000.000 hay que pedirlos, necesitan varios GB
+# de memoria) y mide cada función pública sobre el almacén columnar.
+# Con --realista los gastos salen de generador.py (categorías hoja,
+# montos log-normales, estacionalidad); si no, son uniformes y más
+# rápidos de armar.
+# El resultado sale en JSON; con --comparar se marcan las funciones que
+# se pusieron más lentas que en otro reporte (por ejemplo, de otro commit).
+
+import os
+import io
+import sys
+import json
+import random
+import argparse
+import platform
+import subprocess
+import tempfile
+from array import array
+from contextlib import redirect_stdout
+from datetime import date, datetime
+from statistics import median
+from time import perf_counter
+
+import matrices
+from almacen import AlmacenGastos, ordinal_a_fecha
+from bitacora import configurar_bitacora, cerrar_bitacora
+from constantes import CATEGORIAS_TUPLA
+from analisis_recursivo import (
+    CATEGORIAS_JERARQUICAS, buscar_categoria_recursiva, nombres_categorias_recursivo,
+    contar_gastos_por_categoria_recursiva, calcular_total_recursivo, generar_reporte_recursivo,
+    sumar_lista_recursiva, encontrar_maximo_recursivo, filtrar_gastos_recursivo
+)
+from operaciones import (
+    buscar_gastos_por_palabra, buscar_gastos_por_prefijo,
+    filtrar_por_categoria, filtrar_por_fecha, filtrar_por_monto_mayor, filtrar_rango_fechas,
+    ids_por_categoria, ids_por_monto_mayor, ids_por_categoria_y_monto, gastos_por_ids,
+    obtener_gastos_activos, obtener_gastos_eliminados, cantidad_gastos_activos,
+    gastos_por_categoria, resumen_por_categoria, resumen_estadistico, total_montos,
+    promedio_gastos, obtener_montos_con_iva, gastos_importantes, numeros_en_descripciones,
+    categorias_faltantes, porcentaje_cobertura,
+    gastos_ordenados_por_monto, gastos_ordenados_por_fecha, primeros_gastos, ultimos_gastos,
+    agregar_gasto, construir_calendario
+)
+from generador import generar_gastos, volcar_en_almacen
+from archivos import (
+    guardar_gastos_csv, cargar_gastos_csv, cargar_gastos_csv_paralelo,
+    guardar_gastos_bin, cargar_gastos_bin, guardar_calendario
+)
+
+TAMANIOS = (1000, 100_000)
+GRUPOS = ("filtros", "ids", "resumen", "orden", "calendario", "recursivos", "archivos", "agregar")
+
+# Las funciones recursivas de apoyo bajan un nivel por elemento: con
+# listas más largas que esto se pasarían del límite de recursión.
+LARGO_RECURSIVO = 500
+# Cantidad de gastos que se insertan de a uno para medir agregar_gasto
+INSERCIONES = 1000
+# Una función se marca como regresión si tarda esto más que la anterior
+TOLERANCIA = 1.25
+
+PALABRAS = ("Compra", "Pago", "Cuota", "Carga", "Factura", "Recarga", "Ticket",
+            "Abono", "Servicio", "Pedido", "Entrada", "Reserva")
+
+
+# ======================================================
+# LIBRO SINTÉTICO
+# ======================================================
+
+def armar_libro(n, semilla=42, anios=3, eliminados=0.05, realista=False):
+    """
+    Arma un almacén con n gastos repartidos parejo en `anios` años que
+    terminan el 31/12/2025, ya ordenados por fecha (el ID crece con la
+    fecha). Una fracción `eliminados` queda en la papelera. Con realista,
+    los gastos los arma generar_gastos.
+    Retorna (gastos, orden, categorias_usadas, ultimo_id).
+    """
+    if realista:
+        return volcar_en_almacen(generar_gastos(
+            n, f"01/01/{2025 - anios + 1}", "31/12/2025", eliminados, semilla=semilla))
+
+    azar = random.Random(semilla)
+    inicio = date(2025 - anios + 1, 1, 1).toordinal()
+    dias = date(2025, 12, 31).toordinal() - inicio + 1
+    pool = [f"{azar.choice(PALABRAS)} {i}" for i in range(min(n, 5000) or 1)]
+
+    ids = array("q", range(1, n + 1))
+    fechas = array("i", (inicio + i * dias // n for i in range(n)))
+    montos = array("d", (round(azar.lognormvariate(9, 1), 2) for _ in range(n)))
+    categorias = array("H", (azar.randrange(len(CATEGORIAS_TUPLA)) for _ in range(n)))
+    descripciones = array("I", (azar.randrange(len(pool)) for _ in range(n)))
+    estados = array("B", (azar.random() < eliminados for _ in range(n)))
+
+    gastos = AlmacenGastos.desde_columnas(ids, fechas, montos, categorias, descripciones,
+                                          estados, CATEGORIAS_TUPLA, pool)
+    return gastos, [str(num) for num in ids], set(CATEGORIAS_TUPLA), n
+
+
+# ======================================================
+# MEDICIÓN
+# ======================================================
+
+def medir(funcion, repeticiones):
+    """
+    Corre la función `repeticiones` veces (con la salida descartada) y
+    retorna {"mejor_ms", "mediana_ms"}.
+    """
+    tiempos = []
+    with redirect_stdout(io.StringIO()):
+        for _ in range(repeticiones):
+            inicio = perf_counter()
+            resultado = funcion()
+            # Los generadores se consumen para medir el trabajo completo
+            if hasattr(resultado, "__next__"):
+                for _ in resultado:
+                    pass
+            tiempos.append(perf_counter() - inicio)
+    return {"mejor_ms": round(min(tiempos) * 1000, 4),
+            "mediana_ms": round(median(tiempos) * 1000, 4)}
+
+
+def pruebas_de_lectura(gastos, orden, categorias_usadas, calendario):
+    """
+    Las funciones a medir, como {grupo: {nombre: función sin argumentos}}.
+    Ninguna modifica el libro.
+    """
+    medio = orden[len(orden) // 2] if orden else "1"
+    fecha = gastos[medio]["fecha"] if orden else "01/01/2025"
+    mes = (int(fecha[6:]), int(fecha[3:5]))
+    # La categoría del gasto del medio: existe con datos uniformes y realistas
+    categoria = gastos[medio]["categoria"] if orden else "Ocio"
+    ids_ = ids_por_categoria(gastos, categoria)
+    montos = [gastos[gid]["monto"] for gid in orden[:LARGO_RECURSIVO]]
+    lista = [gastos[gid] for gid in orden[:LARGO_RECURSIVO]]
+
+    return {
+        "filtros": {
+            "filtrar_por_categoria": lambda: filtrar_por_categoria(gastos, categoria),
+            "filtrar_por_fecha": lambda: filtrar_por_fecha(gastos, fecha),
+            "filtrar_por_monto_mayor": lambda: filtrar_por_monto_mayor(gastos, 50_000),
+            "filtrar_rango_fechas (un mes)": lambda: filtrar_rango_fechas(
+                gastos, "01" + fecha[2:], "28" + fecha[2:]),
+            "buscar_gastos_por_palabra": lambda: buscar_gastos_por_palabra(gastos, "factura"),
+            "buscar_gastos_por_prefijo": lambda: buscar_gastos_por_prefijo(gastos, "fac"),
+        },
+        "ids": {
+            "ids_por_categoria": lambda: ids_por_categoria(gastos, categoria),
+            "ids_por_monto_mayor": lambda: ids_por_monto_mayor(gastos, 50_000),
+            "ids_por_categoria_y_monto": lambda: ids_por_categoria_y_monto(gastos, categoria, 50_000),
+            "gastos_por_ids": lambda: gastos_por_ids(gastos, ids_),
+        },
+        "resumen": {
+            "obtener_gastos_activos": lambda: obtener_gastos_activos(gastos),
+            "obtener_gastos_eliminados": lambda: obtener_gastos_eliminados(gastos),
+            "cantidad_gastos_activos": lambda: cantidad_gastos_activos(gastos),
+            "gastos_por_categoria": lambda: gastos_por_categoria(gastos),
+            "resumen_por_categoria": lambda: resumen_por_categoria(gastos),
+            "resumen_estadistico": lambda: resumen_estadistico(gastos),
+            "total_montos": lambda: total_montos(gastos),
+            "promedio_gastos": lambda: promedio_gastos(gastos),
+            "obtener_montos_con_iva": lambda: obtener_montos_con_iva(gastos),
+            "gastos_importantes": lambda: gastos_importantes(gastos, 50_000),
+            "numeros_en_descripciones": lambda: numeros_en_descripciones(gastos),
+            "categorias_faltantes": lambda: categorias_faltantes(categorias_usadas),
+            "porcentaje_cobertura": lambda: porcentaje_cobertura(categorias_usadas),
+        },
+        "orden": {
+            "gastos_ordenados_por_monto": lambda: gastos_ordenados_por_monto(gastos),
+            "gastos_ordenados_por_fecha": lambda: gastos_ordenados_por_fecha(gastos),
+            "primeros_gastos": lambda: primeros_gastos(gastos, orden),
+            "ultimos_gastos": lambda: ultimos_gastos(gastos, orden),
+        },
+        "calendario": {
+            "construir_calendario": lambda: construir_calendario(gastos),
+            "dia_con_mayor_gasto_periodo": lambda: matrices.dia_con_mayor_gasto_periodo(calendario),
+            "total_por_semana_periodo": lambda: matrices.total_por_semana_periodo(calendario),
+            "total_por_dia_semana_periodo": lambda: matrices.total_por_dia_semana_periodo(calendario),
+            "dias_sin_gastos_mes": lambda: matrices.dias_sin_gastos_mes(calendario, *mes),
+            "recorrer_dias": lambda: matrices.recorrer_dias(calendario),
+        },
+        "recursivos": {
+            "buscar_categoria_recursiva": lambda: buscar_categoria_recursiva(
+                CATEGORIAS_JERARQUICAS, "Telefonía"),
+            "nombres_categorias_recursivo": lambda: nombres_categorias_recursivo(CATEGORIAS_JERARQUICAS),
+            "contar_gastos_por_categoria_recursiva": lambda: contar_gastos_por_categoria_recursiva(
+                gastos, CATEGORIAS_JERARQUICAS, "Ocio"),
+            "calcular_total_recursivo": lambda: calcular_total_recursivo(
+                gastos, CATEGORIAS_JERARQUICAS, "Ocio"),
+            "generar_reporte_recursivo": lambda: generar_reporte_recursivo(
+                gastos, CATEGORIAS_JERARQUICAS, "Servicios"),
+            f"sumar_lista_recursiva ({len(montos)})": lambda: sumar_lista_recursiva(montos),
+            f"encontrar_maximo_recursivo ({len(montos)})": lambda: encontrar_maximo_recursivo(montos),
+            f"filtrar_gastos_recursivo ({len(lista)})": lambda: filtrar_gastos_recursivo(lista, 50_000),
+        },
+    }
+
+
+def pruebas_de_archivos(gastos, orden, ultimo_id, calendario, carpeta):
+    """
+    Guardado y carga en `carpeta`. Cada carga lee lo que dejó su guardado,
+    así que el orden del diccionario importa.
+    """
+    csv_ = os.path.join(carpeta, "gastos.csv")
+    bin_ = os.path.join(carpeta, "gastos.bin")
+    return {
+        "guardar_gastos_csv": lambda: guardar_gastos_csv(csv_, gastos, orden),
+        "cargar_gastos_csv": lambda: cargar_gastos_csv(csv_),
+        "cargar_gastos_csv_paralelo": lambda: cargar_gastos_csv_paralelo(csv_),
+        "guardar_gastos_bin": lambda: guardar_gastos_bin(bin_, gastos, orden, ultimo_id),
+        "cargar_gastos_bin": lambda: cargar_gastos_bin(bin_),
+        "guardar_calendario": lambda: guardar_calendario(
+            os.path.join(carpeta, "calendario.txt"), calendario, ultimo_id),
+    }
+
+
+def medir_insercion(gastos, orden, categorias_usadas, calendario, ultimo_id, semilla=7):
+    """
+    Inserta INSERCIONES gastos de a uno con agregar_gasto, en fechas al
+    azar (cada uno cae en el medio del orden, el peor caso de la lista).
+    Retorna los ms por inserción. Modifica el libro.
+    """
+    azar = random.Random(semilla)
+    inicio, fin = date(2023, 1, 1).toordinal(), date(2025, 12, 31).toordinal()
+    nuevos = [(ordinal_a_fecha(azar.randint(inicio, fin)), round(azar.lognormvariate(9, 1), 2),
+               azar.choice(CATEGORIAS_TUPLA), f"{azar.choice(PALABRAS)} nuevo")
+              for _ in range(INSERCIONES)]
+    with redirect_stdout(io.StringIO()):
+        t0 = perf_counter()
+        for fecha, monto, categoria, descripcion in nuevos:
+            ultimo_id = agregar_gasto(gastos, orden, categorias_usadas, calendario,
+                                      ultimo_id, fecha, monto, categoria, descripcion)
+        total = perf_counter() - t0
+    ms = round(total * 1000 / INSERCIONES, 4)
+    return {"agregar_gasto (por gasto)": {"mejor_ms": ms, "mediana_ms": ms}}
+
+
+def medir_tamanio(n, grupos, repeticiones, semilla=42, realista=False):
+    """
+    Arma un libro de n gastos y mide los grupos pedidos.
+    Retorna {"armado_s": ..., grupo: {función: tiempos}}.
+    """
+    t0 = perf_counter()
+    gastos, orden, categorias_usadas, ultimo_id = armar_libro(n, semilla, realista=realista)
+    calendario = construir_calendario(gastos)
+    resultado = {"armado_s": round(perf_counter() - t0, 3)}
+
+    lectura = pruebas_de_lectura(gastos, orden, categorias_usadas, calendario)
+    for grupo in grupos:
+        if grupo in lectura:
+            resultado[grupo] = {nombre: medir(f, repeticiones) for nombre, f in lectura[grupo].items()}
+
+    if "archivos" in grupos:
+        with tempfile.TemporaryDirectory() as carpeta:
+            pruebas = pruebas_de_archivos(gastos, orden, ultimo_id, calendario, carpeta)
+            resultado["archivos"] = {nombre: medir(f, repeticiones) for nombre, f in pruebas.items()}
+
+    # Al final porque agrega gastos al libro
+    if "agregar" in grupos:
+        resultado["agregar"] = medir_insercion(gastos, orden, categorias_usadas, calendario, ultimo_id)
+    return resultado
+
+
+# ======================================================
+# REPORTE
+# ======================================================
+
+def commit_actual():
+    """
+    Hash corto del commit de git, o None fuera de un repositorio.
+    """
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return salida.stdout.strip() or None
+
+
+def comparar(actual, anterior, tolerancia=TOLERANCIA):
+    """
+    Funciones que tardan más de `tolerancia` veces lo que tardaban en el
+    reporte anterior (comparando el mejor tiempo), como tuplas
+    (tamaño, grupo, función, ms antes, ms ahora).
+    """
+    regresiones = []
+    for n, grupos in actual["resultados"].items():
+        for grupo, funciones in grupos.items():
+            if not isinstance(funciones, dict):
+                continue
+            previas = anterior.get("resultados", {}).get(n, {}).get(grupo, {})
+            for nombre, tiempos in funciones.items():
+                if nombre not in previas:
+                    continue
+                antes, ahora = previas[nombre]["mejor_ms"], tiempos["mejor_ms"]
+                if ahora > antes * tolerancia and ahora - antes > 0.01:
+                    regresiones.append((n, grupo, nombre, antes, ahora))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del gestor de gastos (salida JSON).")
+    parser.add_argument("--tamanios", type=int, nargs="+", default=list(TAMANIOS),
+                        help="Cantidad de gastos de cada libro (por ejemplo 1000 100000 1000000 10000000)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--grupos", nargs="+", choices=GRUPOS, default=list(GRUPOS))
+    parser.add_argument("--salida", help="Archivo JSON para el reporte (por defecto, pantalla)")
+    parser.add_argument("--comparar", help="Reporte anterior: avisa qué se puso más lento")
+    parser.add_argument("--realista", action="store_true",
+                        help="Arma los libros con generador.py en lugar de datos uniformes")
+    args = parser.parse_args(argv)
+
+    reporte = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "numpy": matrices.USAR_NUMPY,
+        "repeticiones": args.repeticiones,
+        "datos": "realistas" if args.realista else "uniformes",
+        "resultados": {},
+    }
+    # Los logs de agregar_gasto y de las cargas van a un archivo temporal
+    with tempfile.TemporaryDirectory() as carpeta_log:
+        configurar_bitacora(os.path.join(carpeta_log, "benchmark.log"), indexar=False)
+        try:
+            for n in args.tamanios:
+                print(f"Midiendo {n:,} gastos...", file=sys.stderr)
+                reporte["resultados"][str(n)] = medir_tamanio(
+                    n, args.grupos, args.repeticiones, realista=args.realista)
+        finally:
+            cerrar_bitacora()
+
+    texto = json.dumps(reporte, ensure_ascii=False, indent=2)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+    if not args.comparar:
+        return 0
+    with open(args.comparar, encoding="utf-8") as f:
+        anterior = json.load(f)
+    if anterior.get("datos", "uniformes") != reporte["datos"]:
+        print("AVISO: los reportes usan datos distintos; la comparación no es pareja.", file=sys.stderr)
+    regresiones = comparar(reporte, anterior)
+    for n, grupo, nombre, antes, ahora in regresiones:
+        print(f"MÁS LENTO: {nombre} con {int(n):,} gastos ({grupo}): "
+              f"{antes:.3f} ms -> {ahora:.3f} ms", file=sys.stderr)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# ======================================================
+# BENCHMARK_MATRICES.PY - Comparación de backends del calendario
+# ======================================================
+# Ejecutar con: python benchmark_matrices.py [años] [repeticiones]
+#
+# Arma un calendario con un gasto por día durante varios años (10 por
+# defecto) y mide las estadísticas con el backend Python y con NumPy.
+
+import random
+import sys
+from datetime import date, timedelta
+from timeit import timeit
+
+import matrices
+from matrices import (
+    agregar_monto_a_fecha, calendario_a_array, usar_numpy,
+    dia_con_mayor_gasto, total_por_semana, total_por_dia_semana,
+    dias_con_gasto_mayor, dias_con_gastos,
+    dia_con_mayor_gasto_periodo, total_por_semana_periodo,
+    total_por_dia_semana_periodo
+)
+
+
+def generar_calendarios(anios, semilla=42):
+    """
+    Un gasto aleatorio por día desde el 01/01 de hace `anios` años.
+    """
+    azar = random.Random(semilla)
+    calendarios = {}
+    dia = date(2025 - anios + 1, 1, 1)
+    fin = date(2025, 12, 31)
+    while dia <= fin:
+        agregar_monto_a_fecha(calendarios, dia.strftime("%d/%m/%Y"), round(azar.uniform(0, 50000), 2))
+        dia += timedelta(days=1)
+    return calendarios
+
+
+def medir(calendarios, repeticiones):
+    """
+    Tiempo total (segundos) de cada estadística con el backend activo.
+    """
+    if matrices.USAR_NUMPY:
+        meses = [calendario_a_array(m) for m in calendarios.values()]
+    else:
+        meses = list(calendarios.values())
+
+    pruebas = {
+        "dia_con_mayor_gasto (por mes)": lambda: [dia_con_mayor_gasto(m) for m in meses],
+        "total_por_semana (por mes)": lambda: [total_por_semana(m) for m in meses],
+        "total_por_dia_semana (por mes)": lambda: [total_por_dia_semana(m) for m in meses],
+        "dias_con_gasto_mayor (por mes)": lambda: [dias_con_gasto_mayor(m, 25000) for m in meses],
+        "dias_con_gastos (por mes)": lambda: [dias_con_gastos(m) for m in meses],
+        "dia_con_mayor_gasto_periodo": lambda: dia_con_mayor_gasto_periodo(calendarios),
+        "total_por_semana_periodo": lambda: total_por_semana_periodo(calendarios),
+        "total_por_dia_semana_periodo": lambda: total_por_dia_semana_periodo(calendarios),
+    }
+    return {nombre: timeit(prueba, number=repeticiones) for nombre, prueba in pruebas.items()}
+
+
+def main():
+    anios = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    calendarios = generar_calendarios(anios)
+    print(f"Calendario de {anios} años ({len(calendarios)} meses), {repeticiones} repeticiones\n")
+
+    usar_numpy(False)
+    python = medir(calendarios, repeticiones)
+
+    if not usar_numpy(True):
+        print("NumPy no está instalado: solo se mide el backend Python.\n")
+        for nombre, t in python.items():
+            print(f"{nombre:<34} {t * 1000 / repeticiones:>10.3f} ms")
+        return
+    vectorizado = medir(calendarios, repeticiones)
+
+    print(f"{'ESTADÍSTICA':<34} {'PYTHON (ms)':>12} {'NUMPY (ms)':>12} {'ACELERACIÓN':>12}")
+    print("-" * 72)
+    for nombre in python:
+        t_py = python[nombre] * 1000 / repeticiones
+        t_np = vectorizado[nombre] * 1000 / repeticiones
+        print(f"{nombre:<34} {t_py:>12.3f} {t_np:>12.3f} {t_py / t_np:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+# ======================================================
+# BITACORA.PY - Log del sistema escrito en segundo plano
+# ======================================================
+# registrar_log() ya no abre sistema.log en cada llamada: deja la línea
+# en una cola y un hilo la escribe junto con todas las que haya
+# pendientes, con el archivo abierto todo el tiempo. Al salir del
+# programa se vacía la cola (atexit).
+#
+# El archivo se rota por tamaño (sistema.log.1, .2, ...) y, si se pide,
+# también al cambiar el día (sistema.log.AAAA-MM-DD).
+#
+# Al lado del log se mantiene un índice (sistema.log.idx) con la posición
+# de cada línea que menciona un gasto y del comienzo de cada día, así el
+# historial de un gasto o de una fecha se lee sin recorrer el log.
+
+import os
+import re
+import time
+import queue
+import atexit
+import threading
+from array import array
+from datetime import date, datetime
+
+RUTA_LOG = "sistema.log"
+TAMANIO_MAXIMO = 10 << 20   # bytes antes de rotar (0 = sin límite)
+COPIAS = 5                  # archivos rotados por tamaño que se conservan
+LINEAS_POR_LOTE = 1000      # máximo de líneas por escritura
+
+_FIN = None                 # marca en la cola para terminar el hilo
+
+
+# ======================================================
+# ÍNDICE DEL LOG
+# ======================================================
+# Formato de sistema.log.idx (una entrada por línea, solo se agrega):
+#   G,id,posición      línea que menciona al gasto id
+#   D,dd/mm/aaaa,pos   primera línea de una tanda de ese día
+#   F,tamaño           hasta dónde del log está indexado
+#
+# Si el log creció sin índice (por ejemplo, escrito por una versión
+# anterior) se indexa lo que falta al abrirlo; si es más chico que lo
+# indexado (se reemplazó), se rehace entero.
+
+PATRON_ID_LOG = re.compile(r"\bID=(\d+)")
+
+
+class IndiceLog:
+    """
+    Posiciones en bytes de las líneas del log, por ID de gasto y por día.
+    """
+
+    def __init__(self, ruta_log):
+        self.ruta_log = ruta_log
+        self.ruta = ruta_log + ".idx"
+        self._cargar()
+        self._ponerse_al_dia()
+
+    def _vaciar_memoria(self):
+        self.por_id = {}       # id (int) -> array de posiciones
+        self.por_dia = {}      # "dd/mm/aaaa" -> array de posiciones de inicio
+        self.indexado = 0
+        self._ultimo_dia = None
+        self._pendientes = []
+
+    def _cargar(self):
+        self._vaciar_memoria()
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, "r", encoding="utf-8", newline="") as f:
+            for entrada in f:
+                tipo, _, resto = entrada.rstrip("\r\n").partition(",")
+                try:
+                    if tipo == "G":
+                        gid, pos = resto.split(",")
+                        self.por_id.setdefault(int(gid), array("Q")).append(int(pos))
+                    elif tipo == "D":
+                        dia, pos = resto.split(",")
+                        self.por_dia.setdefault(dia, array("Q")).append(int(pos))
+                        self._ultimo_dia = dia
+                    elif tipo == "F":
+                        self.indexado = int(resto)
+                except ValueError:
+                    continue   # entrada cortada a mitad de escritura
+
+    def _ponerse_al_dia(self):
+        tamanio = os.path.getsize(self.ruta_log) if os.path.exists(self.ruta_log) else 0
+        if tamanio < self.indexado:
+            self._vaciar_memoria()
+            if os.path.exists(self.ruta):
+                os.remove(self.ruta)
+        if tamanio == self.indexado:
+            return
+        with open(self.ruta_log, "rb") as f:
+            f.seek(self.indexado)
+            pos = self.indexado
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break   # la última línea todavía no terminó de escribirse
+                texto = linea.decode("utf-8", errors="replace")
+                if texto[:1] == "[" and texto[20:23] == "] [":
+                    self.anotar(pos, texto[1:11], texto[23:])
+                pos += len(linea)
+        self.guardar(pos)
+
+    def anotar(self, pos, dia, linea):
+        """
+        Registra una línea escrita en `pos`. `dia` es su fecha dd/mm/aaaa.
+        """
+        if dia != self._ultimo_dia:
+            self._ultimo_dia = dia
+            self.por_dia.setdefault(dia, array("Q")).append(pos)
+            self._pendientes.append(f"D,{dia},{pos}\n")
+        encontrado = PATRON_ID_LOG.search(linea)
+        if encontrado:
+            gid = int(encontrado.group(1))
+            self.por_id.setdefault(gid, array("Q")).append(pos)
+            self._pendientes.append(f"G,{gid},{pos}\n")
+
+    def guardar(self, indexado):
+        """
+        Agrega al archivo las entradas nuevas y hasta dónde llega el índice.
+        """
+        self._pendientes.append(f"F,{indexado}\n")
+        with open(self.ruta, "a", encoding="utf-8", newline="") as f:
+            f.write("".join(self._pendientes))
+        self._pendientes = []
+        self.indexado = indexado
+
+    def reiniciar(self):
+        """
+        Empieza un índice vacío (el log se rotó y el archivo nuevo está vacío).
+        """
+        self._vaciar_memoria()
+
+    # --------------------------------------------------
+    # Consultas
+    # --------------------------------------------------
+
+    def _leer_en(self, posiciones, mismo_dia=None):
+        lineas = []
+        with open(self.ruta_log, "rb") as f:
+            for pos in posiciones:
+                f.seek(pos)
+                if mismo_dia is None:
+                    lineas.append(f.readline().decode("utf-8", errors="replace"))
+                    continue
+                for linea in f:
+                    texto = linea.decode("utf-8", errors="replace")
+                    if texto[1:11] != mismo_dia:
+                        break
+                    lineas.append(texto)
+        return lineas
+
+    def historial_gasto(self, gid):
+        """
+        Líneas del log que mencionan al gasto, en orden.
+        """
+        try:
+            posiciones = self.por_id.get(int(gid), ())
+        except (ValueError, TypeError):
+            return []
+        return self._leer_en(posiciones)
+
+    def historial_dia(self, fecha):
+        """
+        Líneas del log escritas en la fecha dd/mm/aaaa, en orden.
+        """
+        return self._leer_en(self.por_dia.get(fecha, ()), mismo_dia=fecha)
+
+
+# ======================================================
+# ESCRITURA EN SEGUNDO PLANO
+# ======================================================
+
+class Bitacora:
+    """
+    Archivo de log con escritura en lotes desde un hilo propio.
+    """
+
+    def __init__(self, ruta=RUTA_LOG, tamanio_maximo=TAMANIO_MAXIMO, copias=COPIAS,
+                 por_dia=False, indexar=True):
+        base_dir = os.path.dirname(__file__)
+        self.ruta = os.path.join(base_dir, ruta)
+        self.tamanio_maximo = tamanio_maximo
+        self.copias = copias
+        self.por_dia = por_dia
+        self._cola = queue.Queue()
+        self._segundo, self._sello = None, ""
+        self._abrir()
+        self.indice = IndiceLog(self.ruta) if indexar else None
+        self._hilo = threading.Thread(target=self._atender_cola, name="bitacora", daemon=True)
+        self._hilo.start()
+
+    def _abrir(self):
+        # En binario: lo que se escribe es exactamente lo que ocupa (en
+        # modo texto Windows agregaría un \r por línea) y tell() da la
+        # posición real en bytes, que es la que guarda el índice.
+        self._archivo = open(self.ruta, "ab")
+        self._tamanio = self._archivo.tell()
+        self._dia = (date.fromtimestamp(os.path.getmtime(self.ruta))
+                     if self._tamanio else None)
+
+    # --------------------------------------------------
+    # Lado de quien registra
+    # --------------------------------------------------
+
+    def registrar(self, mensaje, tipo="INFO"):
+        """
+        Encola una línea. La hora se toma ahora; el formato lo arma el hilo.
+        """
+        self._cola.put((time.time(), tipo, (mensaje,)))
+
+    def registrar_varios(self, mensajes, tipo="INFO"):
+        """
+        Encola varias líneas de una vez, con la misma hora.
+        """
+        self._cola.put((time.time(), tipo, tuple(mensajes)))
+
+    def vaciar(self):
+        """
+        Espera a que todo lo encolado esté escrito en el archivo.
+        """
+        self._cola.join()
+
+    def cerrar(self):
+        """
+        Escribe lo pendiente, termina el hilo y cierra el archivo.
+        """
+        if self._hilo.is_alive():
+            self._cola.put(_FIN)
+            self._hilo.join()
+        if not self._archivo.closed:
+            self._archivo.close()
+
+    # --------------------------------------------------
+    # Lado del hilo escritor
+    # --------------------------------------------------
+
+    def _atender_cola(self):
+        terminar = False
+        while not terminar:
+            lote = [self._cola.get()]
+            while len(lote) < LINEAS_POR_LOTE:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+            terminar = _FIN in lote
+            try:
+                self._escribir_lote([entrada for entrada in lote if entrada is not _FIN])
+            except Exception as e:
+                print(f"⚠️ Error al escribir log: {e}")
+            finally:
+                for _ in lote:
+                    self._cola.task_done()
+
+    def _sello_de(self, instante):
+        # Muchas líneas caen en el mismo segundo: se formatea una sola vez
+        segundo = int(instante)
+        if segundo != self._segundo:
+            self._segundo = segundo
+            self._sello = datetime.fromtimestamp(segundo).strftime("%d/%m/%Y %H:%M:%S")
+        return self._sello
+
+    def _escribir_lote(self, lote):
+        partes = []
+        for instante, tipo, mensajes in lote:
+            for mensaje in mensajes:
+                self._escribir_linea(partes, instante, tipo, mensaje)
+        self._volcar(partes)
+
+    def _escribir_linea(self, partes, instante, tipo, mensaje):
+        if self.por_dia:
+            dia = date.fromtimestamp(instante)
+            if self._dia is not None and dia != self._dia:
+                self._volcar(partes)
+                self._rotar(f"{self.ruta}.{self._dia:%Y-%m-%d}")
+            self._dia = dia
+        sello = self._sello_de(instante)
+        linea = f"[{sello}] [{tipo}] {mensaje}\n".encode("utf-8")
+        if self.tamanio_maximo and self._tamanio and self._tamanio + len(linea) > self.tamanio_maximo:
+            self._volcar(partes)
+            self._rotar()
+        partes.append((linea, sello[:10], mensaje))
+        self._tamanio += len(linea)
+
+    def _volcar(self, partes):
+        if not partes:
+            return
+        # Cada línea se indexa en la posición que le da el archivo
+        pos = self._archivo.tell()
+        if self.indice is not None:
+            for linea, dia, mensaje in partes:
+                self.indice.anotar(pos, dia, mensaje)
+                pos += len(linea)
+        self._archivo.write(b"".join(linea for linea, _, _ in partes))
+        self._archivo.flush()
+        partes.clear()
+        self._tamanio = self._archivo.tell()
+        if self.indice is not None:
+            self.indice.guardar(self._tamanio)
+
+    def _rotar(self, destino=None):
+        """
+        Cierra el archivo actual, lo renombra y empieza uno vacío. Sin
+        destino es una rotación por tamaño: .1 pasa a .2, etc.
+        """
+        dia = self._dia
+        self._archivo.close()
+        if destino is None:
+            if self.copias > 0:
+                for n in range(self.copias - 1, 0, -1):
+                    if os.path.exists(f"{self.ruta}.{n}"):
+                        _renombrar_con_indice(f"{self.ruta}.{n}", f"{self.ruta}.{n + 1}")
+                _renombrar_con_indice(self.ruta, f"{self.ruta}.1")
+            else:
+                _renombrar_con_indice(self.ruta, None)
+        else:
+            _renombrar_con_indice(self.ruta, destino)
+        self._abrir()
+        self._dia = dia
+        if self.indice is not None:
+            self.indice.reiniciar()
+
+
+def _renombrar_con_indice(origen, destino):
+    """
+    Renombra (o borra, si destino es None) un log junto con su índice.
+    """
+    for sufijo in ("", ".idx"):
+        if not os.path.exists(origen + sufijo):
+            continue
+        if destino is None:
+            os.remove(origen + sufijo)
+        else:
+            os.replace(origen + sufijo, destino + sufijo)
+
+
+# ======================================================
+# LECTURA DEL LOG
+# ======================================================
+# Ninguna de las dos funciones carga el archivo entero: ultimas_lineas()
+# lee desde el final hacia atrás de a bloques y recorrer_log() avanza
+# línea por línea. Antes de leer se escriben las líneas pendientes.
+
+TAMANIO_BLOQUE_LECTURA = 64 * 1024
+
+
+def _ruta_log(ruta):
+    return os.path.join(os.path.dirname(__file__), ruta)
+
+
+def ultimas_lineas(cantidad=20, ruta=RUTA_LOG, tamanio_bloque=TAMANIO_BLOQUE_LECTURA):
+    """
+    Retorna las últimas `cantidad` líneas del log (con su salto de línea,
+    como readlines). Lee bloques desde el final hasta juntar suficientes.
+    """
+    if cantidad <= 0:
+        return []
+    vaciar_bitacora()
+    with open(_ruta_log(ruta), "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        bloques = []
+        saltos = 0
+        while pos > 0 and saltos <= cantidad:
+            inicio = max(0, pos - tamanio_bloque)
+            f.seek(inicio)
+            bloque = f.read(pos - inicio)
+            bloques.append(bloque)
+            saltos += bloque.count(b"\n")
+            pos = inicio
+    texto = b"".join(reversed(bloques)).decode("utf-8", errors="replace")
+    return texto.splitlines(keepends=True)[-cantidad:]
+
+
+def _clave_tiempo(momento, fin_del_dia=False):
+    """
+    Pasa un datetime o un texto "dd/mm/aaaa[ hh:mm:ss]" a "aaaammddhhmmss",
+    que se puede comparar como texto.
+    """
+    if isinstance(momento, datetime):
+        return momento.strftime("%Y%m%d%H%M%S")
+    fecha, _, hora = momento.strip().partition(" ")
+    dia, mes, anio = fecha.split("/")
+    if hora:
+        hora = hora.replace(":", "")
+    else:
+        hora = "235959" if fin_del_dia else "000000"
+    return f"{anio}{mes}{dia}{hora}"
+
+
+def recorrer_log(ruta=RUTA_LOG, tipos=None, desde=None, hasta=None):
+    """
+    Genera las líneas del log de principio a fin, opcionalmente solo las
+    de ciertos tipos ("INFO", "ERROR") y entre dos momentos (inclusive).
+    Con filtros, las líneas que no tienen el formato del log se saltean.
+    """
+    tipos = {tipos} if isinstance(tipos, str) else (set(tipos) if tipos else None)
+    minimo = _clave_tiempo(desde) if desde is not None else None
+    maximo = _clave_tiempo(hasta, fin_del_dia=True) if hasta is not None else None
+    filtrar = tipos is not None or minimo is not None or maximo is not None
+
+    vaciar_bitacora()
+    with open(_ruta_log(ruta), "r", encoding="utf-8", errors="replace", newline="") as f:
+        for linea in f:
+            if not filtrar:
+                yield linea
+                continue
+            # [dd/mm/aaaa hh:mm:ss] [TIPO] mensaje
+            if linea[:1] != "[" or linea[20:23] != "] [":
+                continue
+            if tipos is not None and linea[23:linea.find("]", 23)] not in tipos:
+                continue
+            if minimo is not None or maximo is not None:
+                clave = linea[7:11] + linea[4:6] + linea[1:3] + linea[12:20].replace(":", "")
+                if (minimo is not None and clave < minimo) or (maximo is not None and clave > maximo):
+                    continue
+            yield linea
+
+
+# ======================================================
+# BITÁCORA DEL SISTEMA
+# ======================================================
+# Se crea la primera vez que se registra algo (sobre sistema.log) y se
+# cierra sola al terminar el programa.
+
+_bitacora = None
+_candado = threading.Lock()
+
+
+def obtener_bitacora():
+    global _bitacora
+    if _bitacora is None:
+        with _candado:
+            if _bitacora is None:
+                _bitacora = Bitacora()
+    return _bitacora
+
+
+def configurar_bitacora(ruta=RUTA_LOG, tamanio_maximo=TAMANIO_MAXIMO, copias=COPIAS,
+                        por_dia=False, indexar=True):
+    """
+    Reemplaza la bitácora del sistema (cerrando la anterior).
+    """
+    global _bitacora
+    with _candado:
+        if _bitacora is not None:
+            _bitacora.cerrar()
+        _bitacora = Bitacora(ruta, tamanio_maximo, copias, por_dia, indexar)
+    return _bitacora
+
+
+def vaciar_bitacora():
+    """
+    Espera a que las líneas pendientes estén en el archivo.
+    """
+    if _bitacora is not None:
+        _bitacora.vaciar()
+
+
+def cerrar_bitacora():
+    global _bitacora
+    with _candado:
+        if _bitacora is not None:
+            _bitacora.cerrar()
+            _bitacora = None
+
+
+def _indice_de(ruta):
+    """
+    Índice del log en `ruta`: el de la bitácora del sistema si escribe
+    ahí (ya está en memoria) o uno abierto en el momento.
+    """
+    ruta_completa = _ruta_log(ruta)
+    if _bitacora is not None and _bitacora.indice is not None and _bitacora.ruta == ruta_completa:
+        _bitacora.vaciar()
+        return _bitacora.indice
+    return IndiceLog(ruta_completa)
+
+
+def historial_gasto(gid, ruta=RUTA_LOG):
+    """
+    Todo lo que el log registró sobre un gasto (altas, ediciones, bajas...).
+    """
+    return _indice_de(ruta).historial_gasto(gid)
+
+
+def historial_dia(fecha, ruta=RUTA_LOG):
+    """
+    Las líneas del log escritas en una fecha dd/mm/aaaa.
+    """
+    return _indice_de(ruta).historial_dia(fecha)
+
+
+atexit.register(cerrar_bitacora)
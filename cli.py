@@ -0,0 +1,339 @@
+# ======================================================
+# CLI.PY - Uso del gestor desde la línea de comandos
+# ======================================================
+# Para scripts y tareas programadas: cada subcomando hace una sola cosa
+# y escribe el resultado en JSON por la salida estándar. Los módulos del
+# gestor se importan dentro de cada subcomando, así una consulta no paga
+# por cargar lo que no usa.
+#
+# Ejemplos:
+#   python cli.py agregar --fecha 03/11/2025 --monto 1500 --categoria Ocio --descripcion Cine
+#   python cli.py consultar --categoria Ocio --desde 01/11/2025 --hasta 30/11/2025
+#   python cli.py consultar --palabra cine --monto-mayor 1000 --limite 10
+#   python cli.py reporte semanal --desde 10/2025 --hasta 12/2025
+#   python cli.py purgar
+#   python cli.py exportar --formato csv --salida copia.csv
+#
+# Los cambios (agregar, purgar) se anotan en el diario de cambios igual
+# que desde el menú, y main.py los ve al arrancar. Con --guardar además
+# se guarda la foto completa (gastos.csv, gastos.bin y calendario.txt).
+#
+# Para escribir, la CLI toma el candado del diario (gastos.lock) antes de
+# cargar y lo suelta después de compactar. main.py lo tiene tomado mientras
+# está abierto: en ese lapso agregar y purgar esperan unos segundos y
+# terminan con un error JSON sin tocar nada. Las consultas no lo necesitan.
+#
+# consultar y reporte no cargan el libro si el diario está vacío: leen
+# gastos.csv mapeado, o la base SQLite indicada con --base (ver
+# abrir_consulta).
+#   python cli.py consultar --base gastos.db --categoria Ocio
+
+import os
+import sys
+import json
+import argparse
+from contextlib import redirect_stdout
+
+FECHA_MINIMA = "01/01/0001"
+FECHA_MAXIMA = "31/12/9999"
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+# ======================================================
+# CARGA Y GUARDADO
+# ======================================================
+
+def cargar_libro():
+    """
+    Carga la foto y reaplica el diario, igual que main.py. Los mensajes
+    de carga van a stderr para no mezclarse con la salida JSON.
+    Retorna (gastos, orden, categorias_usadas, ultimo_id).
+    """
+    from archivos import cargar_foto
+    from diario import RUTA_DIARIO, reproducir_diario
+
+    with redirect_stdout(sys.stderr):
+        _, gastos, orden, categorias_usadas, ultimo_id = cargar_foto()
+        _, ultimo_id = reproducir_diario(RUTA_DIARIO, gastos, orden, categorias_usadas, ultimo_id)
+    return gastos, orden, categorias_usadas, ultimo_id
+
+
+def abrir_consulta(base=None):
+    """
+    Gastos para los subcomandos de solo lectura. Si el diario está vacío,
+    la foto está al día y no hace falta cargar el libro: se consulta
+    gastos.csv mapeado y los filtros y sumas se resuelven ahí. Con cambios
+    pendientes en el diario se carga todo como cargar_libro.
+    La base SQLite solo se usa si se pide (base = su ruta), porque el menú
+    no la actualiza: si es más vieja que gastos.csv o gastos.bin, o el
+    diario tiene cambios, se rechaza con ValueError.
+    Retorna (gastos, cerrar), donde cerrar() libera el archivo abierto.
+    """
+    from diario import RUTA_DIARIO
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+
+    def ruta(nombre):
+        return os.path.join(base_dir, nombre)
+
+    def modificado(nombre):
+        return os.path.getmtime(ruta(nombre)) if os.path.exists(ruta(nombre)) else None
+
+    diario_vacio = not os.path.exists(ruta(RUTA_DIARIO)) or os.path.getsize(ruta(RUTA_DIARIO)) == 0
+    if base is not None:
+        actualizada = modificado(base)
+        if actualizada is None:
+            raise ValueError(f"no existe la base {base}")
+        foto = [m for m in (modificado("gastos.csv"), modificado("gastos.bin")) if m is not None]
+        if not diario_vacio or (foto and actualizada < max(foto)):
+            raise ValueError(f"la base {base} está desactualizada respecto de la foto o el diario")
+        from base_datos import GastosSQLite
+        gastos = GastosSQLite(ruta(base))
+        return gastos, gastos.cerrar
+
+    if diario_vacio and modificado("gastos.csv") is not None:
+        from gastos_mapeados import GastosMapeados
+        try:
+            gastos = GastosMapeados()
+        except ValueError:
+            pass  # CSV con otro formato: que lo lea el cargador de siempre
+        else:
+            return gastos, gastos.cerrar
+    return cargar_libro()[0], lambda: None
+
+
+def aplicar_cambio(args, cambio):
+    """
+    Ejecuta cambio(gastos, orden, categorias_usadas, ultimo_id) con el
+    diario abierto, así queda anotado. Con --guardar, después compacta:
+    guarda la foto y vacía el diario. Retorna lo que retorne cambio.
+    Todo pasa con el candado del diario tomado (desde la carga), así el
+    último ID no puede quedar viejo por otro proceso que escribe a la vez.
+    """
+    from diario import activar_diario, desactivar_diario
+
+    diario = activar_diario()
+    try:
+        gastos, orden, categorias_usadas, ultimo_id = cargar_libro()
+        resultado, ultimo_id = cambio(gastos, orden, categorias_usadas, ultimo_id)
+        if args.guardar:
+            from archivos import guardar_foto
+            from operaciones import construir_calendario
+            with redirect_stdout(sys.stderr):
+                diario.compactar(lambda: guardar_foto(gastos, orden, ultimo_id,
+                                                      construir_calendario(gastos)))
+    finally:
+        desactivar_diario()
+    return resultado
+
+
+def _mes(texto):
+    """
+    "mm/aaaa" -> (año, mes); None o vacío -> None (sin límite).
+    """
+    if not texto:
+        return None
+    try:
+        mes, anio = (int(parte) for parte in texto.split("/"))
+    except ValueError:
+        raise ValueError(f"mes inválido: {texto!r} (se espera mm/aaaa)")
+    if not 1 <= mes <= 12:
+        raise ValueError(f"mes inválido: {texto!r} (se espera mm/aaaa)")
+    return anio, mes
+
+
+# ======================================================
+# SUBCOMANDOS
+# ======================================================
+
+def comando_agregar(args):
+    from operaciones import agregar_gastos_lote
+
+    def cambio(gastos, orden, categorias_usadas, ultimo_id):
+        with redirect_stdout(sys.stderr):
+            nuevo_id = agregar_gastos_lote(
+                gastos, orden, categorias_usadas, None, ultimo_id,
+                [(args.fecha, args.monto, args.categoria, args.descripcion)])
+        return {"id": str(nuevo_id)}, nuevo_id
+
+    return aplicar_cambio(args, cambio)
+
+
+def comando_consultar(args):
+    gastos, cerrar = abrir_consulta(args.base)
+    try:
+        return _consultar(gastos, args)
+    finally:
+        cerrar()
+
+
+def _consultar(gastos, args):
+    from almacen import fecha_a_ordinal
+    from operaciones import (
+        filtrar_por_categoria, filtrar_rango_fechas,
+        filtrar_por_monto_mayor, buscar_gastos_por_palabra
+    )
+
+    filtros = []
+    if args.categoria:
+        filtros.append(filtrar_por_categoria(gastos, args.categoria))
+    if args.desde or args.hasta or not (args.categoria or args.palabra or args.monto_mayor is not None):
+        filtros.append(filtrar_rango_fechas(gastos, args.desde or FECHA_MINIMA,
+                                            args.hasta or FECHA_MAXIMA))
+    if args.monto_mayor is not None:
+        filtros.append(filtrar_por_monto_mayor(gastos, args.monto_mayor))
+    if args.palabra:
+        filtros.append(buscar_gastos_por_palabra(gastos, args.palabra))
+
+    # El primer filtro da los candidatos; el resto se cruza por ID
+    primero, *resto = filtros
+    ids = set.intersection(*({g["id"] for g in filtro} for filtro in resto)) if resto else None
+    resultados = [dict(g) for g in primero
+                  if g["estado"] == "activo" and (ids is None or g["id"] in ids)]
+    resultados.sort(key=lambda g: (fecha_a_ordinal(g["fecha"]), int(g["id"])))
+    if args.limite is not None:
+        resultados = resultados[:args.limite]
+    return resultados
+
+
+def comando_reporte(args):
+    gastos, cerrar = abrir_consulta(args.base)
+    try:
+        return _reporte(gastos, args)
+    finally:
+        cerrar()
+
+
+def _reporte(gastos, args):
+    from operaciones import construir_calendario, resumen_por_categoria, resumen_estadistico
+
+    if args.tipo == "resumen":
+        return {
+            "por_categoria": resumen_por_categoria(gastos),
+            "estadisticas": resumen_estadistico(gastos)
+        }
+
+    from matrices import (
+        recorrer_dias, dia_con_mayor_gasto_periodo,
+        total_por_semana_periodo, total_por_dia_semana_periodo
+    )
+    calendario = construir_calendario(gastos)
+    desde, hasta = _mes(args.desde), _mes(args.hasta)
+    if args.tipo == "calendario":
+        fecha, monto = dia_con_mayor_gasto_periodo(calendario, desde, hasta)
+        return {
+            "dias": {dia.strftime("%d/%m/%Y"): float(monto)
+                     for dia, monto in recorrer_dias(calendario, desde, hasta) if monto},
+            "mayor": {"fecha": fecha, "monto": float(monto)}
+        }
+    return {
+        "semanas": [{"anio": anio, "semana": semana, "total": float(total)}
+                    for (anio, semana), total in total_por_semana_periodo(calendario, desde, hasta)],
+        "por_dia_semana": dict(zip(DIAS_SEMANA, map(float, total_por_dia_semana_periodo(
+            calendario, desde, hasta))))
+    }
+
+
+def comando_purgar(args):
+    from operaciones import vaciar_papelera
+
+    def cambio(gastos, orden, categorias_usadas, ultimo_id):
+        return {"purgados": vaciar_papelera(gastos, orden)}, ultimo_id
+
+    return aplicar_cambio(args, cambio)
+
+
+def comando_exportar(args):
+    gastos, orden, _, _ = cargar_libro()
+    if args.formato == "json":
+        datos = [dict(gastos[gid]) for gid in orden if gid in gastos]
+        if args.salida == "-":
+            return datos
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+        return {"exportados": len(datos), "salida": args.salida}
+
+    if args.salida == "-":
+        import csv
+        from archivos import CAMPOS_CSV
+        writer = csv.writer(sys.stdout)
+        writer.writerow(CAMPOS_CSV)
+        writer.writerows(gastos.filas_csv(orden))
+        return None
+
+    from archivos import guardar_gastos_csv
+    with redirect_stdout(sys.stderr):
+        ok = guardar_gastos_csv(os.path.abspath(args.salida), gastos, orden)
+    if not ok:
+        raise ValueError(f"no se pudo exportar a {args.salida}")
+    return {"exportados": len(gastos), "salida": args.salida}
+
+
+# ======================================================
+# ARGUMENTOS
+# ======================================================
+
+def crear_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Gestor de gastos desde la línea de comandos (salida JSON).")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    agregar = sub.add_parser("agregar", help="Agrega un gasto")
+    agregar.add_argument("--fecha", required=True, help="dd/mm/aaaa")
+    agregar.add_argument("--monto", required=True, type=float)
+    agregar.add_argument("--categoria", required=True)
+    agregar.add_argument("--descripcion", required=True)
+    agregar.add_argument("--guardar", action="store_true",
+                         help="Guarda la foto completa además de anotar en el diario")
+    agregar.set_defaults(funcion=comando_agregar)
+
+    consultar = sub.add_parser("consultar", help="Consulta gastos activos (los filtros se combinan)")
+    consultar.add_argument("--categoria")
+    consultar.add_argument("--desde", help="dd/mm/aaaa")
+    consultar.add_argument("--hasta", help="dd/mm/aaaa")
+    consultar.add_argument("--monto-mayor", type=float)
+    consultar.add_argument("--palabra")
+    consultar.add_argument("--limite", type=int)
+    consultar.add_argument("--base", help="Consulta esta base SQLite (por ejemplo gastos.db)")
+    consultar.set_defaults(funcion=comando_consultar)
+
+    reporte = sub.add_parser("reporte", help="Reportes del período")
+    reporte.add_argument("tipo", choices=["resumen", "calendario", "semanal"])
+    reporte.add_argument("--desde", help="mm/aaaa")
+    reporte.add_argument("--hasta", help="mm/aaaa")
+    reporte.add_argument("--base", help="Consulta esta base SQLite (por ejemplo gastos.db)")
+    reporte.set_defaults(funcion=comando_reporte)
+
+    purgar = sub.add_parser("purgar", help="Vacía la papelera")
+    purgar.add_argument("--guardar", action="store_true",
+                        help="Guarda la foto completa además de anotar en el diario")
+    purgar.set_defaults(funcion=comando_purgar)
+
+    exportar = sub.add_parser("exportar", help="Exporta todos los gastos")
+    exportar.add_argument("--formato", choices=["csv", "json"], default="json")
+    exportar.add_argument("--salida", default="-", help="Archivo de salida (- = pantalla)")
+    exportar.set_defaults(funcion=comando_exportar)
+
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    try:
+        resultado = args.funcion(args)
+    except Exception as e:
+        from diario import DiarioOcupado
+        if not isinstance(e, (ValueError, KeyError, DiarioOcupado)):
+            raise
+        mensaje = e.args[0] if e.args else str(e)
+        json.dump({"error": str(mensaje)}, sys.stderr, ensure_ascii=False)
+        sys.stderr.write("\n")
+        return 1
+    if resultado is not None:
+        json.dump(resultado, sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,3 +30,6 @@ FECHA_SISTEMA = (2025, 11)
 
 # Formato regex para validar fechas
 FORMATO_FECHA_REGEX = r"^(0[1-9]|[12][0-9]|3[01])/(0[1-9]|1[0-2])/[0-9]{4}$"
+
+# Formato regex para validar meses (mm/aaaa)
+FORMATO_MES_REGEX = r"^(0[1-9]|1[0-2])/[0-9]{4}$"
@@ -0,0 +1,349 @@
+# ======================================================
+# DIARIO.PY - Diario de cambios (solo se agrega al final)
+# ======================================================
+# Cada alta, edición, baja, restauración y vaciado de papelera se anota
+# como una línea CSV y se baja a disco en el momento. gastos.csv queda
+# como la "foto" (snapshot) y al arrancar se reaplican las líneas del
+# diario encima. Cada tanto se compacta: se guarda una foto nueva y el
+# diario vuelve a empezar vacío.
+#
+# Formato de las líneas:
+#   ALTA,id,fecha,categoria,descripcion,monto
+#   MONTO,id,monto
+#   DESCRIPCION,id,descripcion
+#   BAJA,id
+#   RESTAURACION,id
+#   PURGA,cantidad,id,id,...
+#
+# Los registros guardan valores absolutos, así que reaplicar un diario
+# que ya estaba incluido en la foto no cambia nada. Por eso PURGA lleva
+# los IDs que se borraron: al reaplicarla se borran esos (si siguen en
+# la papelera) y no lo que haya en la papelera en ese momento, que puede
+# incluir bajas posteriores. Un PURGA sin IDs es del formato anterior y
+# vacía la papelera entera.
+#
+# Un solo proceso por vez puede escribir el diario: el que lo activa
+# toma un candado exclusivo sobre gastos.lock (main.py durante toda la
+# sesión, la CLI durante cada cambio). Así nadie calcula el próximo ID
+# sobre una copia vieja ni compacta tirando registros ajenos. Si el
+# candado no se libera en ESPERA_CANDADO segundos, activar_diario falla
+# con DiarioOcupado en lugar de escribir.
+
+import os
+import csv
+import time
+
+from almacen import es_almacen, fecha_a_ordinal
+
+RUTA_DIARIO = "gastos.diario"
+COMPACTAR_CADA = 500   # registros antes de sugerir una compactación
+ESPERA_CANDADO = 5     # segundos que se espera a que otro proceso suelte el diario
+
+# Cantidad de campos de cada tipo de registro (incluida la operación)
+CAMPOS_REGISTRO = {
+    "ALTA": 6,
+    "MONTO": 3,
+    "DESCRIPCION": 3,
+    "BAJA": 2,
+    "RESTAURACION": 2,
+    "PURGA": 1,   # más la cantidad y los IDs (ver campos_registro)
+}
+
+
+# ======================================================
+# CANDADO ENTRE PROCESOS
+# ======================================================
+
+if os.name == "nt":
+    import msvcrt
+
+    def _bloquear(archivo):
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _desbloquear(archivo):
+        archivo.seek(0)
+        msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _bloquear(archivo):
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _desbloquear(archivo):
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+
+
+class DiarioOcupado(Exception):
+    """
+    Otro proceso tiene el diario abierto para escribir.
+    """
+
+
+def ruta_candado(ruta=RUTA_DIARIO):
+    """
+    gastos.diario -> gastos.lock (al lado del diario).
+    """
+    return os.path.splitext(ruta)[0] + ".lock"
+
+
+class Candado:
+    """
+    Lock exclusivo entre procesos sobre un archivo (fcntl.flock en POSIX,
+    msvcrt.locking en Windows). El sistema operativo lo suelta solo si
+    el proceso termina sin cerrarlo.
+    """
+
+    def __init__(self, ruta):
+        base_dir = os.path.dirname(__file__)
+        self.ruta = os.path.join(base_dir, ruta)
+        self._archivo = None
+
+    def tomar(self, espera=0):
+        """
+        Intenta tomar el lock durante `espera` segundos.
+        Retorna True si lo tomó.
+        """
+        archivo = open(self.ruta, "a+b")
+        limite = time.monotonic() + espera
+        while True:
+            try:
+                _bloquear(archivo)
+            except OSError:
+                if time.monotonic() >= limite:
+                    archivo.close()
+                    return False
+                time.sleep(0.05)
+            else:
+                self._archivo = archivo
+                return True
+
+    def soltar(self):
+        if self._archivo is not None:
+            try:
+                _desbloquear(self._archivo)
+            finally:
+                self._archivo.close()
+                self._archivo = None
+
+
+class Diario:
+    """
+    Archivo de diario abierto en modo append. Cada registro se escribe,
+    se vacía el buffer y se sincroniza (fsync), así un corte no pierde
+    cambios ya confirmados.
+    """
+
+    def __init__(self, ruta=RUTA_DIARIO, compactar_cada=COMPACTAR_CADA, espera=0):
+        base_dir = os.path.dirname(__file__)
+        self.ruta = os.path.join(base_dir, ruta)
+        self.compactar_cada = compactar_cada
+        # El candado va primero: los registros se cuentan ya sin escritores ajenos
+        self._candado = Candado(ruta_candado(ruta))
+        if not self._candado.tomar(espera):
+            raise DiarioOcupado("Otro proceso (main.py o la CLI) está escribiendo "
+                                "en el diario; intente de nuevo cuando termine.")
+        try:
+            self.registros = contar_registros(ruta)
+            self._archivo = open(self.ruta, "a", encoding="utf-8", newline='')
+        except BaseException:
+            self._candado.soltar()
+            raise
+        self._writer = csv.writer(self._archivo)
+
+    def anotar(self, operacion, *campos):
+        """
+        Agrega un registro al final del diario y lo baja a disco.
+        """
+        self._writer.writerow([operacion, *campos])
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self.registros += 1
+
+    def anotar_varios(self, registros):
+        """
+        Agrega varios registros y los baja a disco con un solo fsync.
+        """
+        registros = list(registros)
+        self._writer.writerows(registros)
+        self._archivo.flush()
+        os.fsync(self._archivo.fileno())
+        self.registros += len(registros)
+
+    def necesita_compactar(self):
+        return self.registros >= self.compactar_cada
+
+    def compactar(self, guardar_foto):
+        """
+        Guarda una foto nueva con guardar_foto() y, si salió bien,
+        vacía el diario. Retorna True si se compactó.
+        """
+        if not guardar_foto():
+            return False
+        self._archivo.seek(0)
+        self._archivo.truncate()
+        os.fsync(self._archivo.fileno())
+        self.registros = 0
+        return True
+
+    def cerrar(self):
+        if not self._archivo.closed:
+            self._archivo.close()
+        self._candado.soltar()
+
+
+# ======================================================
+# DIARIO ACTIVO DEL SISTEMA
+# ======================================================
+# Las operaciones anotan en el diario activo; si no hay ninguno (por
+# ejemplo en los tests) anotar() no hace nada.
+
+_diario = None
+
+
+def activar_diario(ruta=None, compactar_cada=COMPACTAR_CADA, espera=None):
+    """
+    Toma el candado, abre el diario (por defecto RUTA_DIARIO) y lo deja
+    activo para las operaciones. Si otro proceso no suelta el candado en
+    `espera` segundos (por defecto ESPERA_CANDADO) lanza DiarioOcupado.
+    """
+    global _diario
+    desactivar_diario()
+    _diario = Diario(ruta or RUTA_DIARIO, compactar_cada,
+                     ESPERA_CANDADO if espera is None else espera)
+    return _diario
+
+
+def desactivar_diario():
+    """
+    Cierra el diario activo (si hay).
+    """
+    global _diario
+    if _diario is not None:
+        _diario.cerrar()
+        _diario = None
+
+
+def diario_activo():
+    return _diario
+
+
+def anotar(operacion, *campos):
+    """
+    Anota un cambio en el diario activo.
+    """
+    if _diario is not None:
+        _diario.anotar(operacion, *campos)
+
+
+def anotar_varios(registros):
+    """
+    Anota un lote de cambios en el diario activo (cada registro es una
+    tupla operación, campos...).
+    """
+    if _diario is not None:
+        _diario.anotar_varios(registros)
+
+
+# ======================================================
+# REPRODUCCIÓN AL ARRANCAR
+# ======================================================
+
+def leer_registros(ruta=RUTA_DIARIO):
+    """
+    Genera los registros válidos del diario. Una línea incompleta (un
+    corte a mitad de escritura) o desconocida se descarta.
+    """
+    base_dir = os.path.dirname(__file__)
+    ruta_completa = os.path.join(base_dir, ruta)
+    if not os.path.exists(ruta_completa):
+        return
+    with open(ruta_completa, "r", encoding="utf-8", newline='') as f:
+        for registro in csv.reader(f):
+            if registro and campos_registro(registro) == len(registro):
+                yield registro
+
+
+def campos_registro(registro):
+    """
+    Cantidad de campos que debe tener el registro (None si la operación
+    es desconocida). PURGA dice en su segundo campo cuántos IDs siguen.
+    """
+    if registro[0] == "PURGA" and len(registro) > 1:
+        cantidad = registro[1]
+        return 2 + int(cantidad) if cantidad.isdigit() else None
+    return CAMPOS_REGISTRO.get(registro[0])
+
+
+def contar_registros(ruta=RUTA_DIARIO):
+    return sum(1 for _ in leer_registros(ruta))
+
+
+def reproducir_diario(ruta, gastos, orden, categorias_usadas, ultimo_id):
+    """
+    Aplica los registros del diario sobre los gastos cargados de la foto.
+    Retorna (cantidad de registros aplicados, último ID).
+    """
+    aplicados = 0
+    hubo_altas = False
+
+    for registro in leer_registros(ruta):
+        operacion, gid = registro[0], (registro[1] if len(registro) > 1 else None)
+        try:
+            if operacion == "ALTA":
+                if gid in gastos:
+                    continue
+                _, _, fecha, categoria, descripcion, monto = registro
+                gastos[gid] = {
+                    "id": gid, "fecha": fecha, "monto": float(monto),
+                    "categoria": categoria, "descripcion": descripcion,
+                    "estado": "activo"
+                }
+                orden.append(gid)
+                categorias_usadas.add(categoria)
+                ultimo_id = max(ultimo_id, int(gid))
+                hubo_altas = True
+            elif operacion == "PURGA":
+                _purgar(gastos, orden, registro[2:] if len(registro) > 1 else None)
+            elif gid not in gastos:
+                continue
+            elif operacion == "MONTO":
+                gastos[gid]["monto"] = float(registro[2])
+            elif operacion == "DESCRIPCION":
+                gastos[gid]["descripcion"] = registro[2]
+            elif operacion == "BAJA":
+                gastos[gid]["estado"] = "eliminado"
+            elif operacion == "RESTAURACION":
+                gastos[gid]["estado"] = "activo"
+        except (ValueError, KeyError):
+            continue
+        aplicados += 1
+
+    if hubo_altas:
+        # Mismo criterio que agregar_gasto: por fecha y, a igual fecha,
+        # en orden de alta (sorted es estable)
+        if es_almacen(gastos):
+            clave = gastos.ordinal
+        else:
+            clave = lambda gid: fecha_a_ordinal(gastos[gid]["fecha"])
+        orden.sort(key=clave)
+
+    return aplicados, ultimo_id
+
+
+def _purgar(gastos, orden, gids):
+    """
+    Borra los gastos purgados que siguen en la papelera. Con gids None
+    (PURGA del formato anterior) vacía la papelera entera.
+    """
+    if gids is None and es_almacen(gastos):
+        purgados = set(gastos.vaciar_papelera())
+    else:
+        if gids is None:
+            gids = gastos.keys()
+        purgados = {gid for gid in gids
+                    if gid in gastos and gastos[gid].get('estado') == 'eliminado'}
+        for gid in purgados:
+            del gastos[gid]
+    if purgados:
+        orden[:] = [gid for gid in orden if gid not in purgados]
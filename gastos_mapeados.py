@@ -0,0 +1,351 @@
+# ======================================================
+# GASTOS_MAPEADOS.PY - Lectura diferida de gastos.csv con mmap
+# ======================================================
+# Para archivos muy grandes: el CSV se mapea en memoria y al abrirlo solo
+# se guardan, por cada fila, su posición en el archivo y las columnas
+# clave (ID, fecha, monto, categoría y estado) en arrays compactos.
+# Las descripciones se leen del archivo recién cuando alguien las pide
+# (por ejemplo, al mostrar la lista en pantalla).
+
+import os
+import csv
+import mmap
+from math import fsum
+from array import array
+from itertools import compress
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from almacen import fecha_a_ordinal, ordinal_a_fecha
+from archivos import validar_fila_gasto
+from indices import normalizar_texto
+
+ENCABEZADO = ["id", "fecha", "categoria", "descripcion", "monto", "estado"]
+
+
+def _separar_campos(linea):
+    """
+    Separa una línea del CSV en sus 6 campos. Si no hay comillas se corta
+    por comas (la descripción es el único campo que puede tener comas);
+    si las hay se usa el módulo csv.
+    """
+    if b'"' in linea:
+        return next(csv.reader([linea.decode("utf-8")]))
+    gid, fecha, categoria, resto = linea.split(b",", 3)
+    descripcion, monto, estado = resto.rsplit(b",", 2)
+    return [c.decode("utf-8") for c in (gid, fecha, categoria, descripcion, monto, estado)]
+
+
+def _campos_clave(linea):
+    """
+    (id, fecha, categoria, monto, estado) de una línea, sin decodificar
+    la descripción. Los valores quedan en bytes (int() y float() los
+    aceptan así).
+    """
+    if b'"' in linea:
+        gid, fecha, categoria, _, monto, estado = (
+            c.encode("utf-8") for c in _separar_campos(linea))
+        return gid, fecha, categoria, monto, estado
+    gid, fecha, categoria, resto = linea.split(b",", 3)
+    _, monto, estado = resto.rsplit(b",", 2)
+    return gid, fecha, categoria, monto, estado
+
+
+class GastoMapeado(Mapping):
+    """
+    Gasto de solo lectura. Los campos clave salen de las columnas; la
+    descripción se lee del archivo la primera vez que se pide.
+    """
+    __slots__ = ("_libro", "_fila", "_descripcion")
+
+    def __init__(self, libro, fila):
+        self._libro = libro
+        self._fila = fila
+        self._descripcion = None
+
+    def __getitem__(self, campo):
+        libro, fila = self._libro, self._fila
+        if campo == "id":
+            return str(libro.ids[fila])
+        if campo == "fecha":
+            return ordinal_a_fecha(libro.fechas[fila])
+        if campo == "monto":
+            return libro.montos[fila]
+        if campo == "categoria":
+            return libro.nombres_categoria[libro.categorias[fila]]
+        if campo == "estado":
+            return "activo" if libro.estados[fila] == 0 else "eliminado"
+        if campo == "descripcion":
+            if self._descripcion is None:
+                self._descripcion = libro.leer_fila(fila)[3]
+            return self._descripcion
+        raise KeyError(campo)
+
+    def __iter__(self):
+        return iter(("id", "fecha", "monto", "categoria", "descripcion", "estado"))
+
+    def __len__(self):
+        return 6
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class GastosMapeados(Mapping):
+    """
+    Vista de solo lectura ID -> gasto sobre un gastos.csv mapeado.
+    La memoria usada crece con la cantidad de filas (unos 30 bytes por
+    fila) y no con el largo de las descripciones.
+    """
+
+    def __init__(self, ruta="gastos.csv"):
+        base_dir = os.path.dirname(__file__)
+        self._archivo = open(os.path.join(base_dir, ruta), "rb")
+        try:
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # archivo vacío
+            self._mapa = b""
+        self.posiciones = array("Q")
+        self.ids = array("q")
+        self.fechas = array("i")
+        self.montos = array("d")
+        self.categorias = array("H")
+        self.estados = array("B")
+        self.nombres_categoria = []
+        self.filas_descartadas = 0
+        self._indexar()
+        # Filas ordenadas por ID para buscar con bisect
+        self._por_id = array("I", sorted(range(len(self.ids)), key=self.ids.__getitem__))
+
+    def _indexar(self):
+        """
+        Recorre el archivo una vez guardando posición y columnas clave.
+        Cada fila pasa por las mismas reglas que la carga del CSV
+        (validar_fila_gasto); las rechazadas se cuentan en
+        filas_descartadas.
+        """
+        mapa = self._mapa
+        fin_encabezado = mapa.find(b"\n")
+        if fin_encabezado < 0:
+            return
+        encabezado = bytes(mapa[:fin_encabezado]).strip().decode("utf-8-sig").split(",")
+        if encabezado != ENCABEZADO:
+            raise ValueError(f"Encabezado inesperado: {encabezado}")
+
+        codigos = {}
+        ordinales = {}
+        ids_vistos = set()
+        inicio = fin_encabezado + 1
+        while inicio < len(mapa):
+            fin = self._fin_de_fila(inicio)
+            linea = mapa[inicio:fin].rstrip(b"\r")
+            if linea:
+                try:
+                    gid, fecha, categoria, monto, estado = (
+                        c.decode("utf-8") for c in _campos_clave(linea))
+                    # La descripción no se valida: no hace falta leerla
+                    num, fecha, categoria, _, valor, estado = validar_fila_gasto(
+                        (gid, fecha, categoria, "", monto, estado), ids_vistos)
+                    ordinal = ordinales.get(fecha)
+                    if ordinal is None:
+                        ordinal = ordinales[fecha] = fecha_a_ordinal(fecha)
+                    codigo = codigos.get(categoria)
+                    if codigo is None:
+                        codigo = codigos[categoria] = len(codigos)
+                        self.nombres_categoria.append(categoria)
+                    fila = (num, ordinal, valor, codigo, 0 if estado == "activo" else 1)
+                except (ValueError, csv.Error):
+                    self.filas_descartadas += 1
+                else:
+                    self.posiciones.append(inicio)
+                    self.ids.append(fila[0])
+                    self.fechas.append(fila[1])
+                    self.montos.append(fila[2])
+                    self.categorias.append(fila[3])
+                    self.estados.append(fila[4])
+            inicio = fin + 1
+
+    def cerrar(self):
+        if isinstance(self._mapa, mmap.mmap):
+            self._mapa.close()
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    # --------------------------------------------------
+    # Acceso a filas
+    # --------------------------------------------------
+
+    def _fin_de_fila(self, inicio):
+        """
+        Posición del salto de línea que cierra la fila que empieza en
+        inicio. Una descripción entre comillas puede tener saltos de
+        línea: se sigue hasta que las comillas queden balanceadas.
+        """
+        mapa, largo = self._mapa, len(self._mapa)
+        fin = mapa.find(b"\n", inicio)
+        if fin < 0:
+            return largo
+        if mapa.find(b'"', inicio, fin) < 0:
+            return fin
+        while mapa[inicio:fin].count(b'"') % 2 and fin < largo:
+            siguiente = mapa.find(b"\n", fin + 1)
+            fin = largo if siguiente < 0 else siguiente
+        return fin
+
+    def leer_fila(self, fila):
+        """
+        Lee y separa la línea completa de una fila (los 6 campos como texto).
+        """
+        inicio = self.posiciones[fila]
+        return _separar_campos(self._mapa[inicio:self._fin_de_fila(inicio)].rstrip(b"\r"))
+
+    def _fila_de(self, gid):
+        try:
+            num = int(gid)
+        except (ValueError, TypeError):
+            raise KeyError(gid)
+        pos = bisect_left(self._por_id, num, key=self.ids.__getitem__)
+        if pos == len(self._por_id) or self.ids[self._por_id[pos]] != num:
+            raise KeyError(gid)
+        return self._por_id[pos]
+
+    def __getitem__(self, gid):
+        return GastoMapeado(self, self._fila_de(gid))
+
+    def __contains__(self, gid):
+        try:
+            self._fila_de(gid)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return (str(num) for num in self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    # --------------------------------------------------
+    # Consultas sobre las columnas clave
+    # --------------------------------------------------
+    # Recorren solo los arrays; las descripciones no se leen.
+
+    def vistas(self, filas):
+        return [GastoMapeado(self, fila) for fila in filas]
+
+    def _filas_activas(self, condicion):
+        filas = [i for i, estado in enumerate(self.estados) if estado == 0 and condicion(i)]
+        filas.sort(key=lambda i: (self.fechas[i], self.ids[i]))
+        return filas
+
+    def activos(self):
+        """
+        Todos los gastos activos, ordenados por fecha.
+        """
+        return self.vistas(self._filas_activas(lambda i: True))
+
+    def filtrar_por_categoria(self, categoria):
+        if categoria not in self.nombres_categoria:
+            return []
+        codigo = self.nombres_categoria.index(categoria)
+        categorias = self.categorias
+        return self.vistas(self._filas_activas(lambda i: categorias[i] == codigo))
+
+    def filtrar_por_fecha(self, fecha):
+        ordinal = fecha_a_ordinal(fecha)
+        fechas = self.fechas
+        return self.vistas(self._filas_activas(lambda i: fechas[i] == ordinal))
+
+    def filtrar_rango_fechas(self, fecha_desde, fecha_hasta):
+        desde, hasta = fecha_a_ordinal(fecha_desde), fecha_a_ordinal(fecha_hasta)
+        fechas = self.fechas
+        return self.vistas(self._filas_activas(lambda i: desde <= fechas[i] <= hasta))
+
+    def filtrar_por_monto_mayor(self, umbral):
+        montos = self.montos
+        return self.vistas(self._filas_activas(lambda i: montos[i] > umbral))
+
+    def ids_activos(self, categoria=None, monto_mayor=None):
+        """
+        IDs de los gastos activos, filtrados sobre las columnas.
+        """
+        if categoria is not None and categoria not in self.nombres_categoria:
+            return set()
+        codigo = None if categoria is None else self.nombres_categoria.index(categoria)
+        return {str(self.ids[i]) for i, estado in enumerate(self.estados)
+                if estado == 0
+                and (codigo is None or self.categorias[i] == codigo)
+                and (monto_mayor is None or self.montos[i] > monto_mayor)}
+
+    def gastos_por_ids(self, ids):
+        """
+        Gastos activos con esos IDs, ordenados por fecha (los IDs que no
+        existen se ignoran).
+        """
+        filas = set()
+        for gid in ids:
+            try:
+                fila = self._fila_de(gid)
+            except KeyError:
+                continue
+            if self.estados[fila] == 0:
+                filas.add(fila)
+        return self.vistas(sorted(filas, key=lambda i: (self.fechas[i], self.ids[i])))
+
+    def agrupar_por_categoria(self):
+        """
+        {categoría: gastos activos ordenados por fecha}.
+        """
+        grupos = {}
+        for fila in self._filas_activas(lambda i: True):
+            grupos.setdefault(self.nombres_categoria[self.categorias[fila]], []).append(fila)
+        return {categoria: self.vistas(filas) for categoria, filas in grupos.items()}
+
+    def buscar_por_palabra(self, palabra):
+        # Es la única consulta que lee descripciones del archivo. Como en
+        # el almacén, incluye los eliminados y ordena por ID.
+        palabra = normalizar_texto(palabra)
+        filas = [i for i in range(len(self.ids))
+                 if palabra in normalizar_texto(self.leer_fila(i)[3])]
+        return self.vistas(sorted(filas, key=lambda i: self.ids[i]))
+
+    # Agregados: una pasada por los arrays de montos y categorías
+
+    def _montos_activos(self):
+        return compress(self.montos, (estado == 0 for estado in self.estados))
+
+    def suma_por_categoria(self):
+        sumas = {}
+        for codigo, monto, estado in zip(self.categorias, self.montos, self.estados):
+            if estado == 0:
+                nombre = self.nombres_categoria[codigo]
+                sumas[nombre] = sumas.get(nombre, 0) + monto
+        return sumas
+
+    def estadisticas(self):
+        """
+        (cantidad, total, mínimo, máximo) de los gastos activos.
+        """
+        montos = array("d", self._montos_activos())
+        if not montos:
+            return 0, 0.0, None, None
+        return len(montos), fsum(montos), min(montos), max(montos)
+
+    def columnas_fecha_monto(self):
+        """
+        Columnas (ordinales de fecha, montos) de los gastos activos.
+        """
+        activos = [estado == 0 for estado in self.estados]
+        return array("i", compress(self.fechas, activos)), array("d", compress(self.montos, activos))
+
+
+def es_mapeado(gastos):
+    """
+    Indica si los gastos son una vista mapeada de un CSV.
+    """
+    return isinstance(gastos, GastosMapeados)
@@ -0,0 +1,285 @@
+# ======================================================
+# GENERADOR.PY - Libros de gastos sintéticos con aspecto real
+# ======================================================
+# Ejecutar con: python generador.py CANTIDAD --salida gastos_prueba.csv
+#                   [--formato csv|sqlite] [--desde 01/01/2023] [--hasta 31/12/2025]
+#                   [--eliminados 0.05] [--zipf 1.2] [--semilla 42]
+#                   [--peso Supermercado=40 --peso Delivery=15 ...]
+#
+# Las filas salen de a una y en orden de fecha (el ID crece con la
+# fecha), y se escriben en bloques: se pueden generar archivos de cientos
+# de millones de gastos sin tenerlos en memoria.
+#
+# Cómo se parecen a los reales:
+#   * categoría: una hoja de CATEGORIAS_JERARQUICAS elegida según PESOS_CATEGORIA;
+#   * monto: log-normal con la mediana y la dispersión de su categoría;
+#   * fecha: más gastos los fines de semana y en los días de cobro;
+#   * descripción: del vocabulario de la categoría, con frecuencias de Zipf
+#     (la primera es la más común, la segunda la mitad, la tercera un tercio...);
+#   * estado: una fracción configurable queda "eliminado".
+
+import os
+import csv
+import sys
+import math
+import random
+import argparse
+from bisect import bisect
+from datetime import date, datetime
+from itertools import accumulate, islice
+from time import perf_counter
+
+from almacen import fecha_a_ordinal, ordinal_a_fecha
+from analisis_recursivo import CATEGORIAS_JERARQUICAS, hojas_categorias_recursivo
+from archivos import CAMPOS_CSV, TAMANIO_BLOQUE, ColumnasGastos, escritura_atomica
+
+DESDE = "01/01/2023"
+HASTA = "31/12/2025"
+ELIMINADOS = 0.05
+ZIPF = 1.2
+
+# Peso relativo de cada hoja (las que no figuran pesan 1)
+PESOS_CATEGORIA = {
+    "Supermercado": 30, "Comida rápida": 10, "Gourmet": 2, "Delivery": 8,
+    "Combustible": 10, "Mantenimiento": 2, "Estacionamiento": 6,
+    "Cine": 3, "Teatro": 1, "Deportes": 4,
+    "Luz": 2, "Gas": 2, "Agua": 1, "Internet": 1, "Telefonía": 2,
+}
+
+# Monto de cada hoja: (mediana en $, dispersión del logaritmo)
+MONTOS_CATEGORIA = {
+    "Supermercado": (25000, 0.8), "Comida rápida": (9000, 0.5), "Gourmet": (45000, 0.5),
+    "Delivery": (14000, 0.5), "Combustible": (35000, 0.4), "Mantenimiento": (90000, 0.9),
+    "Estacionamiento": (3500, 0.5), "Cine": (8000, 0.3), "Teatro": (25000, 0.4),
+    "Deportes": (20000, 0.7), "Luz": (30000, 0.4), "Gas": (18000, 0.5),
+    "Agua": (12000, 0.3), "Internet": (22000, 0.2), "Telefonía": (15000, 0.3),
+}
+MONTO_POR_DEFECTO = (10000, 0.8)
+
+# Descripciones de cada hoja, de la más frecuente a la menos frecuente
+VOCABULARIO = {
+    "Supermercado": ("Compra semanal", "Supermercado", "Verdulería", "Almacén", "Carnicería",
+                     "Panadería", "Compra mensual", "Dietética", "Fiambrería", "Mayorista"),
+    "Comida rápida": ("Hamburguesa", "Pizza", "Empanadas", "Pancho", "Lomito", "Tacos"),
+    "Gourmet": ("Cena aniversario", "Parrilla", "Restaurante italiano", "Sushi", "Bodegón"),
+    "Delivery": ("Pedido delivery", "Pizza delivery", "Helado", "Comida china", "Sushi delivery"),
+    "Combustible": ("Nafta súper", "Nafta premium", "Carga GNC", "Gasoil"),
+    "Mantenimiento": ("Service auto", "Cambio de aceite", "Gomería", "Lavadero", "Cambio de neumáticos"),
+    "Estacionamiento": ("Estacionamiento", "Cochera mensual", "Parquímetro", "Peaje"),
+    "Cine": ("Entrada cine", "Cine 3D", "Pochoclos", "Cine IMAX"),
+    "Teatro": ("Entrada teatro", "Recital", "Stand up", "Ópera"),
+    "Deportes": ("Cuota gimnasio", "Cancha de fútbol", "Paddle", "Pileta", "Zapatillas"),
+    "Luz": ("Factura de luz",),
+    "Gas": ("Factura de gas", "Garrafa"),
+    "Agua": ("Factura de agua",),
+    "Internet": ("Internet fibra óptica", "Internet móvil"),
+    "Telefonía": ("Abono celular", "Recarga celular", "Teléfono fijo"),
+}
+VOCABULARIO_POR_DEFECTO = ("Compra", "Pago", "Varios")
+
+# Estacionalidad de las fechas: lunes a domingo, y los días de cobro
+PESOS_DIA_SEMANA = (0.85, 0.9, 0.95, 1.0, 1.2, 1.35, 1.0)
+DIAS_DE_COBRO = (1, 2, 3, 4, 5)
+FACTOR_COBRO = 1.6
+
+
+# ======================================================
+# GENERACIÓN
+# ======================================================
+
+def pesos_zipf(cantidad, exponente=ZIPF):
+    """
+    Pesos acumulados de una distribución de Zipf sobre `cantidad`
+    rangos (el de rango k pesa 1 / k^exponente).
+    """
+    return list(accumulate(1 / k ** exponente for k in range(1, cantidad + 1)))
+
+
+def peso_del_dia(ordinal):
+    """
+    Cuántos gastos se esperan en el día, relativo a un día promedio.
+    """
+    dia = date.fromordinal(ordinal)
+    peso = PESOS_DIA_SEMANA[dia.weekday()]
+    return peso * FACTOR_COBRO if dia.day in DIAS_DE_COBRO else peso
+
+
+def generar_gastos(cantidad, desde=DESDE, hasta=HASTA, eliminados=ELIMINADOS,
+                   pesos=None, zipf=ZIPF, semilla=None, primer_id=1):
+    """
+    Genera `cantidad` filas (id, fecha, categoria, descripcion, monto,
+    estado), el mismo formato que validar_fila_gasto, ordenadas por fecha
+    entre `desde` y `hasta`. pesos: {hoja: peso} para cambiar los de
+    PESOS_CATEGORIA. Con la misma semilla se obtienen las mismas filas.
+    Retorna un generador: las filas se arman a medida que se piden.
+    """
+    if cantidad < 0:
+        raise ValueError(f"cantidad inválida: {cantidad}")
+    if not 0 <= eliminados <= 1:
+        raise ValueError(f"fracción de eliminados inválida: {eliminados}")
+    inicio = datetime.strptime(desde, "%d/%m/%Y").toordinal()
+    fin = datetime.strptime(hasta, "%d/%m/%Y").toordinal()
+    if fin < inicio:
+        raise ValueError(f"el período termina antes de empezar: {desde} - {hasta}")
+
+    azar = random.Random(semilla)
+    pesos = {**PESOS_CATEGORIA, **(pesos or {})}
+    hojas = hojas_categorias_recursivo(CATEGORIAS_JERARQUICAS)
+    desconocidas = set(pesos) - set(hojas)
+    if desconocidas:
+        raise ValueError(f"categorías que no son hojas: {', '.join(sorted(desconocidas))}")
+    acumulado_hojas = list(accumulate(pesos.get(hoja, 1) for hoja in hojas))
+
+    # Por hoja: parámetros de la log-normal y vocabulario con sus pesos
+    perfiles = {}
+    for hoja in hojas:
+        mediana, dispersion = MONTOS_CATEGORIA.get(hoja, MONTO_POR_DEFECTO)
+        vocabulario = VOCABULARIO.get(hoja, VOCABULARIO_POR_DEFECTO)
+        perfiles[hoja] = (math.log(mediana), dispersion, vocabulario,
+                          pesos_zipf(len(vocabulario), zipf))
+
+    # Se reparte la cantidad entre los días según su peso, redondeando
+    # el acumulado para que el total dé exacto
+    pesos_dias = [peso_del_dia(ordinal) for ordinal in range(inicio, fin + 1)]
+    total_pesos = sum(pesos_dias)
+
+    def filas():
+        acumulado, emitidos, gid = 0.0, 0, primer_id
+        for ordinal, peso in zip(range(inicio, fin + 1), pesos_dias):
+            acumulado += peso
+            hasta_hoy = cantidad if ordinal == fin else round(cantidad * acumulado / total_pesos)
+            del_dia = hasta_hoy - emitidos
+            if del_dia <= 0:
+                continue
+            emitidos = hasta_hoy
+            fecha = ordinal_a_fecha(ordinal)
+            for hoja in azar.choices(hojas, cum_weights=acumulado_hojas, k=del_dia):
+                mu, sigma, vocabulario, acumulado_vocabulario = perfiles[hoja]
+                descripcion = vocabulario[bisect(acumulado_vocabulario,
+                                                 azar.random() * acumulado_vocabulario[-1])]
+                monto = round(azar.lognormvariate(mu, sigma), 2)
+                estado = "eliminado" if azar.random() < eliminados else "activo"
+                yield gid, fecha, hoja, descripcion, monto, estado
+                gid += 1
+
+    # Los errores de los parámetros saltan acá y no al pedir la primera fila
+    return filas()
+
+
+# ======================================================
+# DESTINOS
+# ======================================================
+
+def escribir_csv(ruta, filas):
+    """
+    Escribe las filas con el formato de gastos.csv, de a bloques y de
+    forma atómica. Retorna cuántas escribió.
+    """
+    ruta_completa = os.path.join(os.path.dirname(__file__), ruta)
+    filas = iter(filas)
+    escritas = 0
+    with escritura_atomica(ruta_completa) as f:
+        writer = csv.writer(f)
+        writer.writerow(CAMPOS_CSV)
+        while True:
+            bloque = list(islice(filas, TAMANIO_BLOQUE))
+            if not bloque:
+                break
+            writer.writerows(bloque)
+            escritas += len(bloque)
+    return escritas
+
+
+def escribir_sqlite(ruta, filas):
+    """
+    Reemplaza los gastos de la base SQLite por las filas, confirmando
+    cada bloque (así el WAL no crece con todo el archivo).
+    Retorna cuántas escribió.
+    """
+    from base_datos import conectar
+
+    filas = iter(filas)
+    escritas = 0
+    conexion = conectar(ruta)
+    try:
+        with conexion:
+            conexion.execute("DELETE FROM gastos")
+        while True:
+            bloque = list(islice(filas, TAMANIO_BLOQUE))
+            if not bloque:
+                break
+            with conexion:
+                conexion.executemany(
+                    "INSERT INTO gastos (id, fecha, ordinal, categoria, descripcion, monto, "
+                    "estado, posicion) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((gid, fecha, fecha_a_ordinal(fecha), categoria, descripcion, monto, estado, escritas + i)
+                     for i, (gid, fecha, categoria, descripcion, monto, estado) in enumerate(bloque)))
+            escritas += len(bloque)
+    finally:
+        conexion.close()
+    return escritas
+
+
+def volcar_en_almacen(filas):
+    """
+    Arma un almacén en memoria con las filas (para pruebas y benchmarks).
+    Retorna (gastos, orden, categorias_usadas, ultimo_id).
+    """
+    columnas = ColumnasGastos()
+    filas = iter(filas)
+    while True:
+        bloque = list(islice(filas, TAMANIO_BLOQUE))
+        if not bloque:
+            break
+        columnas.agregar_bloque(bloque)
+    return columnas.resultado()
+
+
+DESTINOS = {"csv": escribir_csv, "sqlite": escribir_sqlite}
+
+
+# ======================================================
+# LÍNEA DE COMANDOS
+# ======================================================
+
+def _peso(texto):
+    """
+    "Categoría=peso" -> (categoría, peso).
+    """
+    categoria, _, peso = texto.rpartition("=")
+    try:
+        return categoria, float(peso)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"peso inválido: {texto!r} (se espera Categoría=peso)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera un libro de gastos sintético.")
+    parser.add_argument("cantidad", type=int)
+    parser.add_argument("--salida", required=True, help="Archivo a generar (se reemplaza)")
+    parser.add_argument("--formato", choices=sorted(DESTINOS), default="csv")
+    parser.add_argument("--desde", default=DESDE, help="dd/mm/aaaa")
+    parser.add_argument("--hasta", default=HASTA, help="dd/mm/aaaa")
+    parser.add_argument("--eliminados", type=float, default=ELIMINADOS,
+                        help="Fracción de gastos en la papelera")
+    parser.add_argument("--zipf", type=float, default=ZIPF,
+                        help="Exponente de Zipf de las descripciones")
+    parser.add_argument("--semilla", type=int)
+    parser.add_argument("--peso", type=_peso, action="append", default=[],
+                        help="Peso de una categoría hoja, como Supermercado=40 (repetible)")
+    args = parser.parse_args(argv)
+
+    try:
+        filas = generar_gastos(args.cantidad, args.desde, args.hasta, args.eliminados,
+                               dict(args.peso), args.zipf, args.semilla)
+        inicio = perf_counter()
+        escritas = DESTINOS[args.formato](args.salida, filas)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Se generaron {escritas} gastos en {args.salida} ({perf_counter() - inicio:.1f} s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,451 @@
+# ======================================================
+# INDICES.PY - Índices mantenidos por el almacén de gastos
+# ======================================================
+
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from heapq import heapify, heappop, heappush
+
+# ======================================================
+# ÍNDICE POR FECHA
+# ======================================================
+
+# Cada clave empaqueta (ordinal de fecha, ID) en un solo entero:
+# ordinal * BASE_ID + id. Así el orden de las claves es fecha y luego ID.
+BASE_ID = 1 << 32
+
+
+class IndiceFecha:
+    """
+    Lista ordenada de claves (fecha, ID) sobre un array('q').
+    La posición se busca con bisect en O(log n); el rango [desde, hasta]
+    se resuelve con dos búsquedas binarias y un recorte de k elementos.
+    """
+
+    def __init__(self):
+        self._claves = array("q")
+
+    def agregar(self, ordinal, num):
+        """
+        Inserta un gasto en su posición ordenada.
+        """
+        clave = ordinal * BASE_ID + num
+        self._claves.insert(bisect_right(self._claves, clave), clave)
+
+    def cargar(self, ordinales, nums):
+        """
+        Agrega muchos gastos de una vez: arma las claves y las ordena en
+        una sola pasada en lugar de insertar una por una.
+        """
+        claves = [ordinal * BASE_ID + num for ordinal, num in zip(ordinales, nums)]
+        claves.extend(self._claves)
+        claves.sort()
+        self._claves = array("q", claves)
+
+    def quitar(self, ordinal, num):
+        """
+        Quita un gasto del índice. Retorna False si no estaba.
+        """
+        clave = ordinal * BASE_ID + num
+        pos = bisect_left(self._claves, clave)
+        if pos < len(self._claves) and self._claves[pos] == clave:
+            del self._claves[pos]
+            return True
+        return False
+
+    def quitar_varios(self, ordinales, nums):
+        """
+        Quita muchos gastos de una vez, filtrando las claves en una pasada.
+        """
+        quitar = {ordinal * BASE_ID + num for ordinal, num in zip(ordinales, nums)}
+        if quitar:
+            self._claves = array("q", [c for c in self._claves if c not in quitar])
+
+    def rango(self, desde=None, hasta=None):
+        """
+        IDs con fecha entre los ordinales desde y hasta (inclusive),
+        en orden ascendente.
+        """
+        inicio = 0 if desde is None else bisect_left(self._claves, desde * BASE_ID)
+        fin = (len(self._claves) if hasta is None
+               else bisect_left(self._claves, (hasta + 1) * BASE_ID))
+        return [clave % BASE_ID for clave in self._claves[inicio:fin]]
+
+    def primeros(self, n):
+        """
+        Los n IDs con fecha más antigua.
+        """
+        return [clave % BASE_ID for clave in self._claves[:n]]
+
+    def ultimos(self, n):
+        """
+        Los n IDs con fecha más reciente, del más nuevo al más viejo.
+        """
+        if n <= 0:
+            return []
+        return [clave % BASE_ID for clave in reversed(self._claves[-n:])]
+
+    def __len__(self):
+        return len(self._claves)
+
+
+# ======================================================
+# ÍNDICE POR CATEGORÍA
+# ======================================================
+
+class IndiceCategoria:
+    """
+    Categoría -> IndiceFecha con los IDs activos de esa categoría.
+    Cada conjunto de IDs queda ordenado por fecha, así los filtros por
+    categoría cuestan en proporción a los resultados y no al total.
+    """
+
+    def __init__(self):
+        self._por_categoria = {}
+
+    def agregar(self, categoria, ordinal, num):
+        """
+        Agrega un gasto al conjunto de su categoría.
+        """
+        indice = self._por_categoria.get(categoria)
+        if indice is None:
+            indice = self._por_categoria[categoria] = IndiceFecha()
+        indice.agregar(ordinal, num)
+
+    def cargar(self, categorias, ordinales, nums):
+        """
+        Agrega muchos gastos de una vez, agrupados por categoría.
+        """
+        grupos = {}
+        for categoria, ordinal, num in zip(categorias, ordinales, nums):
+            grupo = grupos.get(categoria)
+            if grupo is None:
+                grupo = grupos[categoria] = ([], [])
+            grupo[0].append(ordinal)
+            grupo[1].append(num)
+        for categoria, (ords, ids) in grupos.items():
+            indice = self._por_categoria.get(categoria)
+            if indice is None:
+                indice = self._por_categoria[categoria] = IndiceFecha()
+            indice.cargar(ords, ids)
+
+    def quitar_varios(self, categorias, ordinales, nums):
+        """
+        Quita muchos gastos de una vez, agrupados por categoría.
+        """
+        grupos = {}
+        for categoria, ordinal, num in zip(categorias, ordinales, nums):
+            grupo = grupos.get(categoria)
+            if grupo is None:
+                grupo = grupos[categoria] = ([], [])
+            grupo[0].append(ordinal)
+            grupo[1].append(num)
+        for categoria, (ords, ids) in grupos.items():
+            indice = self._por_categoria.get(categoria)
+            if indice is None:
+                continue
+            indice.quitar_varios(ords, ids)
+            if len(indice) == 0:
+                del self._por_categoria[categoria]
+
+    def quitar(self, categoria, ordinal, num):
+        """
+        Quita un gasto de su categoría; descarta categorías vacías.
+        """
+        indice = self._por_categoria.get(categoria)
+        if indice is None:
+            return False
+        quitado = indice.quitar(ordinal, num)
+        if len(indice) == 0:
+            del self._por_categoria[categoria]
+        return quitado
+
+    def ids(self, categoria):
+        """
+        IDs activos de la categoría, ordenados por fecha.
+        """
+        indice = self._por_categoria.get(categoria)
+        return indice.rango() if indice is not None else []
+
+    def cantidad(self, categoria):
+        """
+        Cantidad de gastos activos de la categoría.
+        """
+        indice = self._por_categoria.get(categoria)
+        return len(indice) if indice is not None else 0
+
+    def categorias(self):
+        """
+        Categorías con al menos un gasto activo.
+        """
+        return list(self._por_categoria)
+
+
+
+# ======================================================
+# ÍNDICE INVERTIDO DE DESCRIPCIONES
+# ======================================================
+
+def normalizar_texto(texto):
+    """
+    Pasa a minúsculas y quita tildes ("Súper" -> "super").
+    """
+    descompuesto = unicodedata.normalize("NFD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """
+    Conjunto de palabras normalizadas de un texto.
+    """
+    return set(normalizar_texto(texto).split())
+
+
+def trigramas(token):
+    """
+    Conjunto de trigramas (substrings de 3 letras) de una palabra.
+    """
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+class IndiceTexto:
+    """
+    Índice invertido palabra -> IDs sobre las descripciones.
+
+    - Vocabulario ordenado para búsquedas por prefijo (bisect).
+    - Trigramas -> palabras para encontrar substrings sin recorrer
+      el vocabulario completo.
+    """
+
+    def __init__(self):
+        self._ids_por_token = {}
+        self._vocabulario = []
+        self._tokens_por_trigrama = {}
+
+    def agregar(self, num, texto):
+        """
+        Indexa las palabras de un texto para el ID indicado.
+        """
+        self.agregar_varios((num,), texto)
+
+    def agregar_varios(self, nums, texto):
+        """
+        Indexa el mismo texto para varios IDs, tokenizándolo una sola vez.
+        """
+        self.cargar(((nums, texto),))
+
+    def cargar(self, pares):
+        """
+        Indexa muchos pares (IDs, texto). Las palabras nuevas se juntan en
+        un conjunto y entran al vocabulario con un solo ordenamiento.
+        """
+        nuevos = set()
+        for nums, texto in pares:
+            for token in tokenizar(texto):
+                ids = self._ids_por_token.get(token)
+                if ids is None:
+                    ids = self._ids_por_token[token] = set()
+                    nuevos.add(token)
+                    for tri in trigramas(token):
+                        self._tokens_por_trigrama.setdefault(tri, set()).add(token)
+                ids.update(nums)
+        if len(nuevos) == 1:
+            insort(self._vocabulario, nuevos.pop())
+        elif nuevos:
+            # sort() aprovecha que el vocabulario ya está ordenado
+            self._vocabulario.extend(nuevos)
+            self._vocabulario.sort()
+
+    def quitar(self, num, texto):
+        """
+        Quita un ID del índice; las palabras sin IDs salen del vocabulario.
+        """
+        for token in tokenizar(texto):
+            ids = self._ids_por_token.get(token)
+            if ids is None:
+                continue
+            ids.discard(num)
+            if not ids:
+                del self._ids_por_token[token]
+                del self._vocabulario[bisect_left(self._vocabulario, token)]
+                for tri in trigramas(token):
+                    tokens = self._tokens_por_trigrama[tri]
+                    tokens.discard(token)
+                    if not tokens:
+                        del self._tokens_por_trigrama[tri]
+
+    def ids_con_token(self, token):
+        """
+        IDs cuya descripción contiene exactamente esa palabra.
+        """
+        return self._ids_por_token.get(normalizar_texto(token), set())
+
+    def tokens_con_prefijo(self, prefijo):
+        """
+        Palabras del vocabulario que empiezan con el prefijo.
+        """
+        prefijo = normalizar_texto(prefijo)
+        inicio = bisect_left(self._vocabulario, prefijo)
+        fin = inicio
+        while fin < len(self._vocabulario) and self._vocabulario[fin].startswith(prefijo):
+            fin += 1
+        return self._vocabulario[inicio:fin]
+
+    def tokens_que_contienen(self, fragmento):
+        """
+        Palabras del vocabulario que contienen el fragmento.
+        Con 3 letras o más se intersectan los trigramas; si no, se
+        recorre el vocabulario (mucho más chico que la cantidad de gastos).
+        """
+        if len(fragmento) < 3:
+            return [t for t in self._vocabulario if fragmento in t]
+        candidatos = None
+        for tri in trigramas(fragmento):
+            tokens = self._tokens_por_trigrama.get(tri)
+            if not tokens:
+                return []
+            candidatos = set(tokens) if candidatos is None else candidatos & tokens
+        return [t for t in candidatos if fragmento in t]
+
+    def ids_con_prefijo(self, prefijo):
+        """
+        IDs con alguna palabra que empieza con el prefijo.
+        """
+        ids = set()
+        for token in self.tokens_con_prefijo(prefijo):
+            ids |= self._ids_por_token[token]
+        return ids
+
+    def candidatos(self, consulta):
+        """
+        IDs que contienen cada palabra de la consulta como substring de
+        alguna de sus palabras. Con más de una palabra hay que verificar
+        el texto completo de los candidatos.
+        """
+        resultado = None
+        for fragmento in normalizar_texto(consulta).split():
+            ids = set()
+            for token in self.tokens_que_contienen(fragmento):
+                ids |= self._ids_por_token[token]
+            resultado = ids if resultado is None else resultado & ids
+            if not resultado:
+                return set()
+        return resultado if resultado is not None else set()
+
+
+# ======================================================
+# AGREGADOS ACUMULADOS
+# ======================================================
+
+class Agregados:
+    """
+    Cantidad, suma, mínimo, máximo y suma por categoría de un grupo de
+    gastos, actualizados en cada alta/baja para responder en O(1).
+    Para el mínimo y el máximo se cuentan las repeticiones de cada monto
+    y se mantienen dos heaps con borrado diferido: una baja solo descuenta
+    el contador, y los montos que ya no están se descartan al consultar.
+    """
+
+    def __init__(self):
+        self.cantidad = 0
+        self.total = 0.0
+        self._repeticiones = {}  # {monto: cantidad de gastos con ese monto}
+        self._menores = []       # heap de montos
+        self._mayores = []       # heap de montos negados
+        self._suma_categoria = {}
+        self._cantidad_categoria = {}
+
+    def sumar(self, categoria, monto):
+        """
+        Agrega un monto a los acumulados.
+        """
+        self.cantidad += 1
+        self.total += monto
+        veces = self._repeticiones.get(monto, 0)
+        self._repeticiones[monto] = veces + 1
+        if not veces:
+            heappush(self._menores, monto)
+            heappush(self._mayores, -monto)
+            self._compactar_heaps()
+        self._suma_categoria[categoria] = self._suma_categoria.get(categoria, 0.0) + monto
+        self._cantidad_categoria[categoria] = self._cantidad_categoria.get(categoria, 0) + 1
+
+    def cargar(self, categorias, montos):
+        """
+        Suma muchos montos de una vez (los heaps se rearman una sola vez).
+        """
+        self.cantidad += len(montos)
+        self.total += sum(montos)
+        nuevos = []
+        for categoria, monto in zip(categorias, montos):
+            veces = self._repeticiones.get(monto, 0)
+            if not veces:
+                nuevos.append(monto)
+            self._repeticiones[monto] = veces + 1
+            self._suma_categoria[categoria] = self._suma_categoria.get(categoria, 0.0) + monto
+            self._cantidad_categoria[categoria] = self._cantidad_categoria.get(categoria, 0) + 1
+        if nuevos:
+            self._menores.extend(nuevos)
+            self._mayores.extend(-monto for monto in nuevos)
+            heapify(self._menores)
+            heapify(self._mayores)
+            self._compactar_heaps()
+
+    def restar(self, categoria, monto):
+        """
+        Quita un monto de los acumulados.
+        """
+        self.cantidad -= 1
+        self.total = self.total - monto if self.cantidad else 0.0
+        self._descontar(monto)
+        restantes = self._cantidad_categoria[categoria] - 1
+        if restantes:
+            self._cantidad_categoria[categoria] = restantes
+            self._suma_categoria[categoria] -= monto
+        else:
+            del self._cantidad_categoria[categoria]
+            del self._suma_categoria[categoria]
+
+    def restar_varios(self, categorias, montos):
+        """
+        Quita muchos montos de una vez.
+        """
+        for categoria, monto in zip(categorias, montos):
+            self.restar(categoria, monto)
+
+    def _descontar(self, monto):
+        # El monto queda en los heaps hasta que llegue al tope
+        veces = self._repeticiones[monto] - 1
+        if veces:
+            self._repeticiones[monto] = veces
+        else:
+            del self._repeticiones[monto]
+
+    def _compactar_heaps(self):
+        # Si los heaps acumulan demasiados montos ya borrados, se rearman
+        # con los vigentes para que no crezcan sin límite.
+        if len(self._menores) > 2 * len(self._repeticiones) + 32:
+            self._menores = list(self._repeticiones)
+            self._mayores = [-monto for monto in self._menores]
+            heapify(self._menores)
+            heapify(self._mayores)
+
+    def minimo(self):
+        while self._menores and self._menores[0] not in self._repeticiones:
+            heappop(self._menores)
+        return self._menores[0] if self._menores else None
+
+    def maximo(self):
+        while self._mayores and -self._mayores[0] not in self._repeticiones:
+            heappop(self._mayores)
+        return -self._mayores[0] if self._mayores else None
+
+    def promedio(self):
+        return self.total / self.cantidad if self.cantidad else 0
+
+    def suma_por_categoria(self):
+        """
+        Copia del total acumulado por categoría.
+        """
+        return dict(self._suma_categoria)
@@ -5,34 +5,17 @@
 # UADE - Prof. David Yaps
 # ======================================================
 
-from matrices import crear_calendario, dia_con_mayor_gasto, total_por_semana, total_por_dia_semana, dias_sin_gastos
-from operaciones import (
-    agregar_gasto, editar_gasto, eliminar_gasto, restaurar_gasto,
-    filtrar_por_categoria, filtrar_por_fecha, filtrar_por_monto_mayor,
-    buscar_gastos_por_palabra, ids_por_categoria, ids_por_monto_mayor,
-    gastos_por_ids, categorias_faltantes, porcentaje_cobertura,
-    resumen_por_categoria, gastos_ordenados_por_monto, gastos_ordenados_por_fecha,
-    gastos_importantes, total_montos, promedio_gastos, 
-    obtener_montos_con_iva, obtener_mes, filtrar_rango_fechas,
-    obtener_gastos_eliminados, numeros_en_descripciones
-)
-from analisis_recursivo import (
-    mostrar_jerarquia_categorias,
-    buscar_categoria_recursiva,
-    generar_reporte_recursivo,
-    sumar_lista_recursiva,
-    encontrar_maximo_recursivo,
-    CATEGORIAS_JERARQUICAS
-)
+import sys
+import threading
+
+# Solo se importa de entrada lo que usa el menú principal. Cada submenú
+# importa lo suyo al abrirse, y la carga de los gastos (que trae almacen,
+# archivos, operaciones...) corre en un hilo mientras se muestra el menú.
+# Para medir el arranque: python arranque.py
 from validaciones import (
     pedir_fecha, pedir_monto, pedir_categoria, pedir_descripcion,
     pedir_opcion_numerica, pedir_palabra, pedir_id,
-)
-
-from archivos import (
-    guardar_gastos_csv, cargar_gastos_csv,
-    guardar_calendario, cargar_calendario,
-    leer_logs
+    pedir_mes, pedir_periodo,
 )
 from presentacion import (
     mostrar_lista, mostrar_calendario, mostrar_menu_principal,
@@ -47,16 +30,20 @@ from presentacion import (
 
 class SistemaGastos:
     def __init__(self):
-        self.dias_mes = 30
-        self.gastos = {}
+        self.gastos = None  # lo crea cargar_datos
         self.orden = []
         self.categorias_usadas = set()
-        self.calendario = crear_calendario(self.dias_mes)
+        self.calendario = {}  # {(año, mes): matriz}, se crea por mes con datos
         self.ultimo_id = 0
         self.modificado = False
+        self.carga = None  # hilo de la carga inicial, si sigue en curso
+        self.salida_carga = None
+        self.error_carga = None
 
 
 def menu_gestion(sistema):
+    from operaciones import agregar_gasto, editar_gasto, eliminar_gasto, gastos_ordenados_por_fecha
+
     while True:
         mostrar_submenu_gestion()
         opcion = pedir_opcion_numerica()
@@ -100,7 +87,8 @@ def menu_gestion(sistema):
                 if sub in [1, 3]:
                     nuevo_monto = pedir_monto()
                 if sub in [2, 3]:
-                    nueva_desc = pedir_descripcion()
+                    # Vacía: se deja la descripción que tenía
+                    nueva_desc = pedir_descripcion() or None
                 
                 if editar_gasto(sistema.gastos, sistema.calendario, gid, nuevo_monto, nueva_desc):
                     sistema.modificado = True
@@ -114,7 +102,7 @@ def menu_gestion(sistema):
             if gid in sistema.gastos and sistema.gastos[gid].get('estado') == 'activo':
                 mostrar_gasto_individual(sistema.gastos[gid])
                 if confirmar_accion("\n¿Confirma eliminar este gasto?"):
-                    if eliminar_gasto(sistema.gastos, sistema.orden, gid):
+                    if eliminar_gasto(sistema.gastos, sistema.orden, gid, sistema.calendario):
                         sistema.modificado = True
                         print("\n✓ Gasto movido a la papelera.")
                     else:
@@ -128,6 +116,12 @@ def menu_gestion(sistema):
 
 
 def menu_consultas(sistema):
+    from operaciones import (
+        filtrar_por_categoria, filtrar_por_fecha, filtrar_por_monto_mayor,
+        filtrar_rango_fechas, buscar_gastos_por_palabra, ids_por_categoria_y_monto,
+        gastos_por_ids, gastos_ordenados_por_monto, primeros_gastos, ultimos_gastos
+    )
+
     while True:
         mostrar_submenu_consultas()
         opcion = pedir_opcion_numerica()
@@ -137,15 +131,11 @@ def menu_consultas(sistema):
         
         elif opcion == 1:  # Últimos 10
             print("\n--- ÚLTIMOS 10 GASTOS ---")
-            gastos_activos = [gid for gid in sistema.orden if sistema.gastos.get(gid, {}).get('estado') == 'activo']
-            ultimos = gastos_activos[-10:]
-            mostrar_lista([sistema.gastos[g] for g in reversed(ultimos)])
+            mostrar_lista(ultimos_gastos(sistema.gastos, sistema.orden, 10))
         
         elif opcion == 2:  # Primeros 10
             print("\n--- PRIMEROS 10 GASTOS ---")
-            gastos_activos = [gid for gid in sistema.orden if sistema.gastos.get(gid, {}).get('estado') == 'activo']
-            primeros = gastos_activos[:10]
-            mostrar_lista([sistema.gastos[g] for g in primeros])
+            mostrar_lista(primeros_gastos(sistema.gastos, sistema.orden, 10))
         
         elif opcion == 3:  # Por categoría
             print("\n--- FILTRAR POR CATEGORÍA ---")
@@ -176,9 +166,7 @@ def menu_consultas(sistema):
             categoria = pedir_categoria()
             umbral = pedir_monto()
             
-            ids_cat = ids_por_categoria(sistema.gastos, categoria)
-            ids_monto = ids_por_monto_mayor(sistema.gastos, umbral)
-            ids_comunes = ids_cat & ids_monto
+            ids_comunes = ids_por_categoria_y_monto(sistema.gastos, categoria, umbral)
             
             if ids_comunes:
                 print(f"\n✓ Encontrados {len(ids_comunes)} gastos:")
@@ -198,6 +186,15 @@ def menu_consultas(sistema):
 
 
 def menu_estadisticas(sistema):
+    from matrices import (
+        obtener_calendario_mes, dia_con_mayor_gasto_periodo, total_por_semana_periodo,
+        total_por_dia_semana_periodo, dias_sin_gastos_mes
+    )
+    from operaciones import (
+        resumen_por_categoria, categorias_faltantes, porcentaje_cobertura,
+        resumen_estadistico, verificar_agregados
+    )
+
     while True:
         mostrar_submenu_estadisticas()
         opcion = pedir_opcion_numerica()
@@ -212,26 +209,32 @@ def menu_estadisticas(sistema):
         
         elif opcion == 2:  # Calendario
             print("\n--- CALENDARIO MENSUAL ---")
-            mostrar_calendario(sistema.calendario)
+            anio, mes = pedir_mes()
+            mostrar_calendario(obtener_calendario_mes(sistema.calendario, anio, mes), anio, mes)
         
         elif opcion == 3:  # Día con mayor gasto
             print("\n--- DÍA CON MAYOR GASTO ---")
-            dia, monto = dia_con_mayor_gasto(sistema.calendario)
+            desde, hasta = pedir_periodo()
+            fecha, monto = dia_con_mayor_gasto_periodo(sistema.calendario, desde, hasta)
             if monto > 0:
-                print(f"Día {dia}: ${monto:,.2f}")
+                print(f"Día {fecha}: ${monto:,.2f}")
             else:
                 print("No hay gastos registrados.")
         
         elif opcion == 4:  # Por semana
             print("\n--- TOTALES POR SEMANA ---")
-            totales = total_por_semana(sistema.calendario)
-            for i, total in enumerate(totales, 1):
-                print(f"  Semana {i}: ${total:,.2f}")
+            desde, hasta = pedir_periodo()
+            totales = total_por_semana_periodo(sistema.calendario, desde, hasta)
+            if not totales:
+                print("No hay gastos registrados.")
+            for (anio, semana), total in totales:
+                print(f"  Semana {semana:02d}/{anio}: ${total:,.2f}")
         
         elif opcion == 5:  # Por día de la semana
             print("\n--- TOTALES POR DÍA DE LA SEMANA ---")
+            desde, hasta = pedir_periodo()
             dias_semana = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
-            totales = total_por_dia_semana(sistema.calendario)
+            totales = total_por_dia_semana_periodo(sistema.calendario, desde, hasta)
             for dia, total in zip(dias_semana, totales):
                 print(f"  {dia:<10}: ${total:,.2f}")
         
@@ -243,18 +246,36 @@ def menu_estadisticas(sistema):
         
         elif opcion == 7:  # Días sin gastos
             print("\n--- DÍAS SIN MOVIMIENTOS ---")
-            dias_vacios = dias_sin_gastos(sistema.calendario, sistema.dias_mes)
+            anio, mes = pedir_mes()
+            dias_vacios = dias_sin_gastos_mes(sistema.calendario, anio, mes)
             mostrar_dias_sin_movimientos(dias_vacios)
         
         elif opcion == 8:  # Promedio
             print("\n--- PROMEDIO DE GASTOS ---")
-            promedio = promedio_gastos(sistema.gastos)
-            gastos_activos = len([g for g in sistema.gastos.values() if g.get('estado') == 'activo'])
-            print(f"  Promedio: ${promedio:,.2f}")
-            print(f"  Total de gastos activos: {gastos_activos}")
+            stats = resumen_estadistico(sistema.gastos)
+            print(f"  Promedio: ${stats['promedio']:,.2f}")
+            print(f"  Total de gastos activos: {stats['cantidad']}")
+            if stats['cantidad']:
+                print(f"  Mínimo: ${stats['minimo']:,.2f}")
+                print(f"  Máximo: ${stats['maximo']:,.2f}")
+        
+        elif opcion == 9:  # Verificar acumulados
+            print("\n--- VERIFICAR TOTALES ACUMULADOS ---")
+            diferencias = verificar_agregados(sistema.gastos)
+            if diferencias:
+                print(f" Se encontraron {len(diferencias)} diferencia(s):")
+                for d in diferencias:
+                    print(f"    • {d}")
+            else:
+                print("✓ Los totales acumulados coinciden con los datos.")
 
 
 def menu_herramientas(sistema):
+    from operaciones import (
+        gastos_importantes, total_montos, obtener_montos_con_iva, obtener_mes,
+        numeros_en_descripciones, cantidad_gastos_activos
+    )
+
     while True:
         mostrar_submenu_herramientas()
         opcion = pedir_opcion_numerica()
@@ -282,7 +303,7 @@ def menu_herramientas(sistema):
         elif opcion == 3:  # Total general
             print("\n--- TOTAL GENERAL ---")
             total = total_montos(sistema.gastos)
-            gastos_activos = len([g for g in sistema.gastos.values() if g.get('estado') == 'activo'])
+            gastos_activos = cantidad_gastos_activos(sistema.gastos)
             print(f"  Total acumulado: ${total:,.2f}")
             print(f"  Cantidad de gastos: {gastos_activos}")
         
@@ -303,6 +324,16 @@ def menu_herramientas(sistema):
 
 
 def menu_recursivo_analisis(sistema):
+    from operaciones import obtener_gastos_activos
+    from analisis_recursivo import (
+        mostrar_jerarquia_categorias,
+        buscar_categoria_recursiva,
+        generar_reporte_recursivo,
+        sumar_lista_recursiva,
+        encontrar_maximo_recursivo,
+        CATEGORIAS_JERARQUICAS
+    )
+
     while True:
         mostrar_submenu_recursivo()
         opcion = pedir_opcion_numerica()
@@ -327,13 +358,14 @@ def menu_recursivo_analisis(sistema):
         elif opcion == 3:  # Reporte jerárquico
             print("\n--- REPORTE JERÁRQUICO DE GASTOS ---")
             print("\nAnálisis por categorías y subcategorías:\n")
+            gastos_activos = obtener_gastos_activos(sistema.gastos)
             for cat in CATEGORIAS_JERARQUICAS.keys():
-                generar_reporte_recursivo(sistema.gastos, CATEGORIAS_JERARQUICAS, cat)
+                generar_reporte_recursivo(gastos_activos, CATEGORIAS_JERARQUICAS, cat)
                 print()
         
         elif opcion == 4:  # Suma recursiva
             print("\n--- SUMA RECURSIVA DE MONTOS ---")
-            gastos_activos = [g for g in sistema.gastos.values() if g.get('estado') == 'activo']
+            gastos_activos = list(obtener_gastos_activos(sistema.gastos).values())
             if gastos_activos:
                 lista_montos = [g["monto"] for g in gastos_activos]
                 total = sumar_lista_recursiva(lista_montos)
@@ -344,7 +376,7 @@ def menu_recursivo_analisis(sistema):
         
         elif opcion == 5:  # Máximo recursivo
             print("\n--- MONTO MÁXIMO (BÚSQUEDA RECURSIVA) ---")
-            gastos_activos = [g for g in sistema.gastos.values() if g.get('estado') == 'activo']
+            gastos_activos = list(obtener_gastos_activos(sistema.gastos).values())
             if gastos_activos:
                 lista_montos = [g["monto"] for g in gastos_activos]
                 maximo = encontrar_maximo_recursivo(lista_montos)
@@ -358,6 +390,11 @@ def menu_recursivo_analisis(sistema):
 
 
 def menu_papelera(sistema):
+    from operaciones import (
+        obtener_gastos_eliminados, restaurar_gasto, vaciar_papelera,
+        recuperar_gasto_de_backup
+    )
+
     while True:
         mostrar_submenu_papelera()
         opcion = pedir_opcion_numerica()
@@ -376,7 +413,7 @@ def menu_papelera(sistema):
         elif opcion == 2:  # Restaurar
             print("\n--- RESTAURAR GASTO ---")
             gid = pedir_id()
-            if restaurar_gasto(sistema.gastos, gid):
+            if restaurar_gasto(sistema.gastos, gid, sistema.calendario):
                 sistema.modificado = True
                 print(f"\n✓ Gasto #{gid} restaurado.")
             else:
@@ -389,13 +426,24 @@ def menu_papelera(sistema):
         elif opcion == 4:  # Limpiar permanentemente
             print("\n--- LIMPIAR PAPELERA ---")
             if confirmar_accion("¿Eliminar permanentemente todos los gastos de la papelera?"):
-                eliminados = [k for k, v in sistema.gastos.items() if v.get('estado') == 'eliminado']
-                for gid in eliminados:
-                    del sistema.gastos[gid]
+                cantidad = vaciar_papelera(sistema.gastos, sistema.orden)
+                sistema.modificado = True
+                print(f" {cantidad} gasto(s) eliminado(s) permanentemente.")
+
+        elif opcion == 5:  # Recuperar desde el backup
+            print("\n--- RECUPERAR GASTO DESDE EL BACKUP ---")
+            gid = pedir_id()
+            if recuperar_gasto_de_backup(sistema.gastos, sistema.orden,
+                                         sistema.categorias_usadas, gid, sistema.calendario):
                 sistema.modificado = True
-                print(f" {len(eliminados)} gasto(s) eliminado(s) permanentemente.")
+                print(f"\n✓ Gasto #{gid} recuperado.")
+            else:
+                print(" El ID sigue cargado o no tiene copia en el backup.")
 
 def menu_archivos(sistema):
+    from archivos import leer_logs
+    from bitacora import historial_gasto, historial_dia
+
     while True:
         mostrar_submenu_archivos()
         opcion = pedir_opcion_numerica()
@@ -404,34 +452,158 @@ def menu_archivos(sistema):
             return
         
         elif opcion == 1:  # Guardar
-            guardar_gastos_csv("gastos.csv", sistema.gastos, sistema.orden)
-            guardar_calendario("calendario.txt", sistema.calendario, sistema.ultimo_id)
-            sistema.modificado = False
+            guardar_datos(sistema)
         
         elif opcion == 2:  # Cargar
-            ok1, g, o, cu, uid = cargar_gastos_csv("gastos.csv")
-            ok2, cal, _ = cargar_calendario("calendario.txt", sistema.dias_mes)
-            if ok1:
-                sistema.gastos = g
-                sistema.orden = o
-                sistema.categorias_usadas = cu
-                sistema.ultimo_id = uid
-            if ok2:
-                sistema.calendario = cal
+            cargar_datos(sistema)
         
         elif opcion == 3:  
             print("\n--- LOG DEL SISTEMA ---")
-            lineas = leer_logs()  # Usamos la función importada
+            lineas = leer_logs(20)  # Solo las últimas, sin leer todo el archivo
             
             if lineas:
                 print("\nÚltimas 20 entradas del log:\n")
-                for linea in lineas[-20:]:
+                for linea in lineas:
                     print(linea.strip())
             elif lineas == []:
                 print("El archivo de log existe pero está vacío o no se encontró.")
             else:
                 print("No se pudo leer el archivo de log.")
 
+        elif opcion == 4:  # Historial de un gasto (índice del log)
+            print("\n--- HISTORIAL DE UN GASTO ---")
+            gid = pedir_id()
+            lineas = historial_gasto(gid)
+            if lineas:
+                for linea in lineas:
+                    print(linea.strip())
+            else:
+                print(f"No hay registros del gasto {gid} en el log.")
+
+        elif opcion == 5:  # Historial de un día (índice del log)
+            print("\n--- HISTORIAL DE UN DÍA ---")
+            fecha = pedir_fecha()
+            lineas = historial_dia(fecha)
+            if lineas:
+                for linea in lineas:
+                    print(linea.strip())
+            else:
+                print(f"No hay registros del {fecha} en el log.")
+
+def cargar_datos(sistema):
+    """
+    Abre el diario de cambios (tomando su candado), carga la foto de los
+    gastos, reaplica el diario y reconstruye el calendario a partir de los
+    gastos (calendario.txt queda solo como exportación). El diario queda
+    abierto para anotar los cambios hasta salir.
+    """
+    from archivos import cargar_foto
+    from diario import RUTA_DIARIO, DiarioOcupado, activar_diario, diario_activo, reproducir_diario
+    from operaciones import construir_calendario
+
+    # El candado se toma antes de leer: mientras el menú esté abierto la
+    # CLI no puede anotar cambios que esta copia no vería
+    if diario_activo() is None:
+        try:
+            activar_diario()
+        except DiarioOcupado as e:
+            print(f"\n{e}")
+            raise SystemExit(1)
+
+    ok, g, o, cu, uid = cargar_foto()
+    aplicados, uid = reproducir_diario(RUTA_DIARIO, g, o, cu, uid)
+    if ok or aplicados or sistema.gastos is None:
+        sistema.gastos = g
+        sistema.orden = o
+        sistema.categorias_usadas = cu
+        sistema.ultimo_id = uid
+        sistema.calendario = construir_calendario(g)
+    if aplicados:
+        print(f"Se reaplicaron {aplicados} cambio(s) del diario.")
+    return ok
+
+
+def guardar_datos(sistema):
+    """
+    Guarda la foto (gastos.bin, gastos.csv y calendario.txt) y vacía el
+    diario, que ya quedó incluido en ella. Solo se reescriben los archivos
+    afectados por los gastos modificados desde el último guardado.
+    """
+    from archivos import guardar_foto
+    from diario import diario_activo
+
+    def guardar():
+        return guardar_foto(sistema.gastos, sistema.orden, sistema.ultimo_id, sistema.calendario)
+
+    diario = diario_activo()
+    ok = diario.compactar(guardar) if diario is not None else guardar()
+    if ok:
+        sistema.modificado = False
+    return ok
+
+
+# ======================================================
+# CARGA EN SEGUNDO PLANO
+# ======================================================
+
+class _SalidaPorHilo:
+    """
+    Envuelve sys.stdout: lo que escribe el hilo indicado se guarda para
+    después y lo del resto de los hilos pasa directo. Así los mensajes
+    de la carga no se mezclan con el menú que se está mostrando.
+    """
+    def __init__(self, salida, hilo):
+        self.salida = salida
+        self.hilo = hilo
+        self.guardado = []
+
+    def write(self, texto):
+        if threading.current_thread() is self.hilo:
+            self.guardado.append(texto)
+            return len(texto)
+        return self.salida.write(texto)
+
+    def __getattr__(self, nombre):
+        return getattr(self.salida, nombre)
+
+
+def iniciar_carga(sistema):
+    """
+    Lanza cargar_datos en un hilo aparte. Los menús que usan los gastos
+    tienen que llamar antes a esperar_carga.
+    """
+    def cargar():
+        try:
+            cargar_datos(sistema)
+        except BaseException as e:  # se relanza en esperar_carga
+            sistema.error_carga = e
+
+    hilo = threading.Thread(target=cargar, name="carga-gastos", daemon=True)
+    sistema.salida_carga = _SalidaPorHilo(sys.stdout, hilo)
+    sys.stdout = sistema.salida_carga
+    sistema.carga = hilo
+    hilo.start()
+
+
+def esperar_carga(sistema):
+    """
+    Espera a que termine la carga (si hay una en curso), devuelve
+    sys.stdout a su lugar y muestra los mensajes que dejó la carga.
+    """
+    if sistema.carga is None:
+        return
+    sistema.carga.join()
+    sistema.carga = None
+    salida = sistema.salida_carga
+    sistema.salida_carga = None
+    if sys.stdout is salida:
+        sys.stdout = salida.salida
+    print("".join(salida.guardado), end="")
+    if sistema.error_carga is not None:
+        error, sistema.error_carga = sistema.error_carga, None
+        raise error
+
+
 def main():
     sistema = SistemaGastos()
     
@@ -439,20 +611,13 @@ def main():
     print(" "*20 + "BIENVENIDO AL GESTOR DE GASTOS PERSONALES")
     print("="*80)
     
-    # Cargar datos automáticamente
-    ok1, g, o, cu, uid = cargar_gastos_csv("gastos.csv")
-    ok2, cal, _ = cargar_calendario("calendario.txt", sistema.dias_mes)
-    if ok1:
-        sistema.gastos = g
-        sistema.orden = o
-        sistema.categorias_usadas = cu
-        sistema.ultimo_id = uid
-    if ok2:
-        sistema.calendario = cal
+    # Cargar datos automáticamente, sin frenar el primer menú
+    iniciar_carga(sistema)
     
     while True:
         mostrar_menu_principal()
         opcion = pedir_opcion_numerica()
+        esperar_carga(sistema)
         
         if opcion == 1:
             menu_gestion(sistema)
@@ -468,9 +633,21 @@ def main():
             menu_papelera(sistema)
         elif opcion == 7:
             menu_archivos(sistema)
-        elif opcion == 0:
-            if sistema.modificado and not confirmar_accion("¿Salir sin guardar?"):
+        
+        # La carga ya importó el diario: no cuesta nada
+        from diario import diario_activo, desactivar_diario
+        
+        # Compactación periódica del diario
+        diario = diario_activo()
+        if diario is not None and diario.necesita_compactar():
+            guardar_datos(sistema)
+
+        if opcion == 0:
+            # Con el diario activo los cambios ya están en disco
+            if (sistema.modificado and diario_activo() is None
+                    and not confirmar_accion("¿Salir sin guardar?")):
                 continue
+            desactivar_diario()
             print("\n" + "="*80)
             print(" "*25 + "GRACIAS POR USAR EL SISTEMA")
             print("="*80 + "\n")
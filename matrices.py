@@ -2,7 +2,64 @@
 # MATRICES.PY - Operaciones con matrices (calendario)
 # ======================================================
 
+import sys
+import importlib.util
 from math import ceil
+from calendar import monthrange
+from datetime import date
+
+
+def _importar_diferido(nombre):
+    """
+    Retorna el módulo sin ejecutarlo: se carga de verdad la primera vez
+    que se usa uno de sus atributos. None si no está instalado.
+    """
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    spec = importlib.util.find_spec(nombre)
+    if spec is None:
+        return None
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nombre] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+# NumPy es opcional: si está instalado, las estadísticas se calculan
+# con reducciones vectorizadas; si no, con los recorridos en Python.
+# Importarlo tarda más que todo el resto del programa, así que se difiere
+# hasta la primera estadística (el menú principal no lo necesita).
+np = _importar_diferido("numpy")
+
+USAR_NUMPY = np is not None
+
+# Al restar los montos de un día, la resta en punto flotante puede dejar
+# un residuo (0.1 + 0.2 - 0.1 - 0.2 no da 0). Si lo que queda es menor
+# que esta fracción de los montos en juego, el día quedó sin gastos y la
+# celda vuelve a 0.0 exacto, igual que al reconstruir el calendario.
+RESIDUO_RELATIVO = 1e-9
+
+
+def _acumular(actual, monto):
+    total = actual + monto
+    if abs(total) <= RESIDUO_RELATIVO * max(abs(actual), abs(monto)):
+        return 0.0
+    return total
+
+
+def usar_numpy(activar):
+    """
+    Activa o desactiva el backend NumPy (si está instalado).
+    Retorna el estado final.
+    """
+    global USAR_NUMPY
+    USAR_NUMPY = bool(activar) and np is not None
+    return USAR_NUMPY
+
+
+def _es_array(calendario):
+    return USAR_NUMPY and isinstance(calendario, np.ndarray)
 
 def crear_calendario(dias_mes):
     """
@@ -24,11 +81,15 @@ def dia_con_mayor_gasto(calendario):
     """
     Encuentra el día con mayor gasto registrado en el mes.
     """
+    if _es_array(calendario):
+        return _dia_con_mayor_gasto_np(calendario)
     mayor = -1
     dia_max = -1
     dia = 1
     for fila in calendario:
         for valor in fila:
+            if valor is None:  # Celda de relleno (antes del día 1 o después del último)
+                continue
             if valor > mayor:
                 mayor = valor
                 dia_max = dia
@@ -40,17 +101,22 @@ def total_por_semana(calendario):
     """
     Calcula el total gastado por semana.
     """
-    return [sum(fila) for fila in calendario]
+    if _es_array(calendario):
+        return np.nansum(calendario, axis=-1).tolist()
+    return [sum(v for v in fila if v is not None) for fila in calendario]
 
 
 def total_por_dia_semana(calendario):
     """
     Calcula el total por día de la semana (lunes a domingo).
     """
+    if _es_array(calendario):
+        return np.nansum(calendario.reshape(-1, 7), axis=0).tolist()
     totales = [0] * 7
     for fila in calendario:
         for i, valor in enumerate(fila):
-            totales[i] += valor
+            if valor is not None:
+                totales[i] += valor
     return totales
 
 
@@ -58,10 +124,14 @@ def dias_con_gasto_mayor(calendario, umbral):
     """
     Devuelve una lista de días donde el gasto supera el umbral indicado.
     """
+    if _es_array(calendario):
+        return _dias_donde_np(calendario, mascara_umbral(calendario, umbral))
     dias = []
     dia = 1
     for fila in calendario:
         for valor in fila:
+            if valor is None:
+                continue
             if valor > umbral:
                 dias.append(dia)
             dia += 1
@@ -85,7 +155,10 @@ def agregar_monto_a_dia(calendario, dia, monto):
     """
     fila, col = dia_a_posicion(dia)
     if 0 <= fila < len(calendario) and 0 <= col < 7:
-        calendario[fila][col] += monto
+        if _es_array(calendario):
+            calendario[fila, col] = _acumular(calendario[fila, col], monto)
+        else:
+            calendario[fila][col] = _acumular(calendario[fila][col], monto)
         return True
     return False
 
@@ -94,10 +167,14 @@ def dias_con_gastos(calendario):
     """
     Devuelve un conjunto con los días que tienen gastos registrados.
     """
+    if _es_array(calendario):
+        return set(_dias_donde_np(calendario, mascara_umbral(calendario, 0)))
     usados = set()
     dia = 1
     for fila in calendario:
         for valor in fila:
+            if valor is None:
+                continue
             if valor > 0:
                 usados.add(dia)
             dia += 1
@@ -110,3 +187,260 @@ def dias_sin_gastos(calendario, dias_mes):
     """
     usados = dias_con_gastos(calendario)
     return set(range(1, dias_mes + 1)).difference(usados)
+
+
+# ======================================================
+# CALENDARIO DE VARIOS MESES Y AÑOS
+# ======================================================
+# Los calendarios se guardan en un diccionario {(año, mes): matriz}.
+# Cada matriz se crea recién cuando el mes recibe su primer gasto, con
+# la cantidad real de días del mes y el día 1 en su día de la semana
+# (columna 0 = lunes). Las celdas fuera del mes valen None.
+
+def crear_calendario_mes(anio, mes):
+    """
+    Crea la matriz (semanas x 7) de un mes con su desfasaje real.
+    """
+    desfasaje, dias_mes = monthrange(anio, mes)
+    filas = ceil((desfasaje + dias_mes) / 7)
+    matriz = [[None] * 7 for _ in range(filas)]
+    for dia in range(1, dias_mes + 1):
+        fila, col = posicion_en_mes(anio, mes, dia)
+        matriz[fila][col] = 0.0
+    return matriz
+
+
+def posicion_en_mes(anio, mes, dia):
+    """
+    Convierte un día de un mes concreto a coordenadas (fila, columna).
+    """
+    desfasaje = monthrange(anio, mes)[0]
+    indice = int(dia) - 1 + desfasaje
+    return (indice // 7, indice % 7)
+
+
+def obtener_calendario_mes(calendarios, anio, mes, crear=False):
+    """
+    Retorna la matriz de un mes. Si el mes no tiene datos se devuelve una
+    vacía, que solo se guarda en el diccionario si crear es True.
+    """
+    matriz = calendarios.get((anio, mes))
+    if matriz is None:
+        matriz = crear_calendario_mes(anio, mes)
+        if crear:
+            calendarios[(anio, mes)] = matriz
+    return matriz
+
+
+def agregar_monto_a_fecha(calendarios, fecha, monto):
+    """
+    Suma un monto a la fecha dd/mm/aaaa en el calendario de su mes.
+    """
+    d, m, a = (int(x) for x in fecha.split("/"))
+    if not 1 <= d <= monthrange(a, m)[1]:
+        return False
+    matriz = obtener_calendario_mes(calendarios, a, m, crear=True)
+    fila, col = posicion_en_mes(a, m, d)
+    matriz[fila][col] = _acumular(matriz[fila][col], monto)
+    return True
+
+
+def sumar_en_calendario(calendario, fecha, monto):
+    """
+    Suma un monto (o una diferencia) en la fecha indicada.
+    Acepta el calendario por meses (dict) o una matriz mensual simple.
+    """
+    if isinstance(calendario, dict):
+        return agregar_monto_a_fecha(calendario, fecha, monto)
+    return agregar_monto_a_dia(calendario, fecha.split("/")[0], monto)
+
+
+def calendario_desde_columnas(ordinales, montos):
+    """
+    Arma el calendario {(año, mes): matriz} sumando los montos por día
+    (ordinales de fecha) en una sola pasada sobre las columnas.
+    """
+    if USAR_NUMPY and len(ordinales):
+        sumas = _sumas_por_dia_np(ordinales, montos)
+    else:
+        sumas = {}
+        for ordinal, monto in zip(ordinales, montos):
+            sumas[ordinal] = sumas.get(ordinal, 0.0) + monto
+    calendarios = {}
+    for ordinal, total in sumas.items():
+        dia = date.fromordinal(ordinal)
+        matriz = obtener_calendario_mes(calendarios, dia.year, dia.month, crear=True)
+        fila, col = posicion_en_mes(dia.year, dia.month, dia.day)
+        matriz[fila][col] += total
+    return calendarios
+
+
+def meses_en_periodo(calendarios, desde=None, hasta=None):
+    """
+    Meses (año, mes) con datos dentro del período, en orden.
+    desde y hasta son tuplas (año, mes) o None para no limitar.
+    """
+    return sorted(
+        clave for clave in calendarios
+        if (desde is None or clave >= desde) and (hasta is None or clave <= hasta)
+    )
+
+
+def recorrer_dias(calendarios, desde=None, hasta=None):
+    """
+    Genera (fecha, monto) para cada día de los meses con datos del período.
+    """
+    for anio, mes in meses_en_periodo(calendarios, desde, hasta):
+        matriz = calendarios[(anio, mes)]
+        for dia in range(1, monthrange(anio, mes)[1] + 1):
+            fila, col = posicion_en_mes(anio, mes, dia)
+            yield date(anio, mes, dia), matriz[fila][col]
+
+
+def dia_con_mayor_gasto_periodo(calendarios, desde=None, hasta=None):
+    """
+    Día con mayor gasto en el período: retorna (fecha dd/mm/aaaa, monto).
+    """
+    if USAR_NUMPY:
+        return _dia_con_mayor_gasto_periodo_np(calendarios, desde, hasta)
+    mejor_fecha, mayor = None, 0
+    for fecha, monto in recorrer_dias(calendarios, desde, hasta):
+        if monto > mayor:
+            mejor_fecha, mayor = fecha, monto
+    if mejor_fecha is None:
+        return None, 0
+    return mejor_fecha.strftime("%d/%m/%Y"), mayor
+
+
+def total_por_semana_periodo(calendarios, desde=None, hasta=None):
+    """
+    Totales por semana ISO en el período: lista de ((año, semana), total).
+    Las semanas que cruzan de un mes a otro se suman juntas.
+    """
+    if USAR_NUMPY:
+        return _total_por_semana_periodo_np(calendarios, desde, hasta)
+    totales = {}
+    for fecha, monto in recorrer_dias(calendarios, desde, hasta):
+        anio_iso, semana, _ = fecha.isocalendar()
+        totales[(anio_iso, semana)] = totales.get((anio_iso, semana), 0) + monto
+    return sorted(totales.items())
+
+
+def total_por_dia_semana_periodo(calendarios, desde=None, hasta=None):
+    """
+    Total por día de la semana (lunes a domingo) en el período.
+    """
+    if USAR_NUMPY:
+        _, cubo = apilar_meses(calendarios, desde, hasta)
+        return np.nansum(cubo, axis=(0, 1)).tolist()
+    totales = [0] * 7
+    for anio, mes in meses_en_periodo(calendarios, desde, hasta):
+        for i, total in enumerate(total_por_dia_semana(calendarios[(anio, mes)])):
+            totales[i] += total
+    return totales
+
+
+def dias_sin_gastos_mes(calendarios, anio, mes):
+    """
+    Días de un mes concreto sin gastos registrados.
+    """
+    matriz = obtener_calendario_mes(calendarios, anio, mes)
+    return dias_sin_gastos(matriz, monthrange(anio, mes)[1])
+
+
+# ======================================================
+# BACKEND NUMPY (OPCIONAL)
+# ======================================================
+# Un mes es un array 2-D (semanas x 7) con NaN fuera del mes; un período
+# es un array 3-D (meses x 6 x 7). Las estadísticas son reducciones
+# vectorizadas sobre esos arrays.
+
+def calendario_a_array(calendario):
+    """
+    Convierte una matriz mensual (listas, None fuera del mes) a array 2-D.
+    """
+    return np.array(calendario, dtype=float)
+
+
+def apilar_meses(calendarios, desde=None, hasta=None):
+    """
+    Apila los meses con datos del período en un array 3-D (meses x 6 x 7).
+    Retorna (lista de (año, mes), array).
+    """
+    claves = meses_en_periodo(calendarios, desde, hasta)
+    cubo = np.full((len(claves), 6, 7), np.nan)
+    for i, clave in enumerate(claves):
+        matriz = calendarios[clave]
+        cubo[i, :len(matriz)] = matriz if _es_array(matriz) else np.array(matriz, dtype=float)
+    return claves, cubo
+
+
+def mascara_umbral(calendario, umbral):
+    """
+    Máscara booleana de las celdas cuyo gasto supera el umbral
+    (las celdas fuera del mes quedan en False).
+    """
+    with np.errstate(invalid="ignore"):
+        return np.nan_to_num(calendario, nan=-np.inf) > umbral
+
+
+def _dias_donde_np(calendario, mascara):
+    # Número de día de cada celda = celdas válidas acumuladas hasta ella
+    validos = ~np.isnan(calendario).ravel()
+    dias = np.cumsum(validos)
+    return dias[mascara.ravel() & validos].tolist()
+
+
+def _dia_con_mayor_gasto_np(calendario):
+    plano = calendario.ravel()
+    valores = plano[~np.isnan(plano)]
+    if valores.size == 0:
+        return -1, -1
+    i = int(np.argmax(valores))
+    return i + 1, float(valores[i])
+
+
+def _dia_con_mayor_gasto_periodo_np(calendarios, desde, hasta):
+    claves, cubo = apilar_meses(calendarios, desde, hasta)
+    if not claves:
+        return None, 0
+    plano = np.nan_to_num(cubo, nan=-np.inf).ravel()
+    i = int(np.argmax(plano))
+    if plano[i] <= 0:
+        return None, 0
+    mes_i, celda = divmod(i, 42)
+    anio, mes = claves[mes_i]
+    dia = celda - monthrange(anio, mes)[0] + 1
+    return f"{dia:02d}/{mes:02d}/{anio:04d}", float(plano[i])
+
+
+def _total_por_semana_periodo_np(calendarios, desde, hasta):
+    claves, cubo = apilar_meses(calendarios, desde, hasta)
+    if not claves:
+        return []
+    # Cada fila de un mes es una semana lunes-domingo: su lunes identifica
+    # la semana aunque esté repartida entre dos meses.
+    lunes = np.array([date(a, m, 1).toordinal() - monthrange(a, m)[0] for a, m in claves])
+    lunes = (lunes[:, None] + 7 * np.arange(6)[None, :]).ravel()
+    filas_validas = ~np.isnan(cubo).all(axis=-1).ravel()
+    sumas = np.nansum(cubo, axis=-1).ravel()
+    semanas, inversa = np.unique(lunes[filas_validas], return_inverse=True)
+    totales = np.bincount(inversa, weights=sumas[filas_validas])
+    resultado = []
+    for ordinal, total in zip(semanas.tolist(), totales.tolist()):
+        anio_iso, semana, _ = date.fromordinal(ordinal).isocalendar()
+        resultado.append(((anio_iso, semana), total))
+    return resultado
+
+
+def _sumas_por_dia_np(ordinales, montos):
+    """
+    Suma los montos por ordinal de fecha con np.bincount.
+    Retorna {ordinal: total} solo para los días con algún gasto.
+    """
+    ordinales = np.asarray(ordinales, dtype=np.int64)
+    base = int(ordinales.min())
+    posiciones = ordinales - base
+    sumas = np.bincount(posiciones, weights=np.asarray(montos, dtype=float))
+    dias = np.flatnonzero(np.bincount(posiciones))
+    return dict(zip((dias + base).tolist(), sumas[dias].tolist()))
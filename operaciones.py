@@ -2,10 +2,20 @@
 # OPERACIONES.PY - Lógica principal de gastos
 # ======================================================
 
+import sys
+import math
+import heapq
 from functools import reduce
+from bisect import bisect_right
 from constantes import MESES, CATEGORIAS_TUPLA, COD_CATEGORIAS
-from matrices import agregar_monto_a_dia, dia_a_posicion
-from archivos import crear_backup_gasto, registrar_log
+from matrices import sumar_en_calendario, calendario_desde_columnas
+from archivos import (
+    crear_backup_gasto, crear_backups_gastos, buscar_backups,
+    registrar_log, registrar_logs, validar_fila_gasto
+)
+from diario import anotar, anotar_varios
+from almacen import es_almacen, VistaGasto, fecha_a_ordinal
+from indices import normalizar_texto
 import re
 
 # ======================================================
@@ -33,20 +43,41 @@ def fecha_a_tupla(fecha):
 
 def descripcion_contiene_palabra(gasto, palabra):
     """
-    Verifica si la descripción contiene una palabra específica.
+    Verifica si la descripción contiene una palabra específica
+    (sin distinguir mayúsculas ni tildes).
     """
-    palabras = gasto["descripcion"].lower().split()
-    return palabra.lower() in palabras
+    if isinstance(gasto, VistaGasto):
+        return gasto.tiene_palabra(palabra)
+    palabras = normalizar_texto(gasto["descripcion"]).split()
+    return normalizar_texto(palabra) in palabras
 
 
 def buscar_gastos_por_palabra(gastos, palabra):
     """
-    Retorna gastos cuya descripción contiene la palabra indicada.
+    Retorna gastos cuya descripción contiene la palabra indicada
+    (sin distinguir mayúsculas ni tildes).
     """
-    palabra = palabra.lower()
+    if es_almacen(gastos):
+        return gastos.vistas(gastos.ids_con_texto(palabra))
+    if _consulta_externa(gastos):
+        return gastos.buscar_por_palabra(palabra)
+    palabra = normalizar_texto(palabra)
     return [
         g for g in gastos.values()
-        if palabra in g["descripcion"].lower()
+        if palabra in normalizar_texto(g["descripcion"])
+    ]
+
+
+def buscar_gastos_por_prefijo(gastos, prefijo):
+    """
+    Retorna gastos con alguna palabra que empieza con el prefijo.
+    """
+    if es_almacen(gastos):
+        return gastos.vistas(gastos.ids_con_prefijo(prefijo))
+    prefijo = normalizar_texto(prefijo)
+    return [
+        g for g in gastos.values()
+        if any(p.startswith(prefijo) for p in normalizar_texto(g["descripcion"]).split())
     ]
 
 
@@ -73,21 +104,19 @@ def agregar_gasto(gastos, orden, categorias_usadas, calendario,
     
     gastos[sid] = gasto
     
-    fecha_nueva = fecha_a_tupla(fecha)
-    pos = len(orden)  
-    
-    for i, gid in enumerate(orden):
-        if gid in gastos and gastos[gid].get('estado') == 'activo':
-            fecha_existente = fecha_a_tupla(gastos[gid]["fecha"])
-            if fecha_nueva < fecha_existente:  
-                break
+    # Búsqueda binaria de la posición por fecha (el almacén ya indexa el gasto)
+    if es_almacen(gastos):
+        clave_fecha = gastos.ordinal
+    else:
+        clave_fecha = lambda gid: fecha_a_tupla(gastos[gid]["fecha"])
+    pos = bisect_right(orden, clave_fecha(sid), key=clave_fecha)
     
     orden.insert(pos, sid)
     categorias_usadas.add(categoria)
     
-    dia = fecha.split("/")[0]
-    agregar_monto_a_dia(calendario, dia, monto)
+    sumar_en_calendario(calendario, fecha, monto)
     
+    anotar("ALTA", sid, fecha, categoria, descripcion, monto)
     registrar_log(f"Gasto agregado: ID={sid}, Monto=${monto}, Categoría={categoria}")
     
     return nuevo_id
@@ -100,59 +129,112 @@ def editar_gasto(gastos, calendario, gid, nuevo_monto=None, nueva_desc=None):
     g = gastos.get(gid)
     if g is None or g.get('estado') != 'activo':
         return False
+    if nueva_desc is not None:
+        _validar_descripcion(nueva_desc)
     
     cambios = []
     
     if nuevo_monto is not None:
         diferencia = nuevo_monto - g["monto"]
-        dia = g["fecha"].split("/")[0]
-        fila, col = dia_a_posicion(dia)
-        if 0 <= fila < len(calendario) and 0 <= col < 7:
-            calendario[fila][col] += diferencia
+        sumar_en_calendario(calendario, g["fecha"], diferencia)
         cambios.append(f"Monto: ${g['monto']} → ${nuevo_monto}")
         g["monto"] = nuevo_monto
+        anotar("MONTO", gid, nuevo_monto)
     
     if nueva_desc is not None:
         cambios.append(f"Descripción: '{g['descripcion']}' → '{nueva_desc}'")
         g["descripcion"] = nueva_desc
+        anotar("DESCRIPCION", gid, nueva_desc)
     
     if cambios:
         registrar_log(f"Gasto editado: ID={gid}, Cambios: {', '.join(cambios)}")
     
     return True
 
-def eliminar_gasto(gastos, orden, gid):
+def eliminar_gasto(gastos, orden, gid, calendario=None):
     """
     Marca un gasto como eliminado (baja lógica) y crea backup.
+    En el almacén columnar el gasto pasa a la partición de papelera.
+    Si se pasa el calendario, su monto se descuenta de ese día.
     """
     if gid in gastos and gastos[gid].get('estado') == 'activo':
         # Crear backup antes de eliminar
         crear_backup_gasto(gastos[gid])
         
+        if calendario is not None:
+            sumar_en_calendario(calendario, gastos[gid]["fecha"], -gastos[gid]["monto"])
+        
         # Marcar como eliminado
-        gastos[gid]['estado'] = 'eliminado'
+        if es_almacen(gastos):
+            gastos.eliminar(gid)
+        else:
+            gastos[gid]['estado'] = 'eliminado'
         
+        anotar("BAJA", gid)
         registrar_log(f"Gasto eliminado: ID={gid}, Descripción={gastos[gid]['descripcion']}")
         
         return True
     return False
 
 
-def restaurar_gasto(gastos, gid):
+def restaurar_gasto(gastos, gid, calendario=None):
     """
     Restaura un gasto eliminado.
+    Si se pasa el calendario, su monto vuelve a sumarse en ese día.
     """
     if gid in gastos and gastos[gid].get('estado') == 'eliminado':
-        gastos[gid]['estado'] = 'activo'
+        if calendario is not None:
+            sumar_en_calendario(calendario, gastos[gid]["fecha"], gastos[gid]["monto"])
+        if es_almacen(gastos):
+            gastos.restaurar(gid)
+        else:
+            gastos[gid]['estado'] = 'activo'
+        anotar("RESTAURACION", gid)
         registrar_log(f"Gasto restaurado: ID={gid}")
         return True
     return False
 
 
+def recuperar_gasto_de_backup(gastos, orden, categorias_usadas, gid, calendario=None):
+    """
+    Vuelve a cargar, con su ID original, un gasto que ya se borró de la
+    papelera, usando su última copia en el archivo de backups.
+    """
+    if gid in gastos:
+        return False
+    backups = buscar_backups(gid)
+    if not backups:
+        return False
+    copia = backups[-1]
+    sid = str(int(copia["id"]))
+    gastos[sid] = {
+        "id": sid,
+        "fecha": copia["fecha"],
+        "monto": copia["monto"],
+        "categoria": copia["categoria"],
+        "descripcion": copia["descripcion"],
+        "estado": "activo"
+    }
+    if es_almacen(gastos):
+        clave_fecha = gastos.ordinal
+    else:
+        clave_fecha = lambda g: fecha_a_tupla(gastos[g]["fecha"])
+    orden.insert(bisect_right(orden, clave_fecha(sid), key=clave_fecha), sid)
+    categorias_usadas.add(copia["categoria"])
+    if calendario is not None:
+        sumar_en_calendario(calendario, copia["fecha"], copia["monto"])
+
+    anotar("ALTA", sid, copia["fecha"], copia["categoria"], copia["descripcion"], copia["monto"])
+    registrar_log(f"Gasto recuperado del backup: ID={sid}")
+    return True
+
+
 def obtener_gastos_activos(gastos):
     """
     Retorna solo los gastos activos.
     """
+    if es_almacen(gastos):
+        return {g["id"]: g for g in gastos.vistas_activas()}
     return {k: v for k, v in gastos.items() if v.get('estado', 'activo') == 'activo'}
 
 
@@ -160,9 +242,269 @@ def obtener_gastos_eliminados(gastos):
     """
     Retorna solo los gastos eliminados.
     """
+    if es_almacen(gastos):
+        return {g["id"]: g for g in gastos.vistas_eliminadas()}
     return {k: v for k, v in gastos.items() if v.get('estado') == 'eliminado'}
 
 
+def cantidad_gastos_activos(gastos):
+    """
+    Retorna la cantidad de gastos activos.
+    """
+    if es_almacen(gastos):
+        return gastos.cantidad_activos()
+    return sum(1 for _ in _valores_activos(gastos))
+
+
+def vaciar_papelera(gastos, orden):
+    """
+    Borra permanentemente los gastos eliminados y los quita del orden.
+    Retorna la cantidad de gastos borrados. El calendario no cambia:
+    los gastos de la papelera ya se descontaron al eliminarlos.
+    """
+    if es_almacen(gastos):
+        purgados = set(gastos.vaciar_papelera())
+    else:
+        purgados = {k for k, v in gastos.items() if v.get('estado') == 'eliminado'}
+        for gid in purgados:
+            del gastos[gid]
+    if purgados:
+        orden[:] = [gid for gid in orden if gid not in purgados]
+        anotar("PURGA", len(purgados), *sorted(purgados, key=int))
+    return len(purgados)
+
+
+def construir_calendario(gastos):
+    """
+    Reconstruye el calendario {(año, mes): matriz} a partir de los
+    gastos activos. En el almacén columnar suma directo sobre las
+    columnas de fecha y monto.
+    """
+    if es_almacen(gastos) or _consulta_externa(gastos):
+        return calendario_desde_columnas(*gastos.columnas_fecha_monto())
+    activos = list(_valores_activos(gastos))
+    return calendario_desde_columnas(
+        [fecha_a_ordinal(g["fecha"]) for g in activos],
+        [g["monto"] for g in activos]
+    )
+
+
+def _consulta_externa(gastos):
+    """
+    Indica si los gastos viven fuera de memoria (base SQLite o CSV
+    mapeado) y resuelven filtros y agregados por su cuenta. Si el
+    módulo del backend nunca se importó, los gastos no pueden venir de
+    él; así el menú no paga por cargar sqlite3 o mmap si no los usa.
+    """
+    base_datos = sys.modules.get("base_datos")
+    gastos_mapeados = sys.modules.get("gastos_mapeados")
+    return ((base_datos is not None and base_datos.es_sqlite(gastos))
+            or (gastos_mapeados is not None and gastos_mapeados.es_mapeado(gastos)))
+
+
+def _valores_activos(gastos):
+    """
+    Itera los gastos activos. En el almacén columnar recorre solo la
+    partición de activos; en un dict filtra por estado.
+    """
+    if es_almacen(gastos):
+        return gastos.vistas_activas()
+    if _consulta_externa(gastos):
+        return iter(gastos.activos())
+    return (g for g in gastos.values() if g.get('estado', 'activo') == 'activo')
+
+
+# ======================================================
+# OPERACIONES POR LOTES
+# ======================================================
+# Validan el lote completo antes de tocar nada: si algún elemento es
+# inválido se lanza ValueError y no se aplica ningún cambio. Después lo
+# aplican de una pasada: el orden se combina una sola vez, el calendario
+# se actualiza una vez por día, y el diario, el log y los backups se
+# escriben una sola vez por lote.
+
+def _sumar_por_dia(calendario, movimientos):
+    """
+    Suma en el calendario los (fecha, monto) agrupados por día.
+    """
+    if calendario is None:
+        return
+    por_dia = {}
+    for fecha, monto in movimientos:
+        por_dia[fecha] = por_dia.get(fecha, 0) + monto
+    for fecha, total in por_dia.items():
+        sumar_en_calendario(calendario, fecha, total)
+
+
+def _validar_monto(monto):
+    try:
+        valor = float(monto)
+    except (TypeError, ValueError):
+        raise ValueError(f"monto inválido: {monto!r}")
+    if not math.isfinite(valor) or valor < 0:
+        raise ValueError(f"monto inválido: {monto!r}")
+    return valor
+
+
+def _validar_descripcion(descripcion):
+    if not isinstance(descripcion, str) or not descripcion.strip():
+        raise ValueError(f"descripción inválida: {descripcion!r}")
+    return descripcion
+
+
+def _validar_ids(gastos, gids, estado):
+    """
+    Verifica que los IDs existan, estén en `estado` y no se repitan.
+    """
+    vistos = set()
+    for gid in gids:
+        if gid in vistos:
+            raise ValueError(f"ID repetido en el lote: {gid}")
+        if gid not in gastos or gastos[gid].get('estado') != estado:
+            raise ValueError(f"ID {gid} no encontrado o no está {estado}")
+        vistos.add(gid)
+
+
+def agregar_gastos_lote(gastos, orden, categorias_usadas, calendario, ultimo_id, lote):
+    """
+    Agrega varios gastos (fecha, monto, categoria, descripcion) con IDs
+    consecutivos. Retorna el nuevo último ID.
+    """
+    nuevos = []
+    ids_vistos = set()
+    for i, gasto in enumerate(lote, 1):
+        try:
+            fecha, monto, categoria, descripcion = gasto
+            num, fecha, categoria, descripcion, monto, _ = validar_fila_gasto(
+                [str(ultimo_id + i), fecha, categoria, descripcion, monto, "activo"], ids_vistos)
+        except (TypeError, ValueError) as motivo:
+            raise ValueError(f"Gasto {i} del lote: {motivo}")
+        nuevos.append((str(num), fecha, monto, categoria, descripcion))
+    if not nuevos:
+        return ultimo_id
+
+    if es_almacen(gastos):
+        gastos.agregar_varios(nuevos)
+    else:
+        for sid, fecha, monto, categoria, descripcion in nuevos:
+            gastos[sid] = {
+                "id": sid,
+                "fecha": fecha,
+                "monto": monto,
+                "categoria": categoria,
+                "descripcion": descripcion,
+                "estado": "activo"
+            }
+
+    # Los nuevos, ordenados por fecha, se combinan con el orden actual;
+    # a igual fecha quedan después de los existentes (como bisect_right)
+    if es_almacen(gastos):
+        clave_fecha = gastos.ordinal
+    else:
+        clave_fecha = lambda gid: fecha_a_tupla(gastos[gid]["fecha"])
+    nuevos_ids = sorted((n[0] for n in nuevos), key=clave_fecha)
+    orden[:] = heapq.merge(orden, nuevos_ids, key=clave_fecha)
+
+    categorias_usadas.update(n[3] for n in nuevos)
+    _sumar_por_dia(calendario, ((fecha, monto) for _, fecha, monto, _, _ in nuevos))
+
+    anotar_varios(("ALTA", sid, fecha, categoria, descripcion, monto)
+                  for sid, fecha, monto, categoria, descripcion in nuevos)
+    registrar_logs(f"Gasto agregado: ID={sid}, Monto=${monto}, Categoría={categoria}"
+                   for sid, _, monto, categoria, _ in nuevos)
+
+    return ultimo_id + len(nuevos)
+
+
+def editar_gastos_lote(gastos, calendario, cambios):
+    """
+    Edita varios gastos activos. Cada cambio es (id, nuevo_monto,
+    nueva_desc); None deja el campo como está. Retorna cuántos se editaron.
+    """
+    cambios = [(gid,
+                None if monto is None else _validar_monto(monto),
+                None if desc is None else _validar_descripcion(desc))
+               for gid, monto, desc in cambios]
+    _validar_ids(gastos, [gid for gid, _, _ in cambios], "activo")
+
+    movimientos, registros, mensajes, montos, descripciones = [], [], [], [], []
+    for gid, nuevo_monto, nueva_desc in cambios:
+        g = gastos[gid]
+        detalle = []
+        if nuevo_monto is not None:
+            movimientos.append((g["fecha"], nuevo_monto - g["monto"]))
+            detalle.append(f"Monto: ${g['monto']} → ${nuevo_monto}")
+            montos.append((gid, nuevo_monto))
+            registros.append(("MONTO", gid, nuevo_monto))
+        if nueva_desc is not None:
+            detalle.append(f"Descripción: '{g['descripcion']}' → '{nueva_desc}'")
+            descripciones.append((gid, nueva_desc))
+            registros.append(("DESCRIPCION", gid, nueva_desc))
+        if detalle:
+            mensajes.append(f"Gasto editado: ID={gid}, Cambios: {', '.join(detalle)}")
+
+    # Todo validado: recién ahora se aplican montos y descripciones
+    if es_almacen(gastos):
+        gastos.escribir_montos(montos)
+    else:
+        for gid, nuevo_monto in montos:
+            gastos[gid]["monto"] = nuevo_monto
+    for gid, nueva_desc in descripciones:
+        gastos[gid]["descripcion"] = nueva_desc
+
+    _sumar_por_dia(calendario, movimientos)
+    anotar_varios(registros)
+    registrar_logs(mensajes)
+    return len(cambios)
+
+
+def eliminar_gastos_lote(gastos, orden, gids, calendario=None):
+    """
+    Baja lógica de varios gastos activos, con un solo append de backups.
+    Retorna cuántos se eliminaron.
+    """
+    gids = list(gids)
+    _validar_ids(gastos, gids, "activo")
+    if not gids:
+        return 0
+
+    copias = [dict(gastos[gid]) for gid in gids]
+    crear_backups_gastos(copias)
+    _sumar_por_dia(calendario, ((c["fecha"], -c["monto"]) for c in copias))
+
+    if es_almacen(gastos):
+        gastos.eliminar_varios(gids)
+    else:
+        for gid in gids:
+            gastos[gid]['estado'] = 'eliminado'
+
+    anotar_varios(("BAJA", gid) for gid in gids)
+    registrar_logs(f"Gasto eliminado: ID={c['id']}, Descripción={c['descripcion']}"
+                   for c in copias)
+    return len(gids)
+
+
+def restaurar_gastos_lote(gastos, gids, calendario=None):
+    """
+    Restaura varios gastos de la papelera. Retorna cuántos se restauraron.
+    """
+    gids = list(gids)
+    _validar_ids(gastos, gids, "eliminado")
+    if not gids:
+        return 0
+
+    _sumar_por_dia(calendario, ((gastos[gid]["fecha"], gastos[gid]["monto"]) for gid in gids))
+    if es_almacen(gastos):
+        gastos.restaurar_varios(gids)
+    else:
+        for gid in gids:
+            gastos[gid]['estado'] = 'activo'
+
+    anotar_varios(("RESTAURACION", gid) for gid in gids)
+    registrar_logs(f"Gasto restaurado: ID={gid}" for gid in gids)
+    return len(gids)
+
+
 # ======================================================
 # FILTROS
 # ======================================================
@@ -171,9 +513,13 @@ def filtrar_por_monto_mayor(gastos, umbral):
     """
     Filtra gastos con monto mayor al umbral, ordenados por fecha.
     """
+    if _consulta_externa(gastos):
+        return gastos.filtrar_por_monto_mayor(umbral)
+    if es_almacen(gastos):
+        ids = gastos.ids_activos(monto_mayor=umbral)
+        return gastos.vistas(gastos.ordenar_por_fecha(ids))
     return sorted(
-        [g for g in gastos.values() 
-        if g.get('estado', 'activo') == 'activo' and g["monto"] > umbral],
+        [g for g in _valores_activos(gastos) if g["monto"] > umbral],
         key=lambda x: fecha_a_tupla(x["fecha"])
     )
 
@@ -182,9 +528,12 @@ def filtrar_por_categoria(gastos, categoria):
     """
     Filtra gastos de una categoría específica, ordenados por fecha.
     """
+    if _consulta_externa(gastos):
+        return gastos.filtrar_por_categoria(categoria)
+    if es_almacen(gastos):
+        return gastos.vistas(gastos.ids_de_categoria(categoria))
     return sorted(
-        [g for g in gastos.values() 
-        if g.get('estado', 'activo') == 'activo' and g["categoria"] == categoria],
+        [g for g in _valores_activos(gastos) if g["categoria"] == categoria],
         key=lambda x: fecha_a_tupla(x["fecha"])
     )
 
@@ -193,9 +542,12 @@ def filtrar_por_fecha(gastos, fecha):
     """
     Filtra gastos de una fecha específica.
     """
+    if _consulta_externa(gastos):
+        return gastos.filtrar_por_fecha(fecha)
+    if es_almacen(gastos):
+        return gastos.vistas(gastos.ids_por_fecha(fecha, fecha))
     return sorted(
-        [g for g in gastos.values() 
-        if g.get('estado', 'activo') == 'activo' and g["fecha"] == fecha],
+        [g for g in _valores_activos(gastos) if g["fecha"] == fecha],
         key=lambda x: x["id"]
     )
 
@@ -204,10 +556,15 @@ def filtrar_rango_fechas(gastos, fecha_desde, fecha_hasta):
     """
     Filtra gastos en un rango de fechas, ordenados.
     """
+    if _consulta_externa(gastos):
+        return gastos.filtrar_rango_fechas(fecha_desde, fecha_hasta)
+    if es_almacen(gastos):
+        return gastos.vistas(gastos.ids_por_fecha(fecha_desde, fecha_hasta))
+    desde = fecha_a_tupla(fecha_desde)
+    hasta = fecha_a_tupla(fecha_hasta)
     return sorted(
-        [g for g in gastos.values()
-        if g.get('estado', 'activo') == 'activo' and 
-        fecha_desde <= g["fecha"] <= fecha_hasta],
+        [g for g in _valores_activos(gastos)
+        if desde <= fecha_a_tupla(g["fecha"]) <= hasta],
         key=lambda x: fecha_a_tupla(x["fecha"])
     )
 
@@ -219,6 +576,10 @@ def ids_por_categoria(gastos, categoria):
     """
     Retorna el conjunto de IDs activos de una categoría.
     """
+    if es_almacen(gastos):
+        return gastos.ids_str(gastos.ids_activos(categoria=categoria))
+    if _consulta_externa(gastos):
+        return gastos.ids_activos(categoria=categoria)
     return {gid for gid, g in gastos.items() 
             if g.get('estado', 'activo') == 'activo' and g["categoria"] == categoria}
 
@@ -227,14 +588,31 @@ def ids_por_monto_mayor(gastos, umbral):
     """
     Retorna el conjunto de IDs activos con monto mayor al umbral.
     """
+    if es_almacen(gastos):
+        return gastos.ids_str(gastos.ids_activos(monto_mayor=umbral))
+    if _consulta_externa(gastos):
+        return gastos.ids_activos(monto_mayor=umbral)
     return {gid for gid, g in gastos.items() 
             if g.get('estado', 'activo') == 'activo' and g["monto"] > umbral}
 
 
+def ids_por_categoria_y_monto(gastos, categoria, umbral):
+    """
+    Retorna los IDs activos de una categoría con monto mayor al umbral.
+    """
+    if es_almacen(gastos):
+        return gastos.ids_str(gastos.ids_activos(categoria=categoria, monto_mayor=umbral))
+    if _consulta_externa(gastos):
+        return gastos.ids_activos(categoria=categoria, monto_mayor=umbral)
+    return ids_por_categoria(gastos, categoria) & ids_por_monto_mayor(gastos, umbral)
+
+
 def gastos_por_ids(gastos, ids_):
     """
     Obtiene gastos activos a partir de un conjunto de IDs, ordenados.
     """
+    if _consulta_externa(gastos):
+        return gastos.gastos_por_ids(ids_)
     return sorted(
         [gastos[gid] for gid in ids_ 
         if gid in gastos and gastos[gid].get('estado', 'activo') == 'activo'],
@@ -269,13 +647,17 @@ def gastos_por_categoria(gastos):
     """
     Agrupa gastos activos por categoría, ordenados.
     """
+    if es_almacen(gastos):
+        return {cat: gastos.vistas(gastos.ids_de_categoria(cat))
+                for cat in gastos.categorias_activas()}
+    if _consulta_externa(gastos):
+        return gastos.agrupar_por_categoria()
     salida = {}
-    for g in gastos.values():
-        if g.get('estado', 'activo') == 'activo':
-            cat = g["categoria"]
-            if cat not in salida:
-                salida[cat] = []
-            salida[cat].append(g)
+    for g in _valores_activos(gastos):
+        cat = g["categoria"]
+        if cat not in salida:
+            salida[cat] = []
+        salida[cat].append(g)
     
     # Ordenar cada categoría por fecha
     for cat in salida:
@@ -288,11 +670,12 @@ def resumen_por_categoria(gastos):
     """
     Calcula el total gastado por categoría (solo activos).
     """
+    if es_almacen(gastos) or _consulta_externa(gastos):
+        return gastos.suma_por_categoria()
     resumen = {}
-    for g in gastos.values():
-        if g.get('estado', 'activo') == 'activo':
-            cat = g["categoria"]
-            resumen[cat] = resumen.get(cat, 0) + g["monto"]
+    for g in _valores_activos(gastos):
+        cat = g["categoria"]
+        resumen[cat] = resumen.get(cat, 0) + g["monto"]
     return resumen
 
 
@@ -300,8 +683,11 @@ def gastos_ordenados_por_monto(gastos):
     """
     Ordena gastos activos de mayor a menor monto.
     """
+    if es_almacen(gastos):
+        ids = gastos.ordenar_por_monto(gastos.ids_activos(), descendente=True)
+        return gastos.vistas(ids)
     return sorted(
-        [g for g in gastos.values() if g.get('estado', 'activo') == 'activo'],
+        list(_valores_activos(gastos)),
         key=lambda g: g["monto"],
         reverse=True
     )
@@ -311,13 +697,35 @@ def gastos_ordenados_por_fecha(gastos):
     """
     Ordena gastos activos por fecha (más recientes primero).
     """
+    if es_almacen(gastos):
+        return gastos.vistas(gastos.ids_por_fecha(descendente=True))
     return sorted(
-        [g for g in gastos.values() if g.get('estado', 'activo') == 'activo'],
+        list(_valores_activos(gastos)),
         key=lambda g: fecha_a_tupla(g["fecha"]),
         reverse=True
     )
 
 
+def primeros_gastos(gastos, orden, n=10):
+    """
+    Retorna los n gastos activos más antiguos.
+    """
+    if es_almacen(gastos):
+        return gastos.vistas(gastos.primeros_ids(n))
+    activos = [gid for gid in orden if gastos.get(gid, {}).get('estado') == 'activo']
+    return [gastos[gid] for gid in activos[:n]]
+
+
+def ultimos_gastos(gastos, orden, n=10):
+    """
+    Retorna los n gastos activos más recientes (el más nuevo primero).
+    """
+    if es_almacen(gastos):
+        return gastos.vistas(gastos.ultimos_ids(n))
+    activos = [gid for gid in orden if gastos.get(gid, {}).get('estado') == 'activo']
+    return [gastos[gid] for gid in reversed(activos[-n:])] if n > 0 else []
+
+
 # ======================================================
 # LAMBDA, MAP, FILTER, REDUCE
 # ======================================================
@@ -331,8 +739,7 @@ def obtener_montos_con_iva(gastos):
     return [
         {"id": g["id"], "descripcion": g["descripcion"], 
         "monto": g["monto"], "iva": calcular_iva(g["monto"])}
-        for g in gastos.values()
-        if g.get('estado', 'activo') == 'activo'
+        for g in _valores_activos(gastos)
     ]
 
 
@@ -341,8 +748,8 @@ def gastos_importantes(gastos, umbral):
     Retorna los gastos activos que superan un monto determinado.
     """
     return list(filter(
-        lambda g: g.get('estado', 'activo') == 'activo' and g["monto"] > umbral,
-        gastos.values()
+        lambda g: g["monto"] > umbral,
+        _valores_activos(gastos)
     ))
 
 
@@ -350,7 +757,9 @@ def total_montos(gastos):
     """
     Suma todos los montos de gastos activos usando reduce.
     """
-    gastos_activos = [g for g in gastos.values() if g.get('estado', 'activo') == 'activo']
+    if es_almacen(gastos):
+        return gastos.total_activos()
+    gastos_activos = list(_valores_activos(gastos))
     if not gastos_activos:
         return 0
     return reduce(lambda acum, g: acum + g["monto"], gastos_activos, 0)
@@ -360,12 +769,57 @@ def promedio_gastos(gastos):
     """
     Calcula el promedio de los montos registrados (solo activos).
     """
-    gastos_activos = [g for g in gastos.values() if g.get('estado', 'activo') == 'activo']
+    if es_almacen(gastos):
+        cantidad = gastos.cantidad_activos()
+        return gastos.total_activos() / cantidad if cantidad else 0
+    gastos_activos = list(_valores_activos(gastos))
     if not gastos_activos:
         return 0
     total = reduce(lambda acum, g: acum + g["monto"], gastos_activos, 0)
     return total / len(gastos_activos)
 
+
+def resumen_estadistico(gastos):
+    """
+    Retorna cantidad, total, promedio, mínimo y máximo de los gastos activos.
+    En el almacén columnar sale de los agregados acumulados en O(1).
+    """
+    if es_almacen(gastos):
+        return {
+            "cantidad": gastos.cantidad_activos(),
+            "total": gastos.total_activos(),
+            "promedio": promedio_gastos(gastos),
+            "minimo": gastos.minimo_activo(),
+            "maximo": gastos.maximo_activo()
+        }
+    if _consulta_externa(gastos):
+        cantidad, total, minimo, maximo = gastos.estadisticas()
+        return {
+            "cantidad": cantidad,
+            "total": total,
+            "promedio": total / cantidad if cantidad else 0,
+            "minimo": minimo,
+            "maximo": maximo
+        }
+    montos = [g["monto"] for g in _valores_activos(gastos)]
+    return {
+        "cantidad": len(montos),
+        "total": sum(montos),
+        "promedio": sum(montos) / len(montos) if montos else 0,
+        "minimo": min(montos) if montos else None,
+        "maximo": max(montos) if montos else None
+    }
+
+
+def verificar_agregados(gastos):
+    """
+    Recalcula los agregados acumulados desde cero y retorna las
+    diferencias encontradas (lista vacía si todo coincide).
+    """
+    if es_almacen(gastos):
+        return gastos.verificar_agregados()
+    return []
+
 # ======================================================
 # REGEX
 # ======================================================
@@ -377,7 +831,6 @@ def numeros_en_descripciones(gastos):
     """
     patron = r"[0-9]+"
     encontrados = []
-    for g in gastos.values():
-        if g.get('estado', 'activo') == 'activo':
-            encontrados.extend(re.findall(patron, g["descripcion"]))
+    for g in _valores_activos(gastos):
+        encontrados.extend(re.findall(patron, g["descripcion"]))
     return encontrados
\ No newline at end of file
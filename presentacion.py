@@ -2,6 +2,8 @@
 # PRESENTACION.PY - Interfaz y visualización
 # ======================================================
 
+from constantes import MESES
+
 def mostrar_encabezado():
     """Muestra encabezado de tabla de gastos."""
     print("\n" + "="*85)
@@ -45,12 +47,16 @@ def mostrar_lista(lista, incluir_eliminados=False):
     print(f"Total de registros: {len(lista)}")
 
 
-def mostrar_calendario(calendario):
+def mostrar_calendario(calendario, anio=None, mes=None):
     """
     Muestra calendario mensual con gastos por día.
+    Las celdas fuera del mes (None) se muestran vacías.
     """
     print("\n" + "="*80)
-    print("CALENDARIO MENSUAL DE GASTOS")
+    if anio is not None and mes is not None:
+        print(f"CALENDARIO DE GASTOS - {MESES[mes - 1].upper()} {anio}")
+    else:
+        print("CALENDARIO MENSUAL DE GASTOS")
     print("="*80)
     dias_semana = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
     
@@ -60,7 +66,7 @@ def mostrar_calendario(calendario):
     
     dia = 1
     for fila in calendario:
-        fila_txt = "  ".join(f"${v:7.2f}" for v in fila)
+        fila_txt = "  ".join(" " * 8 if v is None else f"${v:7.2f}" for v in fila)
         print(f"{fila_txt}")
         dia += 7
     print("="*80)
@@ -121,13 +127,14 @@ def mostrar_submenu_estadisticas():
     """
     print("\n--- ESTADÍSTICAS Y REPORTES ---")
     print("  1) Resumen por categoría")
-    print("  2) Calendario mensual")
-    print("  3) Día con mayor gasto")
-    print("  4) Totales por semana")
-    print("  5) Totales por día de la semana")
+    print("  2) Calendario de un mes")
+    print("  3) Día con mayor gasto (por período)")
+    print("  4) Totales por semana (por período)")
+    print("  5) Totales por día de la semana (por período)")
     print("  6) Análisis de categorías utilizadas")
     print("  7) Días sin movimientos")
     print("  8) Promedio de gastos")
+    print("  9) Verificar totales acumulados")
     print("  0) Volver al menú principal")
 
 
@@ -166,6 +173,7 @@ def mostrar_submenu_papelera():
     print("  2) Restaurar gasto eliminado")
     print("  3) Ver archivo de backups")
     print("  4) Limpiar gastos eliminados permanentemente")
+    print("  5) Recuperar gasto borrado desde el backup")
     print("  0) Volver al menú principal")
 
 
@@ -177,6 +185,8 @@ def mostrar_submenu_archivos():
     print("  1) Guardar datos")
     print("  2) Cargar datos")
     print("  3) Ver log del sistema")
+    print("  4) Historial de un gasto")
+    print("  5) Historial de un día")
     print("  0) Volver al menú principal")
 
 
@@ -8,10 +8,50 @@ from matrices import *
 from validaciones import validar_fecha_regex
 from analisis_recursivo import *
 from constantes import COD_CATEGORIAS
+from almacen import AlmacenGastos, fecha_a_ordinal
+from indices import Agregados, IndiceTexto
+from diario import activar_diario, desactivar_diario, reproducir_diario
+from diario import Candado, Diario, DiarioOcupado, ruta_candado
+from base_datos import (
+    GastosSQLite, guardar_gastos_sqlite, cargar_gastos_sqlite,
+    cargar_calendario_sqlite, crear_backup_gasto_sqlite
+)
+from gastos_mapeados import GastosMapeados
+from archivos import importar_gastos_csv, guardar_gastos_csv, cargar_gastos_csv, guardar_gastos_bin, cargar_gastos_bin
+from archivos import cargar_gastos_csv_paralelo, dividir_csv
+from archivos import crear_backups_gastos, buscar_backups, IndiceBackups, validar_fila_gasto
+from bitacora import Bitacora, IndiceLog, ultimas_lineas, recorrer_log
+from datetime import date, timedelta
+import os
+import csv
+import json
+import threading
+import cli
+import arranque
+import benchmark
+import generador
 import pytest 
 
 # Ejecutar: pytest test_gastos.py -v
 
+
+@pytest.fixture(autouse=True)
+def archivos_temporales(tmp_path_factory, monkeypatch):
+    """
+    Log, backups y diario de cada test van a un directorio temporal:
+    correr la suite no toca sistema.log ni gastos_eliminados.csv, ni crea
+    índices o candados en el repositorio.
+    """
+    import archivos
+    import bitacora
+    import diario
+    datos = tmp_path_factory.mktemp("datos")
+    monkeypatch.setattr(archivos, "RUTA_BACKUPS", str(datos / "gastos_eliminados.csv"))
+    monkeypatch.setattr(diario, "RUTA_DIARIO", str(datos / "gastos.diario"))
+    bitacora.configurar_bitacora(str(datos / "sistema.log"))
+    yield
+    bitacora.cerrar_bitacora()
+
 # =====================================================
 # TESTS DE VALIDACIONES
 # ======================================================
@@ -397,5 +437,1315 @@ def test_flujo_filtros_y_estadisticas():
     assert resumen["Alimentación"] == 2500
 
 
+# ======================================================
+# TESTS DEL ALMACÉN COLUMNAR
+# ======================================================
+
+def _almacen_ejemplo():
+    """Almacén con tres gastos (uno eliminado) para las pruebas."""
+    return AlmacenGastos({
+        "1": {"id": "1", "fecha": "20/11/2025", "monto": 1000, "categoria": "Ocio",
+              "descripcion": "Cine", "estado": "activo"},
+        "2": {"id": "2", "fecha": "10/11/2025", "monto": 2000, "categoria": "Ocio",
+              "descripcion": "Teatro", "estado": "activo"},
+        "3": {"id": "3", "fecha": "15/11/2025", "monto": 500, "categoria": "Transporte",
+              "descripcion": "Taxi", "estado": "eliminado"}
+    })
+
+
+def test_almacen_vista_compatible():
+    """El almacén debe exponer cada gasto como un diccionario."""
+    gastos = _almacen_ejemplo()
+    assert len(gastos) == 3
+    assert gastos["2"]["fecha"] == "10/11/2025"
+    assert gastos["3"].get("estado") == "eliminado"
+    assert dict(gastos["1"]) == {"id": "1", "fecha": "20/11/2025", "monto": 1000.0,
+                                 "categoria": "Ocio", "descripcion": "Cine",
+                                 "estado": "activo"}
+
+
+def test_almacen_escritura_en_vista():
+    """Modificar la vista debe escribir en las columnas."""
+    gastos = _almacen_ejemplo()
+    gastos["1"]["monto"] = 1500
+    gastos["1"]["estado"] = "eliminado"
+    assert gastos["1"]["monto"] == 1500
+    assert total_montos(gastos) == 2000
+
+
+def test_almacen_quitar_fila():
+    """Borrar un gasto no debe afectar a los demás."""
+    gastos = _almacen_ejemplo()
+    del gastos["1"]
+    assert "1" not in gastos
+    assert gastos["3"]["descripcion"] == "Taxi"
+    assert set(gastos) == {"2", "3"}
+
+
+def test_almacen_agregaciones_columnares():
+    """Las agregaciones sobre columnas deben coincidir con las de dicts."""
+    gastos = _almacen_ejemplo()
+    assert total_montos(gastos) == 3000
+    assert promedio_gastos(gastos) == 1500
+    assert resumen_por_categoria(gastos) == {"Ocio": 3000}
+    assert ids_por_categoria(gastos, "Ocio") == {"1", "2"}
+    assert [g["id"] for g in filtrar_por_categoria(gastos, "Ocio")] == ["2", "1"]
+    assert [g["id"] for g in gastos_ordenados_por_monto(gastos)] == ["2", "1"]
+
+
+# ======================================================
+# TESTS DEL ÍNDICE POR FECHA
+# ======================================================
+
+def test_agregar_gasto_inserta_ordenado():
+    """El orden debe quedar por fecha aunque se agregue desordenado."""
+    gastos = AlmacenGastos()
+    orden = []
+    cal = crear_calendario(30)
+    agregar_gasto(gastos, orden, set(), cal, 0, "20/11/2025", 100, "Ocio", "A")
+    agregar_gasto(gastos, orden, set(), cal, 1, "05/11/2025", 100, "Ocio", "B")
+    agregar_gasto(gastos, orden, set(), cal, 2, "10/11/2025", 100, "Ocio", "C")
+    assert orden == ["2", "3", "1"]
+
+
+def test_filtrar_rango_fechas_entre_meses():
+    """El rango debe comparar fechas reales, no strings."""
+    datos = {
+        "1": {"id": "1", "fecha": "28/10/2025", "monto": 100, "categoria": "Ocio",
+              "descripcion": "A", "estado": "activo"},
+        "2": {"id": "2", "fecha": "05/11/2025", "monto": 100, "categoria": "Ocio",
+              "descripcion": "B", "estado": "activo"},
+        "3": {"id": "3", "fecha": "15/12/2025", "monto": 100, "categoria": "Ocio",
+              "descripcion": "C", "estado": "activo"}
+    }
+    for gastos in (datos, AlmacenGastos(datos)):
+        resultado = filtrar_rango_fechas(gastos, "01/10/2025", "30/11/2025")
+        assert [g["id"] for g in resultado] == ["1", "2"]
+
+
+def test_primeros_y_ultimos_desde_indice():
+    """Primeros/últimos deben salir del índice y omitir eliminados."""
+    gastos = _almacen_ejemplo()
+    assert [g["id"] for g in primeros_gastos(gastos, [], 10)] == ["2", "1"]
+    assert [g["id"] for g in ultimos_gastos(gastos, [], 1)] == ["1"]
+    eliminar_gasto(gastos, [], "1")
+    assert [g["id"] for g in ultimos_gastos(gastos, [], 10)] == ["2"]
+    restaurar_gasto(gastos, "3")
+    assert [g["id"] for g in gastos_ordenados_por_fecha(gastos)] == ["3", "2"]
+
+
+# ======================================================
+# TESTS DEL ÍNDICE POR CATEGORÍA
+# ======================================================
+
+def test_indice_categoria_se_mantiene():
+    """Eliminar, restaurar y purgar deben actualizar el índice."""
+    gastos = _almacen_ejemplo()
+    assert ids_por_categoria(gastos, "Transporte") == set()
+    restaurar_gasto(gastos, "3")
+    assert ids_por_categoria(gastos, "Transporte") == {"3"}
+    eliminar_gasto(gastos, [], "2")
+    assert [g["id"] for g in filtrar_por_categoria(gastos, "Ocio")] == ["1"]
+    del gastos["1"]
+    assert filtrar_por_categoria(gastos, "Ocio") == []
+    assert set(gastos_por_categoria(gastos)) == {"Transporte"}
+
+
+def test_ids_por_categoria_y_monto():
+    """La búsqueda avanzada debe intersectar categoría y monto."""
+    gastos = _almacen_ejemplo()
+    assert ids_por_categoria_y_monto(gastos, "Ocio", 1500) == {"2"}
+    assert ids_por_categoria_y_monto(dict(gastos.items()), "Ocio", 1500) == {"2"}
+
+
+# ======================================================
+# TESTS DEL ÍNDICE DE TEXTO
+# ======================================================
+
+def test_buscar_palabra_con_indice():
+    """La búsqueda debe ignorar tildes y mayúsculas y aceptar substrings."""
+    gastos = AlmacenGastos({
+        "1": {"id": "1", "fecha": "15/11/2025", "monto": 100, "categoria": "Ocio",
+              "descripcion": "Nafta Súper", "estado": "activo"},
+        "2": {"id": "2", "fecha": "16/11/2025", "monto": 200, "categoria": "Ocio",
+              "descripcion": "Entrada cine IMAX", "estado": "activo"}
+    })
+    assert [g["id"] for g in buscar_gastos_por_palabra(gastos, "super")] == ["1"]
+    assert [g["id"] for g in buscar_gastos_por_palabra(gastos, "CINE im")] == ["2"]
+    assert [g["id"] for g in buscar_gastos_por_palabra(gastos, "ax")] == ["2"]
+    assert buscar_gastos_por_palabra(gastos, "imax cine") == []
+    assert [g["id"] for g in buscar_gastos_por_prefijo(gastos, "naf")] == ["1"]
+    assert descripcion_contiene_palabra(gastos["1"], "súper")
+
+
+def test_buscar_palabra_respeta_los_espacios():
+    """Los espacios de la consulta cuentan, igual que en la búsqueda sin índice."""
+    filas = {"1": "Cine", "2": "Entrada cine", "3": "Cinema  3D", "4": "Nafta"}
+    dicc = {gid: {"id": gid, "fecha": "15/11/2025", "monto": 1.0, "categoria": "Ocio",
+                  "descripcion": desc, "estado": "activo"} for gid, desc in filas.items()}
+    gastos = AlmacenGastos(dicc)
+    for consulta in ("", " ", "  ", " cine", "cine ", "a  3", "ta"):
+        assert ([g["id"] for g in buscar_gastos_por_palabra(gastos, consulta)] ==
+                [g["id"] for g in buscar_gastos_por_palabra(dicc, consulta)]), consulta
+    assert [g["id"] for g in buscar_gastos_por_palabra(gastos, " cine")] == ["2"]
+    assert [g["id"] for g in buscar_gastos_por_palabra(gastos, "  ")] == ["3"]
+
+
+def test_indice_texto_se_mantiene():
+    """Editar y purgar deben actualizar el índice de texto."""
+    gastos = _almacen_ejemplo()
+    editar_gasto(gastos, crear_calendario(30), "1", nueva_desc="Recital")
+    assert buscar_gastos_por_palabra(gastos, "cine") == []
+    assert [g["id"] for g in buscar_gastos_por_palabra(gastos, "recital")] == ["1"]
+    del gastos["1"]
+    assert buscar_gastos_por_palabra(gastos, "recital") == []
+
+
+def test_indice_texto_carga_por_lotes():
+    """Cargar por lotes deja el vocabulario ordenado, igual que de a uno."""
+    de_a_uno, por_lotes = IndiceTexto(), IndiceTexto()
+    pares = [((i,), f"gasto {i * 7919 % 1000} varios") for i in range(300)]
+    for nums, texto in pares:
+        de_a_uno.agregar_varios(nums, texto)
+    por_lotes.cargar(pares[:100])
+    por_lotes.cargar(pares[100:])
+    assert por_lotes.tokens_con_prefijo("") == de_a_uno.tokens_con_prefijo("") == sorted(
+        {t for _, texto in pares for t in texto.split()})
+    assert por_lotes.ids_con_prefijo("99") == de_a_uno.ids_con_prefijo("99")
+
+
+# ======================================================
+# TESTS DE PARTICIONES ACTIVOS / PAPELERA
+# ======================================================
+
+def test_eliminar_mueve_a_papelera():
+    """Eliminar y restaurar deben mover el gasto entre particiones."""
+    gastos = _almacen_ejemplo()
+    assert gastos.cantidad_activos() == 2
+    eliminar_gasto(gastos, [], "1")
+    assert gastos.cantidad_activos() == 1
+    assert set(obtener_gastos_eliminados(gastos)) == {"1", "3"}
+    assert gastos["1"]["descripcion"] == "Cine"
+    restaurar_gasto(gastos, "3")
+    assert set(obtener_gastos_activos(gastos)) == {"2", "3"}
+    assert cantidad_gastos_activos(gastos) == 2
+
+
+def test_vaciar_papelera():
+    """Vaciar la papelera debe borrar solo los eliminados."""
+    orden = ["1", "2", "3"]
+    gastos = _almacen_ejemplo()
+    assert vaciar_papelera(gastos, orden) == 1
+    assert orden == ["1", "2"]
+    assert set(gastos) == {"1", "2"}
+    assert buscar_gastos_por_palabra(gastos, "taxi") == []
+
+    orden = ["1", "2", "3"]
+    gastos = dict(_almacen_ejemplo().items())
+    assert vaciar_papelera(gastos, orden) == 1
+    assert orden == ["1", "2"]
+
+
+# ======================================================
+# TESTS DE AGREGADOS ACUMULADOS
+# ======================================================
+
+def test_agregados_se_mantienen():
+    """Los agregados deben seguir cada alta, edición, baja y restauración."""
+    gastos = _almacen_ejemplo()
+    cal = crear_calendario(30)
+    stats = resumen_estadistico(gastos)
+    assert (stats["cantidad"], stats["total"], stats["minimo"], stats["maximo"]) == (2, 3000, 1000, 2000)
+
+    agregar_gasto(gastos, [], set(), cal, 3, "01/11/2025", 300, "Transporte", "Bus")
+    editar_gasto(gastos, cal, "2", nuevo_monto=2500)
+    eliminar_gasto(gastos, [], "1")
+    restaurar_gasto(gastos, "3")
+    vaciar_papelera(gastos, [])
+
+    stats = resumen_estadistico(gastos)
+    assert (stats["cantidad"], stats["total"], stats["minimo"], stats["maximo"]) == (3, 3300, 300, 2500)
+    assert resumen_por_categoria(gastos) == {"Ocio": 2500, "Transporte": 800}
+    assert verificar_agregados(gastos) == []
+
+
+def test_verificar_agregados_detecta_diferencias():
+    """La verificación debe reportar acumulados desincronizados."""
+    gastos = _almacen_ejemplo()
+    gastos._agregados.total += 1
+    assert any("total" in d for d in verificar_agregados(gastos))
+
+
+def test_agregados_minimo_y_maximo_con_bajas():
+    """Con altas y bajas mezcladas, mínimo y máximo siguen a los montos vigentes."""
+    ag, vigentes = Agregados(), []
+    for i in range(500):
+        monto = float((i * 37) % 101)
+        if i % 3 == 2:
+            quitado = vigentes.pop((i * 7) % len(vigentes))
+            ag.restar("Ocio", quitado)
+        else:
+            vigentes.append(monto)
+            ag.sumar("Ocio", monto)
+        assert (ag.minimo(), ag.maximo()) == (min(vigentes), max(vigentes))
+    ag.restar_varios(["Ocio"] * len(vigentes), list(vigentes))
+    assert (ag.cantidad, ag.minimo(), ag.maximo(), ag.suma_por_categoria()) == (0, None, None, {})
+
+
+# ======================================================
+# TESTS DEL CALENDARIO POR MESES
+# ======================================================
+
+def test_calendario_mes_con_desfasaje():
+    """El día 1 debe caer en su día de la semana real."""
+    cal = crear_calendario_mes(2025, 11)  # 01/11/2025 fue sábado
+    assert cal[0][:5] == [None] * 5
+    assert posicion_en_mes(2025, 11, 1) == (0, 5)
+    assert posicion_en_mes(2025, 11, 30) == (4, 6)
+    assert len(crear_calendario_mes(2024, 2)) == 5  # 2024 bisiesto, empieza jueves
+    assert len(dias_sin_gastos(crear_calendario_mes(2024, 2), 29)) == 29
+
+
+def test_gastos_de_distintos_meses_no_chocan():
+    """Gastos del mismo día en meses distintos van a celdas distintas."""
+    cal = {}
+    gastos = {}
+    agregar_gasto(gastos, [], set(), cal, 0, "15/10/2025", 100, "Ocio", "A")
+    agregar_gasto(gastos, [], set(), cal, 1, "15/11/2025", 300, "Ocio", "B")
+    editar_gasto(gastos, cal, "2", nuevo_monto=500)
+    assert sorted(cal) == [(2025, 10), (2025, 11)]
+    assert dia_con_mayor_gasto_periodo(cal) == ("15/11/2025", 500)
+    assert dia_con_mayor_gasto_periodo(cal, hasta=(2025, 10)) == ("15/10/2025", 100)
+    assert total_por_dia_semana_periodo(cal) == [0, 0, 100, 0, 0, 500, 0]
+    semanas = dict(total_por_semana_periodo(cal))
+    assert semanas[(2025, 42)] == 100 and semanas[(2025, 46)] == 500
+    assert sum(semanas.values()) == 600
+    assert 15 not in dias_sin_gastos_mes(cal, 2025, 11)
+
+
+def test_backend_numpy_coincide_con_python():
+    """Ambos backends deben dar los mismos resultados."""
+    pytest.importorskip("numpy")
+    import matrices
+    cal = {}
+    for dia, monto in [(3, 500), (14, 200), (28, 900), (30, 100)]:
+        agregar_monto_a_fecha(cal, f"{dia:02d}/11/2025", monto)
+    agregar_monto_a_fecha(cal, "01/12/2025", 1200)
+    mes = cal[(2025, 11)]
+    try:
+        matrices.usar_numpy(False)
+        esperado = (dia_con_mayor_gasto_periodo(cal), total_por_semana_periodo(cal),
+                    total_por_dia_semana_periodo(cal), dia_con_mayor_gasto(mes),
+                    total_por_semana(mes), dias_con_gasto_mayor(mes, 150))
+        matrices.usar_numpy(True)
+        arr = calendario_a_array(mes)
+        obtenido = (dia_con_mayor_gasto_periodo(cal), total_por_semana_periodo(cal),
+                    total_por_dia_semana_periodo(cal), dia_con_mayor_gasto(arr),
+                    total_por_semana(arr), dias_con_gasto_mayor(arr, 150))
+    finally:
+        matrices.usar_numpy(True)
+    assert obtenido == esperado
+
+
+
+# ======================================================
+# TESTS DEL CALENDARIO COMO VISTA DE LOS GASTOS
+# ======================================================
+
+def test_calendario_sigue_bajas_y_restauraciones():
+    """Eliminar descuenta el monto del día y restaurar lo vuelve a sumar."""
+    gastos = AlmacenGastos()
+    orden = []
+    cal = {}
+    agregar_gasto(gastos, orden, set(), cal, 0, "10/11/2025", 300, "Comida", "A")
+    agregar_gasto(gastos, orden, set(), cal, 1, "10/11/2025", 200, "Ocio", "B")
+    fila, col = posicion_en_mes(2025, 11, 10)
+    eliminar_gasto(gastos, orden, "1", cal)
+    assert cal[(2025, 11)][fila][col] == 200
+    restaurar_gasto(gastos, "1", cal)
+    assert cal[(2025, 11)][fila][col] == 500
+    eliminar_gasto(gastos, orden, "2", cal)
+    vaciar_papelera(gastos, orden)
+    assert cal == construir_calendario(gastos)
+
+
+@pytest.mark.parametrize("en_lote", [False, True])
+def test_calendario_sin_residuo_al_vaciar_un_dia(en_lote):
+    """Sumar y restar montos con decimales deja el día en 0.0 exacto."""
+    gastos, orden, cal = AlmacenGastos(), [], {}
+    uid = agregar_gasto(gastos, orden, set(), cal, 0, "05/11/2025", 1.0, "Ocio", "Otro día")
+    uid = agregar_gasto(gastos, orden, set(), cal, uid, "10/11/2025", 0.1, "Ocio", "A")
+    uid = agregar_gasto(gastos, orden, set(), cal, uid, "10/11/2025", 0.2, "Ocio", "B")
+    if en_lote:
+        eliminar_gastos_lote(gastos, orden, ["2", "3"], cal)
+    else:
+        eliminar_gasto(gastos, orden, "2", cal)
+        eliminar_gasto(gastos, orden, "3", cal)
+    assert cal == construir_calendario(gastos)
+    assert dia_con_mayor_gasto_periodo(cal) == ("05/11/2025", 1.0)
+    assert 10 in dias_sin_gastos_mes(cal, 2025, 11)
+    restaurar_gasto(gastos, "2", cal)
+    restaurar_gasto(gastos, "3", cal)
+    eliminar_gasto(gastos, orden, "2", cal)
+    eliminar_gasto(gastos, orden, "3", cal)
+    assert cal == construir_calendario(gastos)
+
+
+def test_construir_calendario_desde_gastos():
+    """El calendario reconstruido coincide con el mantenido gasto a gasto."""
+    gastos = _almacen_ejemplo()
+    cal = construir_calendario(gastos)
+    assert dia_con_mayor_gasto_periodo(cal) == ("10/11/2025", 2000)
+    assert 15 in dias_sin_gastos_mes(cal, 2025, 11)  # el eliminado no cuenta
+    assert (2025, 11) in cal and len(cal) == 1
+    assert construir_calendario(AlmacenGastos()) == {}
+    dicc = {g["id"]: dict(g) for g in gastos.vistas(gastos.ids_activos())}
+    assert construir_calendario(dicc) == cal
+
+
+def test_construir_calendario_numpy_coincide_con_python():
+    """La suma por día con np.bincount da el mismo calendario."""
+    pytest.importorskip("numpy")
+    import matrices
+    gastos = _almacen_ejemplo()
+    try:
+        matrices.usar_numpy(False)
+        esperado = construir_calendario(gastos)
+        matrices.usar_numpy(True)
+        obtenido = construir_calendario(gastos)
+    finally:
+        matrices.usar_numpy(True)
+    assert obtenido == esperado
+
+
+
+# ======================================================
+# TESTS DEL DIARIO DE CAMBIOS
+# ======================================================
+
+def test_diario_reproduce_los_cambios(tmp_path):
+    """Reaplicar el diario sobre una foto vacía reconstruye el estado."""
+    ruta = str(tmp_path / "gastos.diario")
+    gastos, orden, cal = AlmacenGastos(), [], {}
+    activar_diario(ruta)
+    try:
+        agregar_gasto(gastos, orden, set(), cal, 0, "20/11/2025", 1000, "Ocio", "Cine")
+        agregar_gasto(gastos, orden, set(), cal, 1, "10/11/2025", 2000, "Comida", "Súper")
+        agregar_gasto(gastos, orden, set(), cal, 2, "15/11/2025", 500, "Transporte", "Taxi")
+        editar_gasto(gastos, cal, "1", nuevo_monto=1500, nueva_desc="Cine, 2D")
+        eliminar_gasto(gastos, orden, "2")
+        eliminar_gasto(gastos, orden, "3")
+        restaurar_gasto(gastos, "2")
+        vaciar_papelera(gastos, orden)
+    finally:
+        desactivar_diario()
+
+    copia, orden_copia, categorias = AlmacenGastos(), [], set()
+    aplicados, ultimo = reproducir_diario(ruta, copia, orden_copia, categorias, 0)
+    assert aplicados == 9 and ultimo == 3
+    assert {k: dict(v) for k, v in copia.items()} == {k: dict(v) for k, v in gastos.items()}
+    assert orden_copia == orden == ["2", "1"]
+
+    # Reaplicar sobre un estado que ya lo incluye no cambia nada
+    reproducir_diario(ruta, copia, orden_copia, categorias, ultimo)
+    assert orden_copia == ["2", "1"] and copia["1"]["monto"] == 1500
+
+
+def test_diario_descarta_linea_cortada(tmp_path):
+    """Una línea a medio escribir (corte de luz) se ignora."""
+    ruta = tmp_path / "gastos.diario"
+    ruta.write_text("ALTA,1,20/11/2025,Ocio,Cine,1000\nALTA,2,21/11/20", encoding="utf-8")
+    gastos, orden = {}, []
+    assert reproducir_diario(str(ruta), gastos, orden, set(), 0) == (1, 1)
+    assert orden == ["1"]
+
+
+@pytest.mark.parametrize("crear", [dict, AlmacenGastos])
+def test_diario_purga_sobre_foto_que_ya_lo_incluye(tmp_path, crear):
+    """Una PURGA reaplicada borra solo lo que purgó, no las bajas posteriores."""
+    ruta = str(tmp_path / "gastos.diario")
+    gastos, orden = crear({k: dict(v) for k, v in _almacen_ejemplo().items()}), ["2", "3", "1"]
+    activar_diario(ruta)
+    try:
+        vaciar_papelera(gastos, orden)           # purga el 3
+        eliminar_gasto(gastos, orden, "2")      # baja posterior: sigue restaurable
+    finally:
+        desactivar_diario()
+    with open(ruta, encoding="utf-8") as f:
+        assert f.read().splitlines()[0] == "PURGA,1,3"
+
+    # La foto se guardó pero el diario no llegó a vaciarse
+    foto = crear({k: dict(v) for k, v in gastos.items()})
+    orden_foto = list(orden)
+    reproducir_diario(ruta, foto, orden_foto, set(), 3)
+    assert sorted(foto) == ["1", "2"] and foto["2"]["estado"] == "eliminado"
+    assert orden_foto == ["2", "1"]
+
+
+def test_diario_purga_del_formato_anterior(tmp_path):
+    """Un PURGA sin IDs (diarios viejos) vacía la papelera entera."""
+    ruta = tmp_path / "gastos.diario"
+    ruta.write_text("PURGA\n", encoding="utf-8")
+    gastos, orden = _almacen_ejemplo(), ["2", "3", "1"]
+    assert reproducir_diario(str(ruta), gastos, orden, set(), 3) == (1, 3)
+    assert sorted(gastos) == ["1", "2"] and orden == ["2", "1"]
+
+
+
+# ======================================================
+# TESTS DE GUARDADO INCREMENTAL Y ATÓMICO
+# ======================================================
+
+def test_almacen_registra_cambios_pendientes():
+    """El almacén anota qué gastos y campos cambiaron desde el guardado."""
+    gastos = _almacen_ejemplo()
+    assert gastos.hay_cambios()
+    gastos.marcar_guardado()
+    assert not gastos.hay_cambios()
+    gastos["1"]["descripcion"] = "Cine 3D"
+    assert gastos.registros_modificados() == {"1"}
+    assert gastos.campos_modificados() == {"descripcion"}
+    gastos.eliminar("2")
+    vaciar_papelera(gastos, [])
+    assert gastos.registros_modificados() == {"1", "2", "3"}
+    assert "monto" in gastos.campos_modificados()
+
+
+def test_guardar_csv_atomico_y_por_bloques(tmp_path):
+    """El CSV del almacén coincide con el de diccionarios y no deja temporales."""
+    gastos = _almacen_ejemplo()
+    orden = ["2", "3", "1"]
+    ruta_almacen = str(tmp_path / "almacen.csv")
+    ruta_dicc = str(tmp_path / "dicc.csv")
+    assert guardar_gastos_csv(ruta_almacen, gastos, orden)
+    assert guardar_gastos_csv(ruta_dicc, {k: dict(v) for k, v in gastos.items()}, orden)
+    with open(ruta_almacen, encoding="utf-8") as a, open(ruta_dicc, encoding="utf-8") as d:
+        assert a.read() == d.read()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["almacen.csv", "dicc.csv"]
+
+    ok, cargados, orden_cargado, _, ultimo = cargar_gastos_csv(ruta_almacen)
+    assert ok and orden_cargado == orden and ultimo == 3
+    assert not cargados.hay_cambios()
+    assert cargados["3"]["estado"] == "eliminado"
+
+
+
+# ======================================================
+# TESTS DEL SNAPSHOT BINARIO
+# ======================================================
+
+def test_snapshot_binario_ida_y_vuelta(tmp_path):
+    """El snapshot binario devuelve los mismos gastos, orden e índices."""
+    gastos = _almacen_ejemplo()
+    gastos.agregar("7", "10/11/2025", 300, "Comida", "")
+    orden = ["2", "7", "3", "1"]
+    ruta = str(tmp_path / "gastos.bin")
+    assert guardar_gastos_bin(ruta, gastos, orden, 7)
+
+    ok, cargados, orden_cargado, categorias, ultimo = cargar_gastos_bin(ruta)
+    assert ok and orden_cargado == orden and ultimo == 7
+    assert categorias == {"Ocio", "Transporte", "Comida"}
+    assert {k: dict(v) for k, v in cargados.items()} == {k: dict(v) for k, v in gastos.items()}
+    assert cargados.ids_por_fecha() == gastos.ids_por_fecha()
+    assert cargados.ids_de_categoria("Ocio") == gastos.ids_de_categoria("Ocio")
+    assert cargados.ids_con_texto("teat") == [2]
+    assert cargados.verificar_agregados() == []
+    assert not cargados.hay_cambios()
+
+
+def test_snapshot_binario_danado(tmp_path):
+    """Un snapshot con el contenido alterado se rechaza por el CRC."""
+    ruta = tmp_path / "gastos.bin"
+    assert guardar_gastos_bin(str(ruta), _almacen_ejemplo(), ["1", "2", "3"], 3)
+    datos = bytearray(ruta.read_bytes())
+    datos[-2] ^= 0xFF
+    ruta.write_bytes(bytes(datos))
+    ok, gastos, orden, _, _ = cargar_gastos_bin(str(ruta))
+    assert not ok and len(gastos) == 0 and orden == []
+
+
+
+# ======================================================
+# TESTS DEL BACKEND SQLITE
+# ======================================================
+
+def test_sqlite_guardar_y_cargar(tmp_path):
+    """La base devuelve los mismos gastos, orden y calendario."""
+    gastos = _almacen_ejemplo()
+    orden = ["2", "3", "1"]
+    ruta = str(tmp_path / "gastos.db")
+    assert guardar_gastos_sqlite(ruta, gastos, orden)
+
+    ok, cargados, orden_cargado, categorias, ultimo = cargar_gastos_sqlite(ruta)
+    assert ok and orden_cargado == orden and ultimo == 3
+    assert categorias == {"Ocio", "Transporte"}
+    assert {k: dict(v) for k, v in cargados.items()} == {k: dict(v) for k, v in gastos.items()}
+
+    ok, calendario, ultimo = cargar_calendario_sqlite(ruta)
+    assert ok and ultimo == 3 and calendario == construir_calendario(gastos)
+
+
+def test_sqlite_filtros_en_la_base(tmp_path):
+    """Los filtros sobre GastosSQLite coinciden con los del almacén."""
+    gastos = _almacen_ejemplo()
+    ruta = str(tmp_path / "gastos.db")
+    guardar_gastos_sqlite(ruta, gastos, ["1", "2", "3"])
+    base = GastosSQLite(ruta)
+    try:
+        def comparar(filtro, *args):
+            assert [dict(g) for g in filtro(base, *args)] == [dict(g) for g in filtro(gastos, *args)]
+        comparar(filtrar_por_categoria, "Ocio")
+        comparar(filtrar_por_categoria, "Transporte")
+        comparar(filtrar_rango_fechas, "01/11/2025", "15/11/2025")
+        comparar(filtrar_por_fecha, "20/11/2025")
+        comparar(filtrar_por_monto_mayor, 1500)
+        assert len(base) == 3 and "3" in base and base["3"]["estado"] == "eliminado"
+        assert total_montos(base) == 3000
+        _comparar_agregados(base, gastos)
+        assert crear_backup_gasto_sqlite(base["1"], ruta)
+        assert base.conexion.execute("SELECT COUNT(*) FROM gastos_eliminados").fetchone()[0] == 1
+    finally:
+        base.cerrar()
+
+
+def _comparar_agregados(externos, gastos):
+    """Reportes y búsqueda de texto de un backend externo contra el almacén."""
+    assert resumen_por_categoria(externos) == pytest.approx(resumen_por_categoria(gastos))
+    assert resumen_estadistico(externos) == pytest.approx(resumen_estadistico(gastos))
+    assert construir_calendario(externos) == construir_calendario(gastos)
+    for categoria in ("Ocio", "Transporte", "Nada"):
+        assert ids_por_categoria(externos, categoria) == ids_por_categoria(gastos, categoria)
+        assert (ids_por_categoria_y_monto(externos, categoria, 100) ==
+                ids_por_categoria_y_monto(gastos, categoria, 100))
+    assert ids_por_monto_mayor(externos, 100) == ids_por_monto_mayor(gastos, 100)
+    ids_ = {"1", "2", "3", "9", "99", "x"}
+    assert ([g["id"] for g in gastos_por_ids(externos, ids_)] ==
+            [g["id"] for g in gastos_por_ids(gastos, ids_)])
+    assert ({c: [g["id"] for g in lista] for c, lista in gastos_por_categoria(externos).items()} ==
+            {c: [g["id"] for g in lista] for c, lista in gastos_por_categoria(gastos).items()})
+    for palabra in ("TEATRO", "ine", "nada"):
+        assert ([(g["id"], g["estado"]) for g in buscar_gastos_por_palabra(externos, palabra)] ==
+                [(g["id"], g["estado"]) for g in buscar_gastos_por_palabra(gastos, palabra)])
+    assert [g["id"] for g in buscar_gastos_por_palabra(externos, "taxi")] == ["3"]
+
+
+# ======================================================
+# TESTS DE LA LECTURA MAPEADA (MMAP)
+# ======================================================
+
+def test_gastos_mapeados_coinciden_con_el_csv(tmp_path):
+    """La vista mapeada da los mismos gastos y filtros que el almacén."""
+    gastos = _almacen_ejemplo()
+    gastos["2"]["descripcion"] = 'Teatro, "platea"'
+    gastos.agregar("9", "12/11/2025", 700, "Ocio", "Dos\nlíneas")
+    ruta = str(tmp_path / "gastos.csv")
+    guardar_gastos_csv(ruta, gastos, ["2", "9", "3", "1"])
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write("10,fecha rota,Ocio,X,5,activo\n")
+
+    with GastosMapeados(ruta) as mapeados:
+        assert mapeados.filas_descartadas == 1
+        assert list(mapeados) == ["2", "9", "3", "1"]
+        assert {k: dict(v) for k, v in mapeados.items()} == {k: dict(v) for k, v in gastos.items()}
+        assert "10" not in mapeados and "9" in mapeados
+        for filtro, args in [(filtrar_por_categoria, ("Ocio",)),
+                             (filtrar_rango_fechas, ("11/11/2025", "30/11/2025")),
+                             (filtrar_por_fecha, ("12/11/2025",)),
+                             (filtrar_por_monto_mayor, (800,))]:
+            assert ([dict(g) for g in filtro(mapeados, *args)] ==
+                    [dict(g) for g in filtro(gastos, *args)])
+        _comparar_agregados(mapeados, gastos)
+
+
+def test_gasto_mapeado_lee_la_descripcion_al_pedirla(tmp_path):
+    """Las columnas clave no leen el archivo; la descripción sí, una vez."""
+    ruta = str(tmp_path / "gastos.csv")
+    guardar_gastos_csv(ruta, _almacen_ejemplo(), ["1", "2", "3"])
+    with GastosMapeados(ruta) as mapeados:
+        gasto = mapeados["2"]
+        llamadas = []
+        leer = mapeados.leer_fila
+        mapeados.leer_fila = lambda fila: llamadas.append(fila) or leer(fila)
+        assert (gasto["monto"], gasto["categoria"]) == (2000, "Ocio")
+        assert llamadas == []
+        assert gasto["descripcion"] == "Teatro" and gasto["descripcion"] == "Teatro"
+        assert len(llamadas) == 1
+
+
+def test_gastos_mapeados_validan_como_la_carga(tmp_path):
+    """Las filas que la carga del CSV rechaza tampoco entran en la vista."""
+    ruta = tmp_path / "gastos.csv"
+    ruta.write_text(
+        "id,fecha,categoria,descripcion,monto,estado\n"
+        "1,20/11/2025,Ocio,Cine,1000,activo\n"
+        "2,21/11/2025,Viajes,Otra,10,activo\n"
+        "3,21/11/2025,Ocio,Negativo,-5,activo\n"
+        "4,21/11/2025,Ocio,Infinito,inf,activo\n"
+        "1,22/11/2025,Ocio,Repetido,10,activo\n"
+        "5,22/11/2025,Ocio,Estado,10,pendiente\n"
+        "6,31/11/2025,Ocio,No existe,10,activo\n"
+        "7,23/11/2025,Ocio,Bien,20,eliminado\n",
+        encoding="utf-8")
+    with GastosMapeados(str(ruta)) as mapeados:
+        assert mapeados.filas_descartadas == 6
+        assert sorted(mapeados) == ["1", "7"]
+        assert mapeados["1"]["descripcion"] == "Cine"
+        assert mapeados.nombres_categoria == ["Ocio"]
+
+
+
+# ======================================================
+# TESTS DE LA IMPORTACIÓN POR BLOQUES
+# ======================================================
+
+def test_importacion_rechaza_filas_con_motivo(tmp_path):
+    """Las filas inválidas van al archivo de rechazados con su motivo."""
+    ruta = tmp_path / "externo.csv"
+    ruta.write_text(
+        "id,fecha,categoria,descripcion,monto,estado\n"
+        "1,20/11/2025,Ocio,Cine,1000,activo\n"
+        "2,2025-11-21,Ocio,Fecha ISO,10,activo\n"
+        "3,31/11/2025,Ocio,No existe,10,activo\n"
+        "4,21/11/2025,Ocio,Sin monto,abc,activo\n"
+        "5,21/11/2025,Viajes,Otra,10,activo\n"
+        "1,22/11/2025,Ocio,Repetido,10,activo\n"
+        "6,22/11/2025,Ocio,Corta\n"
+        "7,23/11/2025,Supermercado,\"Pan, leche\",250.5,eliminado\n",
+        encoding="utf-8")
+    progreso = []
+    ok, gastos, orden, categorias, ultimo = cargar_gastos_csv(
+        str(ruta), al_progresar=lambda *c: progreso.append(c))
+    assert ok and orden == ["1", "7"] and ultimo == 7
+    assert gastos["7"]["descripcion"] == "Pan, leche" and gastos["7"]["estado"] == "eliminado"
+    assert categorias == {"Ocio", "Supermercado"}
+    assert progreso[-1] == (8, 2, 6)
+
+    with open(tmp_path / "externo_rechazados.csv", encoding="utf-8") as f:
+        rechazos = list(csv.reader(f))[1:]
+    motivos = {fila[2]: fila[1] for fila in rechazos}
+    assert len(rechazos) == 6
+    assert motivos["2"].startswith("fecha con formato inválido")
+    assert motivos["3"].startswith("fecha inexistente")
+    assert motivos["4"].startswith("monto inválido")
+    assert motivos["5"].startswith("categoría desconocida")
+    assert motivos["1"] == "ID repetido: 1"
+    assert motivos["6"] == "cantidad de campos incorrecta"
+
+
+def test_importacion_por_bloques(tmp_path):
+    """Los bloques respetan el tamaño pedido y falta de estado es activo."""
+    ruta = tmp_path / "sin_estado.csv"
+    filas = "".join(f"{i},0{i}/11/2025,Ocio,G{i},{i}\n" for i in range(1, 6))
+    ruta.write_text("id,fecha,categoria,descripcion,monto\n" + filas, encoding="utf-8")
+    bloques = list(importar_gastos_csv(str(ruta), tamanio_bloque=2))
+    assert [len(b) for b in bloques] == [2, 2, 1]
+    assert bloques[0][0] == (1, "01/11/2025", "Ocio", "G1", 1.0, "activo")
+    assert not (tmp_path / "sin_estado_rechazados.csv").exists()
+
+
+# ======================================================
+# TESTS DE LA CARGA EN PARALELO
+# ======================================================
+
+def _csv_para_paralelo(ruta):
+    filas = ["id,fecha,categoria,descripcion,monto,estado"]
+    for i in range(1, 301):
+        descripcion = f'"Varios, {i}\nsegunda línea"' if i % 7 == 0 else f"Gasto {i}"
+        estado = "eliminado" if i % 11 == 0 else "activo"
+        filas.append(f"{i},{i % 28 + 1:02d}/11/2025,Ocio,{descripcion},{i}.5,{estado}")
+        if i % 50 == 0:
+            filas.append(f"{i},xx/11/2025,Ocio,Mala,1,activo")
+    filas.append("10,01/11/2025,Ocio,Repetido en otro rango,10.0,activo")
+    ruta.write_text("\n".join(filas) + "\n", encoding="utf-8")
+
+
+def test_dividir_csv_corta_fuera_de_comillas(tmp_path):
+    """Cada rango empieza en una fila completa y los rangos cubren todo."""
+    ruta = tmp_path / "grande.csv"
+    _csv_para_paralelo(ruta)
+    encabezado, rangos = dividir_csv(str(ruta), 8)
+    datos = ruta.read_bytes()
+    assert rangos[0][0] == len(encabezado) and rangos[-1][1] == len(datos)
+    assert all(fin == siguiente for (_, fin, _), (siguiente, _, _) in zip(rangos, rangos[1:]))
+    for inicio, fin, previos in rangos:
+        assert datos[:inicio].count(b'"') % 2 == 0
+        assert datos[:inicio].count(b"\n") == previos
+
+
+def test_carga_paralela_igual_a_serie(tmp_path):
+    """Con varios procesos el resultado es el mismo que en serie."""
+    ruta = tmp_path / "grande.csv"
+    _csv_para_paralelo(ruta)
+    serie = cargar_gastos_csv(str(ruta), ruta_rechazos=str(tmp_path / "r_serie.csv"))
+    paralelo = cargar_gastos_csv_paralelo(str(ruta), procesos=2, minimo_paralelo=0,
+                                          ruta_rechazos=str(tmp_path / "r_paralelo.csv"))
+    assert paralelo[0] and paralelo[2] == serie[2]
+    assert paralelo[3] == serie[3] and paralelo[4] == serie[4] == 300
+    assert {g: dict(paralelo[1][g]) for g in paralelo[2]} == {g: dict(serie[1][g]) for g in serie[2]}
+    with open(tmp_path / "r_serie.csv", encoding="utf-8") as f:
+        rechazos_serie = [fila[:2] for fila in csv.reader(f)]
+    with open(tmp_path / "r_paralelo.csv", encoding="utf-8") as f:
+        rechazos_paralelo = [fila[:2] for fila in csv.reader(f)]
+    assert rechazos_paralelo == rechazos_serie and len(rechazos_serie) == 8
+
+
+# ======================================================
+# TESTS DE LA BITÁCORA EN SEGUNDO PLANO
+# ======================================================
+
+def test_bitacora_escribe_en_orden(tmp_path):
+    """Las líneas encoladas llegan al archivo en orden y con el formato de siempre."""
+    bitacora = Bitacora(str(tmp_path / "sistema.log"))
+    for i in range(2500):
+        bitacora.registrar(f"Gasto agregado: ID={i}")
+    bitacora.registrar("Algo falló", "ERROR")
+    bitacora.vaciar()
+    lineas = (tmp_path / "sistema.log").read_text(encoding="utf-8").splitlines()
+    bitacora.cerrar()
+    assert len(lineas) == 2501
+    assert lineas[0].endswith("] [INFO] Gasto agregado: ID=0")
+    assert lineas[-1].endswith("] [ERROR] Algo falló")
+    assert [int(l.rsplit("=", 1)[1]) for l in lineas[:-1]] == list(range(2500))
+
+
+def test_bitacora_rota_por_tamanio(tmp_path):
+    """Al pasar el tamaño máximo se rota y se conservan solo las copias pedidas."""
+    ruta = tmp_path / "sistema.log"
+    bitacora = Bitacora(str(ruta), tamanio_maximo=200, copias=2)
+    for i in range(30):
+        bitacora.registrar(f"linea {i:02d}")
+    bitacora.cerrar()
+    assert ruta.stat().st_size <= 200
+    assert (tmp_path / "sistema.log.1").exists() and (tmp_path / "sistema.log.2").exists()
+    assert not (tmp_path / "sistema.log.3").exists()
+    assert ruta.read_text(encoding="utf-8").splitlines()[-1].endswith("linea 29")
+
+
+def test_bitacora_rota_por_dia(tmp_path):
+    """Al cambiar el día, el log anterior queda con la fecha en el nombre."""
+    ruta = tmp_path / "sistema.log"
+    ruta.write_text("[01/01/2025 10:00:00] [INFO] viejo\n", encoding="utf-8")
+    bitacora = Bitacora(str(ruta), por_dia=True)
+    ayer = date.today() - timedelta(days=1)
+    bitacora._dia = ayer
+    bitacora.registrar("nuevo")
+    bitacora.cerrar()
+    rotado = tmp_path / f"sistema.log.{ayer:%Y-%m-%d}"
+    assert rotado.read_text(encoding="utf-8").endswith("viejo\n")
+    assert ruta.read_text(encoding="utf-8").endswith("[INFO] nuevo\n")
+
+
+# ======================================================
+# TESTS DE LA LECTURA DEL LOG
+# ======================================================
+
+def _log_de_prueba(ruta):
+    lineas = []
+    for i in range(1000):
+        tipo = "ERROR" if i % 100 == 0 else "INFO"
+        lineas.append(f"[{i % 28 + 1:02d}/11/2025 10:00:{i % 60:02d}] [{tipo}] Operación número {i}\n")
+    ruta.write_text("".join(lineas), encoding="utf-8")
+    return lineas
+
+
+def test_ultimas_lineas_lee_desde_el_final(tmp_path):
+    """Devuelve lo mismo que readlines()[-n:] aunque lea en bloques chicos."""
+    ruta = tmp_path / "sistema.log"
+    lineas = _log_de_prueba(ruta)
+    assert ultimas_lineas(20, str(ruta), tamanio_bloque=64) == lineas[-20:]
+    assert ultimas_lineas(5000, str(ruta), tamanio_bloque=100) == lineas
+    ruta.write_text("única línea sin salto", encoding="utf-8")
+    assert ultimas_lineas(3, str(ruta)) == ["única línea sin salto"]
+
+
+def test_recorrer_log_filtra_tipo_y_fechas(tmp_path):
+    """El recorrido filtra por tipo y por rango de fechas."""
+    ruta = tmp_path / "sistema.log"
+    lineas = _log_de_prueba(ruta)
+    errores = list(recorrer_log(str(ruta), tipos="ERROR"))
+    assert errores == [l for l in lineas if "[ERROR]" in l] and len(errores) == 10
+    del_dia = list(recorrer_log(str(ruta), desde="05/11/2025", hasta="06/11/2025"))
+    assert del_dia == [l for l in lineas if l[1:3] in ("05", "06")]
+    exacto = list(recorrer_log(str(ruta), tipos=["INFO"], desde="05/11/2025 10:00:30",
+                               hasta="05/11/2025 10:00:40"))
+    assert exacto == [l for l in lineas if l.startswith("[05/11/2025")
+                      and "30" <= l[18:20] <= "40" and "[INFO]" in l]
+
+
+# ======================================================
+# TESTS DEL ÍNDICE DEL LOG
+# ======================================================
+
+def test_indice_log_historial_de_gasto_y_dia(tmp_path):
+    """El índice ubica las líneas de un gasto y de un día sin recorrer el log."""
+    ruta = tmp_path / "sistema.log"
+    bitacora = Bitacora(str(ruta))
+    for i in range(1, 201):
+        bitacora.registrar(f"Gasto agregado: ID={i}, Monto=$10, Categoría=Ocio")
+    bitacora.registrar("Gasto editado: ID=42, Cambios: monto")
+    bitacora.registrar("Gasto eliminado: ID=42, Descripción=Cine")
+    bitacora.registrar("Gasto agregado: ID=420, Monto=$1, Categoría=Ocio")
+    bitacora.vaciar()
+    historial = bitacora.indice.historial_gasto("42")
+    assert [l.split("] ", 2)[2].split(":")[0] for l in historial] == [
+        "Gasto agregado", "Gasto editado", "Gasto eliminado"]
+    hoy = date.today().strftime("%d/%m/%Y")
+    assert len(bitacora.indice.historial_dia(hoy)) == 203
+    assert bitacora.indice.historial_dia("01/01/2000") == []
+    bitacora.cerrar()
+
+    # Al reabrir se usa el índice guardado y se indexa lo que falte
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write(f"[{hoy} 10:00:00] [INFO] Gasto restaurado: ID=42\n")
+    indice = IndiceLog(str(ruta))
+    assert len(indice.historial_gasto(42)) == 4
+    assert indice.historial_gasto(42)[-1].endswith("Gasto restaurado: ID=42\n")
+
+
+def test_indice_log_posiciones_coinciden_con_tell(tmp_path):
+    """Las posiciones del índice son las que da f.tell() al leer el log."""
+    ruta = tmp_path / "sistema.log"
+    bitacora = Bitacora(str(ruta))
+    for i in range(1, 51):
+        bitacora.registrar(f"Gasto agregado: ID={i}, Categoría=Alimentación, Descripción=Ñandú {i}")
+    bitacora.vaciar()
+    posiciones = {}
+    with open(ruta, "rb") as f:
+        while True:
+            pos = f.tell()
+            linea = f.readline()
+            if not linea:
+                break
+            assert linea.endswith(b"\n") and not linea.endswith(b"\r\n")
+            posiciones[int(linea.split(b"ID=")[1].split(b",")[0])] = pos
+        assert bitacora.indice.indexado == f.tell() == os.path.getsize(ruta)
+    assert {gid: list(pos) for gid, pos in bitacora.indice.por_id.items()} == {
+        gid: [pos] for gid, pos in posiciones.items()}
+    bitacora.cerrar()
+
+
+def test_indice_log_se_rehace_si_el_log_cambia(tmp_path):
+    """Si el log es más chico que lo indexado, el índice se rehace."""
+    ruta = tmp_path / "sistema.log"
+    bitacora = Bitacora(str(ruta))
+    for i in range(50):
+        bitacora.registrar(f"Gasto agregado: ID={i}")
+    bitacora.cerrar()
+    ruta.write_text("[01/11/2025 09:00:00] [INFO] Gasto eliminado: ID=7\n", encoding="utf-8")
+    indice = IndiceLog(str(ruta))
+    assert indice.historial_gasto(7) == ["[01/11/2025 09:00:00] [INFO] Gasto eliminado: ID=7\n"]
+    assert indice.historial_gasto(8) == []
+    assert len(indice.historial_dia("01/11/2025")) == 1
+
+
+# ======================================================
+# TESTS DEL BACKUP POR LOTES
+# ======================================================
+
+def test_backup_por_lotes_con_indice(tmp_path):
+    """Un lote se escribe de una vez, con una sola fecha, y se busca por ID."""
+    ruta = str(tmp_path / "eliminados.csv")
+    lote = [
+        {"id": str(i), "fecha": "10/11/2025", "categoria": "Ocio",
+         "descripcion": f"Gasto {i}" if i != 3 else "Con, coma\ny salto", "monto": i * 1.5}
+        for i in range(1, 6)
+    ]
+    assert crear_backups_gastos(lote, ruta)
+    assert crear_backups_gastos([dict(lote[2], monto=99.0)], ruta)
+    with open(ruta, encoding="utf-8", newline='') as f:
+        filas = list(csv.reader(f))
+    assert filas[0][0] == "id" and len(filas) == 7
+    assert len({fila[5] for fila in filas[1:6]}) == 1
+
+    copias = buscar_backups("3", ruta)
+    assert [c["monto"] for c in copias] == [4.5, 99.0]
+    assert copias[0]["descripcion"] == "Con, coma\ny salto"
+    assert buscar_backups("42", ruta) == []
+
+    # Un índice nuevo (o filas escritas por fuera) se arma leyendo el archivo
+    with open(ruta, "a", encoding="utf-8", newline='') as f:
+        csv.writer(f).writerow(["7", "11/11/2025", "Ocio", "A mano", "1", "x", "activo"])
+    (tmp_path / "eliminados.csv.idx").unlink()
+    indice = IndiceBackups(ruta)
+    assert [c["descripcion"] for c in indice.buscar(7)] == ["A mano"]
+    assert len(indice.buscar(3)) == 2
+
+
+def test_recuperar_gasto_purgado_desde_backup():
+    """Un gasto borrado de la papelera vuelve con su ID desde el backup."""
+    gastos, orden, cats, cal = AlmacenGastos(), [], set(), {}
+    uid = agregar_gasto(gastos, orden, cats, cal, 0, "10/11/2025", 100.0, "Ocio", "Recuperable")
+    uid = agregar_gasto(gastos, orden, cats, cal, uid, "12/11/2025", 50.0, "Ocio", "Otro")
+    eliminar_gasto(gastos, orden, "1", cal)
+    vaciar_papelera(gastos, orden)
+    assert "1" not in gastos
+    assert recuperar_gasto_de_backup(gastos, orden, cats, "1", cal)
+    assert orden == ["1", "2"] and gastos["1"]["descripcion"] == "Recuperable"
+    assert cal == construir_calendario(gastos)
+    assert not recuperar_gasto_de_backup(gastos, orden, cats, "1", cal)
+
+
+# ======================================================
+# TESTS DE LAS OPERACIONES POR LOTES
+# ======================================================
+
+@pytest.mark.parametrize("crear", [dict, AlmacenGastos])
+def test_lotes_igual_que_de_a_uno(crear):
+    """Agregar, editar, eliminar y restaurar en lote deja lo mismo que de a uno."""
+    lote = [("12/11/2025", 100.0, "Ocio", "Cine"), ("10/11/2025", 50.0, "Transporte", "Taxi"),
+            ("12/11/2025", 30.0, "Ocio", "Pochoclos"), ("11/11/2025", 20.0, "Servicios", "Luz")]
+    uno = (crear(), ["0"], set(), {})
+    uno[0]["0"] = {"id": "0", "fecha": "12/11/2025", "monto": 5.0, "categoria": "Ocio",
+                   "descripcion": "Previo", "estado": "activo"}
+    varios = (crear(), ["0"], set(), {})
+    varios[0]["0"] = dict(uno[0]["0"])
+    sumar_en_calendario(uno[3], "12/11/2025", 5.0)
+    sumar_en_calendario(varios[3], "12/11/2025", 5.0)
+
+    ultimo = 0
+    for fecha, monto, categoria, descripcion in lote:
+        ultimo = agregar_gasto(*uno, ultimo, fecha, monto, categoria, descripcion)
+    assert agregar_gastos_lote(*varios, 0, lote) == ultimo == 4
+    assert varios[1] == uno[1] == ["2", "4", "0", "1", "3"]
+
+    editar_gasto(uno[0], uno[3], "1", nuevo_monto=80.0)
+    editar_gasto(uno[0], uno[3], "4", nueva_desc="Agua")
+    assert editar_gastos_lote(varios[0], varios[3], [("1", 80.0, None), ("4", None, "Agua")]) == 2
+
+    for gid in ("1", "2"):
+        eliminar_gasto(uno[0], uno[1], gid, uno[3])
+    assert eliminar_gastos_lote(varios[0], varios[1], ["1", "2"], varios[3]) == 2
+    restaurar_gasto(uno[0], "2", uno[3])
+    assert restaurar_gastos_lote(varios[0], ["2"], varios[3]) == 1
+
+    assert {g: dict(v) for g, v in varios[0].items()} == {g: dict(v) for g, v in uno[0].items()}
+    assert varios[2] == uno[2] and varios[3] == uno[3]
+
+
+def test_lote_invalido_no_aplica_nada():
+    """Si un elemento del lote es inválido no se cambia nada."""
+    gastos, orden, cats, cal = AlmacenGastos(), [], set(), {}
+    with pytest.raises(ValueError, match="Gasto 2 del lote: categoría desconocida"):
+        agregar_gastos_lote(gastos, orden, cats, cal, 0,
+                            [("10/11/2025", 1.0, "Ocio", "Ok"), ("10/11/2025", 1.0, "Viajes", "X")])
+    assert len(gastos) == 0 and orden == [] and cal == {}
+
+    agregar_gastos_lote(gastos, orden, cats, cal, 0, [("10/11/2025", 1.0, "Ocio", "Ok")])
+    with pytest.raises(ValueError, match="no encontrado"):
+        eliminar_gastos_lote(gastos, orden, ["1", "9"], cal)
+    with pytest.raises(ValueError, match="repetido"):
+        eliminar_gastos_lote(gastos, orden, ["1", "1"], cal)
+    with pytest.raises(ValueError, match="monto inválido"):
+        editar_gastos_lote(gastos, cal, [("1", -5, None)])
+    assert gastos["1"]["estado"] == "activo" and gastos["1"]["monto"] == 1.0
+
+
+@pytest.mark.parametrize("desc_invalida", [123, "", "   "])
+def test_editar_lote_con_descripcion_invalida_no_aplica_nada(desc_invalida):
+    """Una descripción inválida en el lote no deja cambiar ni anotar nada."""
+    gastos, cal = _almacen_ejemplo(), {}
+    antes = {g: dict(v) for g, v in gastos.items()}
+    diario = activar_diario()
+    try:
+        with pytest.raises(ValueError, match="descripción inválida"):
+            editar_gastos_lote(gastos, cal, [("1", 150, "Nuevo"), ("2", 250, desc_invalida)])
+        assert diario.registros == 0
+    finally:
+        desactivar_diario()
+    assert {g: dict(v) for g, v in gastos.items()} == antes and cal == {}
+    assert [g["id"] for g in buscar_gastos_por_palabra(gastos, "cine")] == ["1"]
+    assert buscar_gastos_por_palabra(gastos, "nuevo") == []
+    with pytest.raises(ValueError, match="descripción inválida"):
+        editar_gasto(gastos, cal, "2", nuevo_monto=250, nueva_desc=desc_invalida)
+    assert gastos["2"]["monto"] == 2000
+
+
+def test_almacen_lotes_mantiene_indices():
+    """Los métodos por lotes del almacén dejan índices y agregados consistentes."""
+    gastos = AlmacenGastos()
+    gastos.agregar_varios((str(i), f"{i % 28 + 1:02d}/11/2025", float(i % 7), "Ocio" if i % 2 else "Transporte",
+                           f"Gasto {i}") for i in range(1, 301))
+    assert gastos.eliminar_varios([str(i) for i in range(1, 301, 3)]) == 100
+    assert gastos.restaurar_varios([str(i) for i in range(1, 301, 6)]) == 50
+    gastos.escribir_montos([(str(i), 1.5) for i in range(2, 301, 5)])
+    assert gastos.verificar_agregados() == []
+    activos = sorted((gastos.ordinal(g), int(g)) for g, v in gastos.items() if v["estado"] == "activo")
+    assert gastos.ids_por_fecha() == [n for _, n in activos]
+    with pytest.raises(KeyError):
+        gastos.agregar_varios([("5", "01/11/2025", 1.0, "Ocio", "Repetido")])
+
+
+def test_almacen_valor_invalido_no_toca_indices():
+    """Una fecha o un monto inválido no deben dejar el gasto fuera de los índices."""
+    gastos = _almacen_ejemplo()
+    antes = (gastos.ids_por_fecha(), resumen_por_categoria(gastos), total_montos(gastos))
+    with pytest.raises(ValueError):
+        gastos["1"]["fecha"] = "31/02/2025"
+    with pytest.raises(ValueError):
+        gastos["2"]["monto"] = "mucho"
+    assert (gastos.ids_por_fecha(), resumen_por_categoria(gastos), total_montos(gastos)) == antes
+    assert gastos.verificar_agregados() == []
+
+
+# ======================================================
+# TESTS DE LA LÍNEA DE COMANDOS
+# ======================================================
+
+def test_cli_consultar_combina_filtros(capsys):
+    """consultar cruza los filtros y devuelve JSON con gastos activos."""
+    assert cli.main(["consultar", "--categoria", "Ocio", "--monto-mayor", "1000"]) == 0
+    resultado = json.loads(capsys.readouterr().out)
+    assert resultado and all(g["categoria"] == "Ocio" and g["monto"] > 1000
+                             and g["estado"] == "activo" for g in resultado)
+    assert cli.main(["consultar", "--limite", "3"]) == 0
+    assert len(json.loads(capsys.readouterr().out)) == 3
+
+
+def test_cli_reporte_y_exportar(capsys, tmp_path):
+    """Los reportes y la exportación salen en JSON."""
+    assert cli.main(["reporte", "resumen"]) == 0
+    resumen = json.loads(capsys.readouterr().out)
+    assert resumen["estadisticas"]["total"] == pytest.approx(sum(resumen["por_categoria"].values()))
+    assert cli.main(["reporte", "semanal", "--desde", "11/2025", "--hasta", "11/2025"]) == 0
+    semanal = json.loads(capsys.readouterr().out)
+    assert sum(s["total"] for s in semanal["semanas"]) == pytest.approx(
+        sum(semanal["por_dia_semana"].values()))
+    salida = tmp_path / "gastos.json"
+    assert cli.main(["exportar", "--formato", "json", "--salida", str(salida)]) == 0
+    assert json.loads(capsys.readouterr().out)["exportados"] == len(json.loads(salida.read_text(encoding="utf-8")))
+
+
+def test_cli_error_en_json(capsys):
+    """Un dato inválido sale como error JSON por stderr y código 1."""
+    assert cli.main(["reporte", "calendario", "--desde", "13/2025"]) == 1
+    assert "mes inválido" in json.loads(capsys.readouterr().err.strip().splitlines()[-1])["error"]
+
+
+def test_cli_consultas_sin_cargar_el_libro(capsys, monkeypatch):
+    """Con el diario vacío, consultar y reporte leen la foto sin cargarla."""
+    consultas = [["consultar", "--categoria", "Ocio", "--palabra", "a"], ["reporte", "resumen"],
+                 ["reporte", "semanal"]]
+    completos = []
+    with monkeypatch.context() as m:
+        m.setattr(cli, "abrir_consulta", lambda base=None: (cli.cargar_libro()[0], lambda: None))
+        for argv in consultas:
+            assert cli.main(argv) == 0
+            completos.append(json.loads(capsys.readouterr().out))
+
+    def prohibido():
+        raise AssertionError("cargó el libro completo")
+    monkeypatch.setattr(cli, "cargar_libro", prohibido)
+    for argv, esperado in zip(consultas, completos):
+        assert cli.main(argv) == 0
+        assert json.loads(capsys.readouterr().out) == esperado
+
+
+def test_cli_base_sqlite_solo_si_se_pide_y_esta_al_dia(tmp_path, capsys):
+    """gastos.db se usa con --base y se rechaza si la foto o el diario son más nuevos."""
+    import diario
+    ruta = str(tmp_path / "gastos.db")
+    assert guardar_gastos_sqlite(ruta, _almacen_ejemplo(), ["2", "3", "1"])
+    capsys.readouterr()
+    argv = ["consultar", "--base", ruta, "--categoria", "Ocio"]
+
+    futuro = os.path.getmtime(cli.__file__) + 10 ** 6
+    os.utime(ruta, (futuro, futuro))
+    assert cli.main(argv) == 0
+    assert [g["id"] for g in json.loads(capsys.readouterr().out)] == ["2", "1"]
+
+    os.utime(ruta, (0, 0))  # más vieja que gastos.csv / gastos.bin
+    assert cli.main(argv) == 1
+    assert "desactualizada" in json.loads(capsys.readouterr().err)["error"]
+
+    os.utime(ruta, (futuro, futuro))
+    with open(diario.RUTA_DIARIO, "w", encoding="utf-8") as f:
+        f.write("PURGA,0\n")
+    assert cli.main(argv) == 1
+    assert "desactualizada" in json.loads(capsys.readouterr().err)["error"]
+
+    assert cli.main(["consultar", "--base", str(tmp_path / "no.db")]) == 1
+    assert "no existe" in json.loads(capsys.readouterr().err)["error"]
+
+
+def test_candado_del_diario_es_exclusivo(tmp_path):
+    """Con el diario activo, otro escritor no puede abrirlo hasta que se cierre."""
+    ruta = str(tmp_path / "gastos.diario")
+    activar_diario(ruta, espera=0)
+    try:
+        assert not Candado(ruta_candado(ruta)).tomar()
+        with pytest.raises(DiarioOcupado):
+            Diario(ruta, espera=0)  # lo que haría otro proceso
+    finally:
+        desactivar_diario()
+    otro = Candado(ruta_candado(ruta))
+    assert otro.tomar()
+    otro.soltar()
+
+
+def test_cli_no_escribe_con_el_diario_tomado(capsys, monkeypatch):
+    """Si otro proceso tiene el diario, agregar termina con error sin anotar nada."""
+    import diario
+    ruta = diario.RUTA_DIARIO
+    antes = os.path.getsize(ruta) if os.path.exists(ruta) else None
+    monkeypatch.setattr(diario, "ESPERA_CANDADO", 0)
+    candado = Candado(ruta_candado(ruta))
+    assert candado.tomar()
+    try:
+        assert cli.main(["agregar", "--fecha", "03/11/2025", "--monto", "10",
+                         "--categoria", "Ocio", "--descripcion", "Cine"]) == 1
+    finally:
+        candado.soltar()
+    assert "Otro proceso" in json.loads(capsys.readouterr().err.strip().splitlines()[-1])["error"]
+    assert (os.path.getsize(ruta) if os.path.exists(ruta) else None) == antes
+
+
+# ======================================================
+# TESTS DEL ARRANQUE
+# ======================================================
+
+def test_importar_main_no_trae_modulos_diferidos():
+    """El menú principal no importa los módulos pesados."""
+    importados = arranque.medir_importaciones("main")
+    assert "validaciones" in importados
+    assert [m for m in arranque.MODULOS_DIFERIDOS if m in importados] == []
+
+
+def test_carga_en_segundo_plano_guarda_sus_mensajes(monkeypatch, capsys):
+    """Lo que imprime la carga se muestra recién en esperar_carga."""
+    import main
+    listo = threading.Event()
+
+    def cargar_falso(sistema):
+        print("Gastos cargados.")
+        listo.wait(5)
+        sistema.gastos = AlmacenGastos()
+
+    monkeypatch.setattr(main, "cargar_datos", cargar_falso)
+    sistema = main.SistemaGastos()
+    main.iniciar_carga(sistema)
+    print("Menú")
+    listo.set()
+    main.esperar_carga(sistema)
+    assert capsys.readouterr().out == "Menú\nGastos cargados.\n"
+    assert sistema.gastos is not None and sistema.carga is None
+
+
+def test_salir_con_compactacion_pendiente(monkeypatch):
+    """Si toca compactar justo al elegir Salir, se compacta y se sale igual."""
+    import main
+    import diario
+
+    class DiarioFalso:
+        compactaciones = 0
+
+        def necesita_compactar(self):
+            return True
+
+        def compactar(self, guardar):
+            DiarioFalso.compactaciones += 1
+            return True
+
+    opciones = iter([0])
+    monkeypatch.setattr(main, "cargar_datos", lambda sistema: None)
+    monkeypatch.setattr(main, "pedir_opcion_numerica", lambda: next(opciones))
+    monkeypatch.setattr(diario, "diario_activo", lambda: DiarioFalso())
+    monkeypatch.setattr(diario, "desactivar_diario", lambda: None)
+    main.main()  # con el error de antes pedía otra opción y next() fallaba
+    assert DiarioFalso.compactaciones == 1
+
+
+def test_error_de_la_carga_se_relanza(monkeypatch):
+    """Un error en el hilo de carga aparece al esperarla."""
+    import main
+
+    def cargar_roto(sistema):
+        raise OSError("disco")
+
+    monkeypatch.setattr(main, "cargar_datos", cargar_roto)
+    sistema = main.SistemaGastos()
+    main.iniciar_carga(sistema)
+    with pytest.raises(OSError):
+        main.esperar_carga(sistema)
+    main.esperar_carga(sistema)  # ya no queda nada pendiente
+
+
+# ======================================================
+# TESTS DEL BENCHMARK
+# ======================================================
+
+def test_benchmark_libro_sintetico():
+    """El libro sintético queda ordenado por fecha y con papelera."""
+    gastos, orden, categorias_usadas, ultimo_id = benchmark.armar_libro(500, eliminados=0.2)
+    assert len(gastos) == len(orden) == ultimo_id == 500
+    assert 0 < len(obtener_gastos_eliminados(gastos)) < 500
+    assert [gastos.ordinal(gid) for gid in orden] == sorted(gastos.ordinal(gid) for gid in orden)
+    assert gastos.verificar_agregados() == []
+
+
+def test_benchmark_reporte_y_comparacion():
+    """Cada grupo mide sus funciones y la comparación marca las más lentas."""
+    resultado = benchmark.medir_tamanio(300, ("ids", "calendario", "archivos"), 1)
+    assert set(resultado) == {"armado_s", "ids", "calendario", "archivos"}
+    assert "cargar_gastos_bin" in resultado["archivos"]
+    anterior = {"resultados": {"300": {"ids": {"ids_por_categoria": {"mejor_ms": 1.0}}}}}
+    actual = {"resultados": {"300": {"armado_s": 0.1,
+                                     "ids": {"ids_por_categoria": {"mejor_ms": 2.0}}}}}
+    assert benchmark.comparar(actual, anterior) == [("300", "ids", "ids_por_categoria", 1.0, 2.0)]
+    assert benchmark.comparar(anterior, anterior) == []
+
+
+# ======================================================
+# TESTS DEL GENERADOR DE GASTOS
+# ======================================================
+
+def test_hojas_categorias_recursivo():
+    """Las hojas son las categorías sin subcategorías."""
+    hojas = hojas_categorias_recursivo(CATEGORIAS_JERARQUICAS)
+    assert hojas[:3] == ["Supermercado", "Comida rápida", "Gourmet"]
+    assert "Restaurantes" not in hojas and "Telefonía" in hojas
+    assert hojas_categorias_recursivo({}) == []
+
+
+def test_generador_filas_validas_y_ordenadas():
+    """Las filas son válidas, van en orden de fecha y repiten con la semilla."""
+    filas = list(generador.generar_gastos(5000, eliminados=0.1, semilla=3))
+    assert filas == list(generador.generar_gastos(5000, eliminados=0.1, semilla=3))
+    assert [f[0] for f in filas] == list(range(1, 5001))
+    ids_vistos = set()
+    assert len([validar_fila_gasto([str(c) for c in f], ids_vistos) for f in filas]) == 5000
+    ordinales = [fecha_a_ordinal(f[1]) for f in filas]
+    assert ordinales == sorted(ordinales)
+    assert 300 < sum(f[5] == "eliminado" for f in filas) < 700
+    assert set(f[2] for f in filas) <= set(hojas_categorias_recursivo(CATEGORIAS_JERARQUICAS))
+
+
+def test_generador_distribuciones():
+    """Zipf en las descripciones, más gastos el sábado y en días de cobro."""
+    filas = list(generador.generar_gastos(30000, semilla=5))
+    super_ = [f[3] for f in filas if f[2] == "Supermercado"]
+    vocabulario = generador.VOCABULARIO["Supermercado"]
+    assert super_.count(vocabulario[0]) > super_.count(vocabulario[1]) > super_.count(vocabulario[-1])
+    dias = [date.fromordinal(fecha_a_ordinal(f[1])) for f in filas]
+    assert sum(d.weekday() == 5 for d in dias) > sum(d.weekday() == 0 for d in dias)
+    assert sum(d.day == 2 for d in dias) > sum(d.day == 20 for d in dias)
+    pesos = list(generador.generar_gastos(2000, pesos={"Teatro": 1000}, semilla=5))
+    assert sum(f[2] == "Teatro" for f in pesos) > 1500
+    with pytest.raises(ValueError):
+        generador.generar_gastos(10, pesos={"Ocio": 3})
+
+
+def test_generador_escribe_csv_y_sqlite(tmp_path):
+    """Lo generado se carga con los mismos datos desde CSV y desde SQLite."""
+    ruta_csv, ruta_db = str(tmp_path / "gastos.csv"), str(tmp_path / "gastos.db")
+    assert generador.escribir_csv(ruta_csv, generador.generar_gastos(3000, semilla=8)) == 3000
+    assert generador.escribir_sqlite(ruta_db, generador.generar_gastos(3000, semilla=8)) == 3000
+    ok_csv, gastos_csv, orden_csv, _, ultimo_csv = cargar_gastos_csv(ruta_csv)
+    ok_db, gastos_db, orden_db, _, ultimo_db = cargar_gastos_sqlite(ruta_db)
+    assert ok_csv and ok_db and ultimo_csv == ultimo_db == 3000 and orden_csv == orden_db
+    assert [dict(gastos_csv[g]) for g in orden_csv] == [dict(gastos_db[g]) for g in orden_db]
+    gastos, orden, _, _ = generador.volcar_en_almacen(generador.generar_gastos(3000, semilla=8))
+    assert resumen_por_categoria(gastos) == resumen_por_categoria(gastos_csv)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
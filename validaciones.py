@@ -3,7 +3,8 @@
 # ======================================================
 
 import re
-from constantes import COD_CATEGORIAS, FORMATO_FECHA_REGEX
+from datetime import datetime
+from constantes import COD_CATEGORIAS, FORMATO_FECHA_REGEX, FORMATO_MES_REGEX
 from analisis_recursivo import CATEGORIAS_JERARQUICAS
 
 # ======================================================
@@ -48,11 +49,41 @@ def pedir_fecha():
         try:
             if not validar_fecha_regex(fecha):
                 raise ValueError("Formato inválido. Ejemplo: 03/11/2025")
+            # El almacén guarda la fecha como ordinal: debe existir en el calendario
+            datetime.strptime(fecha, "%d/%m/%Y")
             return fecha
         except ValueError as e:
             print(f"Error: {e}")
 
 
+def pedir_mes(permitir_vacio=False, mensaje="Mes (mm/aaaa): "):
+    """
+    Solicita un mes y lo retorna como tupla (año, mes).
+    Si permitir_vacio es True, Enter retorna None.
+    """
+    while True:
+        entrada = input(mensaje).strip()
+        if entrada == "" and permitir_vacio:
+            return None
+        try:
+            if not re.match(FORMATO_MES_REGEX, entrada):
+                raise ValueError("Formato inválido. Ejemplo: 11/2025")
+            mes, anio = entrada.split("/")
+            return (int(anio), int(mes))
+        except ValueError as e:
+            print(f"Error: {e}")
+
+
+def pedir_periodo():
+    """
+    Solicita un período de meses. Enter deja el extremo abierto.
+    Retorna (desde, hasta) como tuplas (año, mes) o None.
+    """
+    desde = pedir_mes(True, "Desde (mm/aaaa, Enter = sin límite): ")
+    hasta = pedir_mes(True, "Hasta (mm/aaaa, Enter = sin límite): ")
+    return desde, hasta
+
+
 def pedir_opcion_numerica():
     """
     Pide una opción numérica manejando errores de conversión.